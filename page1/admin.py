@@ -1,8 +1,117 @@
-from django.contrib import admin
-from .models import Realtor, Listing, Contact, PropertyImage
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
+
+from .bulk import reorder_images, update_listings
+from .models import (
+    Realtor, Listing, ListingChange, ListingPriceHistory, Contact, PropertyImage, ListingStats,
+    MarketStats, SavedSearch, SearchAlert, JobLock, JobRun, RequestProfile, ImageOrderConflict,
+)
 
 # Register your models here.
 
+# Unfiltered changelists above this many rows show an estimated total
+ESTIMATED_COUNT_THRESHOLD = getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 10000)
+COUNT_CACHE_TIMEOUT = 60
+FACET_CACHE_TIMEOUT = getattr(settings, 'ADMIN_FACET_CACHE_TIMEOUT', 5 * 60)
+
+
+def estimated_row_count(model):
+    """The planner's row estimate for `model`'s table, or None if the database has none."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+        elif connection.vendor == 'sqlite':
+            # Populated by ANALYZE; `stat` starts with the rows covered by each
+            # index, and partial indexes cover fewer, hence MAX
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Skip the exact COUNT(*) of large unfiltered changelists.
+
+    Unfiltered lists use the planner's estimate once it is above
+    ESTIMATED_COUNT_THRESHOLD; below that, the exact count is cached for a
+    minute. Filtered lists are counted exactly."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        # Anything beyond the default manager's own filter means a search or sidebar filter
+        if queryset.query.where != queryset.model._default_manager.all().query.where:
+            return super().count
+
+        model = queryset.model
+        key = f'admin:count:{model._meta.label_lower}'
+        count = cache.get(key)
+        if count is None:
+            estimate = estimated_row_count(model)
+            count = estimate if estimate is not None and estimate > ESTIMATED_COUNT_THRESHOLD else super().count
+            cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class CachedFacetFilter(admin.SimpleListFilter):
+    """Sidebar filter over a column's distinct values, cached instead of scanned per page view."""
+    field_name = None
+
+    def lookups(self, request, model_admin):
+        model = model_admin.model
+        key = f'admin:facets:{model._meta.label_lower}:{self.field_name}'
+        values = cache.get(key)
+        if values is None:
+            values = list(
+                model._default_manager.order_by(self.field_name)
+                .values_list(self.field_name, flat=True).distinct()
+            )
+            cache.set(key, values, FACET_CACHE_TIMEOUT)
+        return [(value, value) for value in values]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.field_name: self.value()})
+        return queryset
+
+
+class CityFilter(CachedFacetFilter):
+    title = 'city'
+    parameter_name = 'city'
+    field_name = 'city'
+
+
+class StateFilter(CachedFacetFilter):
+    title = 'state'
+    parameter_name = 'state'
+    field_name = 'state'
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Don't run a second COUNT(*) over the whole table next to filtered results
+    show_full_result_count = False
+
 
 
 @admin.register(Realtor)
@@ -13,20 +122,215 @@ class RealtorAdmin(admin.ModelAdmin):
 
 
 @admin.register(Listing)
-class ListingAdmin(admin.ModelAdmin):
-    list_display = ('id', 'title', 'price', 'city', 'state', 'is_published')
-    list_filter = ('city', 'state', 'is_published')
+class ListingAdmin(LargeTableAdmin):
+    list_display = ('id', 'title', 'price', 'city', 'state', 'realtor', 'is_published', 'is_featured')
+    list_filter = (CityFilter, StateFilter, 'is_published', 'is_featured')
+    list_select_related = ('realtor',)
     search_fields = ('title', 'address', 'city', 'state')
     list_editable = ('is_published',)
+    autocomplete_fields = ('realtor',)
+    actions = ['publish', 'unpublish', 'feature', 'unfeature']
+
+    def _bulk_update(self, request, queryset, message, **values):
+        # One UPDATE per chunk instead of a save() per row; see bulk.update_listings
+        count = update_listings(queryset, **values)
+        self.message_user(request, f'{count} listing(s) {message}.', messages.SUCCESS)
+
+    @admin.action(description='Publish selected listings', permissions=['change'])
+    def publish(self, request, queryset):
+        self._bulk_update(request, queryset, 'published', is_published=True)
+
+    @admin.action(description='Unpublish selected listings', permissions=['change'])
+    def unpublish(self, request, queryset):
+        self._bulk_update(request, queryset, 'unpublished', is_published=False)
+
+    @admin.action(description='Feature selected listings', permissions=['change'])
+    def feature(self, request, queryset):
+        self._bulk_update(request, queryset, 'featured', is_featured=True)
+
+    @admin.action(description='Stop featuring selected listings', permissions=['change'])
+    def unfeature(self, request, queryset):
+        self._bulk_update(request, queryset, 'no longer featured', is_featured=False)
+
 
 @admin.register(PropertyImage)
-class PropertyImageAdmin(admin.ModelAdmin):
-    list_display = ('id', 'listing', 'image', 'is_featured', 'created_at')
-    list_filter = ('is_featured', 'created_at', 'listing')
+class PropertyImageAdmin(LargeTableAdmin):
+    list_display = ('id', 'listing', 'image', 'position', 'created_at')
+    list_filter = ('created_at',)
+    list_select_related = ('listing',)
     search_fields = ('listing__title',)
-    list_editable = ('is_featured',)
+    readonly_fields = ('position',)
+    autocomplete_fields = ('listing',)
+    actions = ['make_cover']
+
+    @admin.action(description='Make selected images the cover of their listing', permissions=['change'])
+    def make_cover(self, request, queryset):
+        # Positions only change through reorder(), one UPDATE per listing
+        covers = {}
+        for image in queryset.only('id', 'listing_id'):
+            covers.setdefault(image.listing_id, image.id)
+        changed = 0
+        for listing_id, cover_id in covers.items():
+            ids = list(PropertyImage.objects.filter(listing_id=listing_id).values_list('id', flat=True))
+            ids.remove(cover_id)
+            try:
+                reorder_images(listing_id, [cover_id, *ids])
+            except ImageOrderConflict:
+                self.message_user(request, f'The images of listing {listing_id} changed meanwhile; try again.', messages.WARNING)
+                continue
+            changed += 1
+        self.message_user(request, f'Cover changed on {changed} listing(s).', messages.SUCCESS)
+
 
 @admin.register(Contact)
-class ContactAdmin(admin.ModelAdmin):
+class ContactAdmin(LargeTableAdmin):
     list_display = ('id', 'name', 'listing_title', 'email', 'contact_date')
-    search_fields = ('name', 'email', 'listing_title')
\ No newline at end of file
+    search_fields = ('name', 'email', 'listing_title', '=submission_id')
+    raw_id_fields = ('listing',)
+    readonly_fields = ('contact_date', 'submission_id')
+
+
+@admin.register(ListingStats)
+class ListingStatsAdmin(LargeTableAdmin):
+    list_display = ('listing', 'period', 'bucket', 'views', 'inquiries')
+    list_filter = ('period',)
+    list_select_related = ('listing',)
+    date_hierarchy = 'bucket'
+    raw_id_fields = ('listing',)
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'keyword', 'city', 'bedrooms', 'max_price', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('user__email', 'city', 'keyword')
+    raw_id_fields = ('user',)
+
+
+@admin.register(SearchAlert)
+class SearchAlertAdmin(LargeTableAdmin):
+    list_display = ('id', 'saved_search', 'listing', 'created_at', 'sent_at')
+    list_select_related = ('saved_search__user', 'listing')
+    raw_id_fields = ('saved_search', 'listing')
+
+
+@admin.register(ListingChange)
+class ListingChangeAdmin(LargeTableAdmin):
+    list_display = ('id', 'listing_id', 'action', 'fields', 'changed_at')
+    list_filter = ('action',)
+    search_fields = ('=listing_id',)
+
+    # The log is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ListingPriceHistory)
+class ListingPriceHistoryAdmin(LargeTableAdmin):
+    list_display = ('id', 'listing', 'old_price', 'price', 'changed_at')
+    list_select_related = ('listing',)
+    raw_id_fields = ('listing',)
+
+
+@admin.register(MarketStats)
+class MarketStatsAdmin(admin.ModelAdmin):
+    list_display = ('state', 'city', 'listings', 'median_price', 'p25_price', 'p75_price', 'median_ppsf', 'refreshed_at')
+    list_filter = ('state',)
+    search_fields = ('city', 'state')
+
+    # Rows are rebuilt by `manage.py refresh_market_stats`
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(JobLock)
+class JobLockAdmin(admin.ModelAdmin):
+    list_display = ('name', 'next_run_at', 'owner', 'locked_until')
+    # Clearing locked_until releases a lease left by a crashed node
+    fields = ('name', 'next_run_at', 'owner', 'locked_until')
+    readonly_fields = ('name', 'owner')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(JobRun)
+class JobRunAdmin(LargeTableAdmin):
+    list_display = ('job', 'status', 'started_at', 'duration', 'node')
+    list_filter = ('status',)
+    search_fields = ('=job',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'status_code', 'duration_ms', 'sql_count', 'slow_query_count', 'user')
+    list_select_related = ('user',)
+    search_fields = ('path', '=request_id')
+    date_hierarchy = 'created_at'
+    exclude = ('raw_stats', 'stats', 'slow_queries')
+    readonly_fields = (
+        'request_id', 'method', 'path', 'user', 'status_code', 'duration', 'sql_count', 'sql_time',
+        'created_at', 'download', 'slow_query_report', 'stats_report',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Duration (ms)', ordering='duration')
+    def duration_ms(self, obj):
+        return f'{obj.duration * 1000:.0f}'
+
+    @admin.display(description='Slow queries')
+    def slow_query_count(self, obj):
+        return len(obj.slow_queries)
+
+    @admin.display(description='Slow queries')
+    def slow_query_report(self, obj):
+        if not obj.slow_queries:
+            return '-'
+        return format_html_join(
+            '', '<div style="margin-bottom:1em"><strong>{} ms</strong><pre>{}</pre><pre>{}</pre><pre>{}</pre></div>',
+            (
+                (f'{query["duration"] * 1000:.1f}', query['sql'], '\n'.join(query.get('explain', [])), '\n'.join(query['stack']))
+                for query in obj.slow_queries
+            ),
+        )
+
+    @admin.display(description='Profile')
+    def stats_report(self, obj):
+        return format_html('<pre style="font-size:11px">{}</pre>', obj.stats)
+
+    @admin.display(description='Raw stats')
+    def download(self, obj):
+        url = reverse('admin:page1_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">{}.prof</a> (pstats / snakeviz)', url, obj.request_id)
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view), name='page1_requestprofile_download'),
+            *super().get_urls(),
+        ]
+
+    def download_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(bytes(profile.raw_stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="{profile.request_id}.prof"'
+        return response
@@ -0,0 +1,192 @@
+"""New-listing alerts for saved searches.
+
+When a listing is published it is matched against every saved search
+through an in-memory inverted index. The index is keyed on
+(city, price bucket):
+- city is the saved city, lowercased, or '' for "any city"
+- price buckets are geometric bands of max_price, plus one band for
+  "no limit"
+
+Like the album filter (city__icontains), a saved city matches any listing
+city that contains it: "york" matches "New York". A listing at price p can
+therefore only match searches whose city occurs in its own city, or is
+'', and whose bucket is at least bucket(p). Those cities are found by
+looking up the substrings of the listing's city, at the lengths saved
+cities actually have. Those few lists are the candidates, and only
+candidates are checked against the full filter. Matching cost therefore
+follows the number of candidate searches, not the total number of saved
+searches.
+
+Matches are queued as SearchAlert rows. `manage.py send_alert_digests`
+drains the queue as one digest email per user over a single mail
+connection.
+"""
+import math
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import SavedSearch, SearchAlert
+
+VERSION_KEY = 'alerts:version'
+
+# Price buckets double from PRICE_BUCKET_BASE upwards
+PRICE_BUCKET_BASE = 50000
+NO_LIMIT_BUCKET = 64
+
+
+def price_bucket(price):
+    if price is None:
+        return NO_LIMIT_BUCKET
+    if price < PRICE_BUCKET_BASE:
+        return 0
+    return min(int(math.log2(price / PRICE_BUCKET_BASE)) + 1, NO_LIMIT_BUCKET - 1)
+
+
+def normalize_city(city):
+    return (city or '').strip().lower()
+
+
+def search_matches(search, listing):
+    """Same semantics as filters.filter_listings, for one search and one listing."""
+    _, keyword, city, bedrooms, max_price, _ = search
+    if keyword and keyword.lower() not in listing.title.lower():
+        return False
+    if city and city not in listing.city.lower():
+        return False
+    if bedrooms is not None and listing.bedrooms < bedrooms:
+        return False
+    if max_price is not None and listing.price > max_price:
+        return False
+    return True
+
+
+class SearchIndex:
+    """Inverted index of saved searches keyed by (city, price bucket)."""
+
+    def __init__(self, searches, version=0):
+        """`searches` are (id, keyword, city, bedrooms, max_price, user_id) tuples."""
+        self.version = version
+        self.size = 0
+        self._buckets = defaultdict(list)
+        self._city_lengths = set()
+        for search_id, keyword, city, bedrooms, max_price, user_id in searches:
+            city = normalize_city(city)
+            entry = (search_id, keyword, city, bedrooms, max_price, user_id)
+            self._buckets[(city, price_bucket(max_price))].append(entry)
+            if city:
+                self._city_lengths.add(len(city))
+            self.size += 1
+
+    @classmethod
+    def load(cls, version=0):
+        rows = SavedSearch.objects.values_list('id', 'keyword', 'city', 'bedrooms', 'max_price', 'user_id')
+        return cls(rows, version=version)
+
+    def _city_keys(self, city):
+        """'' and every substring of `city` that could be a saved city."""
+        keys = {''}
+        for length in self._city_lengths:
+            keys.update(city[start:start + length] for start in range(len(city) - length + 1))
+        return keys
+
+    def candidates(self, listing):
+        first_bucket = price_bucket(listing.price)
+        for city_key in self._city_keys(normalize_city(listing.city)):
+            for bucket in range(first_bucket, NO_LIMIT_BUCKET + 1):
+                yield from self._buckets.get((city_key, bucket), ())
+
+    def match(self, listing):
+        """Ids of the saved searches `listing` satisfies."""
+        return [search[0] for search in self.candidates(listing) if search_matches(search, listing)]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def get_index():
+    global _index
+    version = cache.get(VERSION_KEY, 0)
+    index = _index
+    if index is None or index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                _index = SearchIndex.load(version)
+            index = _index
+    return index
+
+
+def queue_alerts(listing):
+    """Queue a SearchAlert for every saved search the published `listing` matches."""
+    search_ids = get_index().match(listing)
+    SearchAlert.objects.bulk_create(
+        [SearchAlert(saved_search_id=search_id, listing=listing) for search_id in search_ids],
+        ignore_conflicts=True,
+    )
+    return len(search_ids)
+
+
+def listing_published(listing):
+    # Match after commit so a rolled-back publish never alerts anyone
+    transaction.on_commit(lambda: queue_alerts(listing))
+
+
+def _digest_body(user, alerts):
+    base_url = getattr(settings, 'SITE_URL', 'http://localhost:8000').rstrip('/')
+    lines = [
+        f'Hi {user.username},',
+        '',
+        f'{len(alerts)} new propert{"y matches" if len(alerts) == 1 else "ies match"} your saved searches:',
+        '',
+    ]
+    for alert in alerts:
+        listing = alert.listing
+        lines.append(f'- {listing.title}, {listing.city} - ₹{listing.price:,}')
+        lines.append(f'  {base_url}{reverse("listing_detail", args=[listing.id])}')
+    return '\n'.join(lines)
+
+
+def send_digests(limit=1000):
+    """Send one digest email per user for pending alerts. Returns (emails, alerts) sent."""
+    pending = list(
+        SearchAlert.objects.filter(sent_at__isnull=True, listing__is_published=True, listing__is_deleted=False)
+        .select_related('saved_search__user', 'listing')
+        .order_by('created_at')[:limit]
+    )
+    by_user = defaultdict(list)
+    for alert in pending:
+        by_user[alert.saved_search.user].append(alert)
+
+    messages = []
+    sent_alert_ids = []
+    for user, alerts in by_user.items():
+        # Several saved searches can match the same listing; list it once
+        unique = list({alert.listing_id: alert for alert in alerts}.values())
+        if user.email:
+            messages.append(EmailMessage(
+                subject=f'{len(unique)} new listing(s) matching your saved searches',
+                body=_digest_body(user, unique),
+                from_email=getattr(settings, 'DEFAULT_FROM_EMAIL'),
+                to=[user.email],
+            ))
+        sent_alert_ids.extend(alert.id for alert in alerts)
+
+    if messages:
+        connection = get_connection()
+        connection.send_messages(messages)
+    SearchAlert.objects.filter(id__in=sent_alert_ids).update(sent_at=timezone.now())
+    return len(messages), len(sent_alert_ids)
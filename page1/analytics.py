@@ -0,0 +1,236 @@
+"""Listing view/inquiry analytics with write-behind counters.
+
+Requests only bump an in-process counter (`record_view`, `record_inquiry`).
+A daemon thread flushes the buffered counts every
+ANALYTICS_FLUSH_INTERVAL seconds as one batched upsert into hourly
+`ListingStats` rows, so the request path never writes to the database.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncWeek
+from django.utils import timezone
+
+from .models import Listing, ListingStats
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = getattr(settings, 'ANALYTICS_FLUSH_INTERVAL', 10)
+ANALYTICS_ENABLED = getattr(settings, 'ANALYTICS_ENABLED', True)
+
+MOST_VIEWED_CACHE_TIMEOUT = 60 * 10
+
+
+def hour_bucket(when=None):
+    when = when or timezone.now()
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+class CounterBuffer:
+    """Thread-safe in-memory counters keyed by (listing_id, hour bucket)."""
+
+    def __init__(self, interval=FLUSH_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: [0, 0])
+        self._flusher = None
+        self._flusher_pid = None
+        self._stop = threading.Event()
+
+    def incr(self, listing_id, views=0, inquiries=0):
+        key = (listing_id, hour_bucket())
+        with self._lock:
+            counts = self._counts[key]
+            counts[0] += views
+            counts[1] += inquiries
+        self._ensure_flusher()
+
+    def drain(self):
+        """Swap out and return the buffered counts."""
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(lambda: [0, 0])
+        return counts
+
+    def flush(self):
+        """Write buffered counts to ListingStats. Returns the number of rows upserted."""
+        counts = self.drain()
+        if not counts:
+            return 0
+        try:
+            return upsert_hourly(counts)
+        except Exception:
+            # Put the counts back so the next flush retries them; counts of
+            # listings deleted meanwhile are dropped then
+            logger.exception('Failed to flush listing analytics')
+            with self._lock:
+                for key, (views, inquiries) in counts.items():
+                    self._counts[key][0] += views
+                    self._counts[key][1] += inquiries
+            return 0
+
+    def _ensure_flusher(self):
+        # A forked worker inherits the buffer but not the thread
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._run, name='analytics-flusher', daemon=True)
+            self._flusher.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+            # The flusher owns its own DB connection; don't keep it open between flushes
+            connection.close()
+
+
+def upsert_hourly(counts):
+    """Add `counts` {(listing_id, bucket): [views, inquiries]} to the hourly rows; returns how many.
+
+    One INSERT .. ON CONFLICT DO UPDATE for the whole batch (SQLite >= 3.24,
+    PostgreSQL), so concurrent flushes from several workers add up instead
+    of overwriting each other. Counts of listings that have been deleted
+    since are dropped."""
+    # Without this, one hard-deleted listing would fail every later batch on
+    # its foreign key. Read outside the write transaction (see inquiries.commit);
+    # a listing deleted in between fails this batch once, and the retry drops it.
+    listing_ids = {listing_id for listing_id, _ in counts}
+    existing = set(Listing.all_objects.filter(id__in=listing_ids).values_list('id', flat=True))
+    counts = {key: value for key, value in counts.items() if key[0] in existing}
+    if not counts:
+        return 0
+    table = ListingStats._meta.db_table
+    quote = connection.ops.quote_name
+    sql = (
+        f'INSERT INTO {quote(table)} (listing_id, period, bucket, views, inquiries) '
+        f'VALUES (%s, %s, %s, %s, %s) '
+        f'ON CONFLICT (listing_id, period, bucket) DO UPDATE SET '
+        f'views = {quote(table)}.views + excluded.views, '
+        f'inquiries = {quote(table)}.inquiries + excluded.inquiries'
+    )
+    field = ListingStats._meta.get_field('bucket')
+    params = [
+        (listing_id, ListingStats.HOUR, field.get_db_prep_value(bucket, connection), views, inquiries)
+        for (listing_id, bucket), (views, inquiries) in counts.items()
+    ]
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+    return len(params)
+
+
+buffer = CounterBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    counts = buffer.drain()
+    if not counts:
+        return
+    try:
+        upsert_hourly(counts)
+    except Exception:
+        # The database may already be unusable at interpreter exit
+        pass
+
+
+def record_view(listing_id):
+    if ANALYTICS_ENABLED:
+        buffer.incr(listing_id, views=1)
+
+
+def record_inquiry(listing_id):
+    if ANALYTICS_ENABLED:
+        buffer.incr(listing_id, inquiries=1)
+
+
+def stats_totals_annotation(days=30):
+    """Annotations adding `views_recent`/`inquiries_recent` over the last `days` to a Listing queryset."""
+    since = hour_bucket() - timedelta(days=days)
+    window = Q(stats__period=ListingStats.HOUR, stats__bucket__gte=since)
+    return {
+        'views_recent': Coalesce(Sum('stats__views', filter=window), 0),
+        'inquiries_recent': Coalesce(Sum('stats__inquiries', filter=window), 0),
+    }
+
+
+def most_viewed(days=7, limit=10, refresh=False):
+    """Return [(listing_id, views)] for the most viewed published listings, cached.
+
+    `refresh` recomputes and stores the ranking even when it is cached."""
+    key = f'analytics:most_viewed:{days}:{limit}'
+    ranking = None if refresh else cache.get(key)
+    if ranking is None:
+        since = hour_bucket() - timedelta(days=days)
+        ranking = list(
+            ListingStats.objects.filter(
+                period=ListingStats.HOUR,
+                bucket__gte=since,
+                listing__is_published=True,
+                listing__is_deleted=False,
+            )
+            .values('listing_id')
+            .annotate(total=Sum('views'))
+            .filter(total__gt=0)
+            .order_by('-total')
+            .values_list('listing_id', 'total')[:limit]
+        )
+        cache.set(key, ranking, MOST_VIEWED_CACHE_TIMEOUT)
+    return ranking
+
+
+def period_start(period, when):
+    """Start of the day/week bucket containing `when` (weeks start on Monday)."""
+    start = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == ListingStats.WEEK:
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def rollup(period, since):
+    """Recompute `period` (day/week) rows from the hourly rows from `since` on.
+
+    Every touched bucket is recomputed in full from its hourly rows and
+    upserted, so re-running a rollup is harmless."""
+    trunc = {ListingStats.DAY: TruncDay, ListingStats.WEEK: TruncWeek}[period]
+    rows = (
+        ListingStats.objects.filter(period=ListingStats.HOUR, bucket__gte=period_start(period, since))
+        .annotate(rollup_bucket=trunc('bucket'))
+        .values('listing_id', 'rollup_bucket')
+        .annotate(total_views=Sum('views'), total_inquiries=Sum('inquiries'))
+        .order_by()
+    )
+    objs = [
+        ListingStats(
+            listing_id=row['listing_id'],
+            period=period,
+            bucket=row['rollup_bucket'],
+            views=row['total_views'],
+            inquiries=row['total_inquiries'],
+        )
+        for row in rows
+    ]
+    ListingStats.objects.bulk_create(
+        objs,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['listing', 'period', 'bucket'],
+        update_fields=['views', 'inquiries'],
+    )
+    return len(objs)
+
+
+def prune_hourly(before):
+    """Delete hourly rows older than `before` (after they have been rolled up)."""
+    deleted, _ = ListingStats.objects.filter(period=ListingStats.HOUR, bucket__lt=before).delete()
+    return deleted
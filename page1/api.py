@@ -0,0 +1,250 @@
+"""Read-only JSON API (v1) for app clients.
+
+Listing search reuses `filters.filter_listings`, so results match the
+album page. Responses are built from column-restricted `values_list()`
+rows instead of model instances and are compressed when the client
+accepts it.
+"""
+import base64
+import datetime
+import decimal
+import gzip
+import json
+
+from django.http import HttpResponse
+
+from .changes import changes_since
+from .filters import filter_listings
+from .viewmodels import get_listing_detail
+
+# Optional: orjson serializes dicts/datetimes several times faster than json
+try:
+    import orjson
+    _ORJSON_AVAILABLE = True
+except ImportError:
+    _ORJSON_AVAILABLE = False
+
+# Optional: brotli gives smaller bodies than gzip for clients that accept it
+try:
+    import brotli
+    _BROTLI_AVAILABLE = True
+except ImportError:
+    _BROTLI_AVAILABLE = False
+
+
+# Public field name -> Listing column. `fields=` may only name these.
+LISTING_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'address': 'address',
+    'city': 'city',
+    'state': 'state',
+    'zipcode': 'zipcode',
+    'description': 'description',
+    'price': 'price',
+    'bedrooms': 'bedrooms',
+    'bathrooms': 'bathrooms',
+    'garage': 'garage',
+    'sqft': 'sqft',
+    'lot_size': 'lot_size',
+    'photo_main': 'photo_main',
+    'is_featured': 'is_featured',
+    'list_date': 'list_date',
+    'realtor_id': 'realtor_id',
+}
+
+# A result row in a list: anything else (state, garage, description,
+# photo_main, ...) must be asked for with fields=
+DEFAULT_FIELDS = (
+    'id', 'title', 'city', 'price', 'bedrooms', 'bathrooms',
+)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Bodies smaller than this are not worth the compression overhead
+MIN_COMPRESS_SIZE = 512
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps(data):
+    """Serialize to compact UTF-8 JSON bytes."""
+    if _ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def json_response(request, data, status=200):
+    body = dumps(data)
+    response = HttpResponse(content_type='application/json', status=status)
+    response['Vary'] = 'Accept-Encoding'
+
+    accepted = request.headers.get('Accept-Encoding', '')
+    if len(body) >= MIN_COMPRESS_SIZE:
+        if _BROTLI_AVAILABLE and 'br' in accepted:
+            body = brotli.compress(body, quality=5)
+            response['Content-Encoding'] = 'br'
+        elif 'gzip' in accepted:
+            body = gzip.compress(body, compresslevel=6)
+            response['Content-Encoding'] = 'gzip'
+
+    response.content = body
+    response['Content-Length'] = str(len(body))
+    return response
+
+
+def error_response(request, error):
+    return json_response(request, {'error': error.message}, status=error.status)
+
+
+def parse_fields(params):
+    """Return the requested public field names, validated against LISTING_FIELDS."""
+    raw = params.get('fields')
+    if not raw:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in LISTING_FIELDS]
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def parse_limit(params):
+    raw = params.get('limit')
+    if not raw:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ApiError('limit must be an integer')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(list_date, pk):
+    raw = f'{list_date.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        list_date, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.datetime.fromisoformat(list_date), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise ApiError('Invalid cursor')
+
+
+def serialize_rows(fields, rows):
+    """Turn `values_list()` rows into dicts, mapping file columns to URLs."""
+    file_index = fields.index('photo_main') if 'photo_main' in fields else None
+    if file_index is None:
+        return [dict(zip(fields, row)) for row in rows]
+
+    from django.core.files.storage import default_storage
+    items = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        name = row[file_index]
+        item['photo_main'] = default_storage.url(name) if name else None
+        items.append(item)
+    return items
+
+
+def listing_page(params):
+    """Return one keyset-paginated page of published listings as plain data.
+
+    Ordered newest first on (list_date, id) so the cursor stays stable while
+    new listings are published."""
+    fields = parse_fields(params)
+    limit = parse_limit(params)
+
+    qs = filter_listings(params).order_by('-list_date', '-id')
+
+    cursor = params.get('cursor')
+    if cursor:
+        list_date, pk = decode_cursor(cursor)
+        qs = qs.filter(list_date__lte=list_date).exclude(list_date=list_date, id__gte=pk)
+
+    # The cursor columns are always fetched; they are dropped again below
+    # unless the client asked for them.
+    columns = [LISTING_FIELDS[f] for f in fields]
+    extra = [c for c in ('list_date', 'id') if c not in columns]
+    rows = list(qs.values_list(*columns, *extra)[:limit + 1])
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = dict(zip(columns + extra, rows[-1]))
+        next_cursor = encode_cursor(last['list_date'], last['id'])
+
+    if extra:
+        width = len(columns)
+        rows = [row[:width] for row in rows]
+
+    return {
+        'results': serialize_rows(fields, rows),
+        'next_cursor': next_cursor,
+    }
+
+
+def listings(request):
+    """GET /api/v1/listings/?keyword=&city=&bedrooms=&max_price=&fields=&limit=&cursor="""
+    try:
+        data = listing_page(request.GET)
+    except ApiError as e:
+        return error_response(request, e)
+    return json_response(request, data)
+
+
+def listing_detail(request, id):
+    """GET /api/v1/listings/<id>/ - the cached detail view model"""
+    detail = get_listing_detail(id)
+    if detail is None or not detail['listing']['is_published']:
+        return error_response(request, ApiError('Listing not found', status=404))
+
+    if request.GET.get('fields'):
+        try:
+            fields = parse_fields(request.GET)
+        except ApiError as e:
+            return error_response(request, e)
+        listing = detail['listing']
+        # The view model exposes file fields as ready-made URLs
+        listing = {f: listing[f'{f}_url' if f == 'photo_main' else f] for f in fields}
+        detail = {**detail, 'listing': listing}
+
+    return json_response(request, detail)
+
+
+def changes(request):
+    """GET /api/v1/changes/?since=<change id>&limit= - listing changes after `since`, oldest first"""
+    try:
+        since = int(request.GET.get('since') or 0)
+    except ValueError:
+        return error_response(request, ApiError('since must be an integer'))
+    try:
+        limit = parse_limit(request.GET)
+    except ApiError as e:
+        return error_response(request, e)
+
+    items, next_since, has_more = changes_since(since, limit)
+    return json_response(request, {
+        'results': items,
+        'next_since': next_since,
+        'has_more': has_more,
+    })
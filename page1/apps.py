@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class Page1Config(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'page1'
+
+    def ready(self):
+        # Register cache invalidation handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.functions import Lower
+
+
+class EmailBackend(ModelBackend):
+    """Authenticate with email + password in a single query.
+
+    The lookup compares LOWER(email), which is served by the
+    page1_auth_user_email_lower expression index (migration 0010).
+    get_user() also joins the realtor profile, so request.user and
+    request.user.realtor_profile cost one query per request together."""
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        UserModel = get_user_model()
+        candidates = list(
+            UserModel._default_manager.annotate(email_lower=Lower('email'))
+            .filter(email_lower=email.strip().lower())
+            .order_by('pk')
+        )
+        if not candidates:
+            # Run the hasher once anyway so a missing account doesn't answer faster
+            UserModel().set_password(password)
+            return None
+        for user in candidates:
+            if user.check_password(password) and self.user_can_authenticate(user):
+                return user
+        return None
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related('realtor_profile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+def get_realtor(request):
+    """The signed-in user's Realtor profile or None, resolved once per request."""
+    if not hasattr(request, '_realtor'):
+        user = request.user
+        # RelatedObjectDoesNotExist is an AttributeError, so getattr covers non-realtors
+        request._realtor = getattr(user, 'realtor_profile', None) if user.is_authenticated else None
+    return request._realtor
@@ -0,0 +1,545 @@
+"""Micro-benchmarks run by `manage.py benchmark <suite>`.
+
+Every suite runs against a throwaway test database seeded with synthetic
+listings, so the development db.sqlite3 is never touched. A suite returns
+a list of report lines.
+"""
+import gzip
+import os
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import connection
+
+
+CITIES = ['Pune', 'Mumbai', 'Delhi', 'Chennai', 'Bengaluru', 'Hyderabad', 'Kolkata', 'Jaipur']
+
+
+@contextmanager
+def benchmark_database(on_disk=False):
+    """A throwaway test database. `on_disk` puts a SQLite one in a file instead of
+    memory, for suites where commit (fsync) cost matters."""
+    import tempfile
+    from django.conf import settings
+    from django.core.exceptions import ImproperlyConfigured
+    from django.core.management.utils import get_random_secret_key
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    try:
+        settings.SECRET_KEY
+    except ImproperlyConfigured:
+        # Sessions and CSRF need one; nothing signed here outlives the run
+        settings.SECRET_KEY = get_random_secret_key()
+    setup_test_environment()
+    with tempfile.TemporaryDirectory() as tmp:
+        if on_disk and connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tmp, 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+
+def seed_listings(count):
+    """Create one realtor and `count` published listings spread over CITIES."""
+    from django.contrib.auth.models import User
+    from .models import Listing, Realtor
+
+    user = User.objects.create_user('bench_realtor', 'bench@example.com', 'bench-password')
+    realtor = Realtor.objects.create(user=user, name='Bench Realtor', email=user.email, phone='0000000000')
+    Listing.objects.bulk_create(
+        Listing(
+            realtor=realtor,
+            title=f'{i % 5 + 1} BHK home #{i}',
+            address=f'{i} Benchmark Road',
+            city=CITIES[i % len(CITIES)],
+            state='State',
+            zipcode=f'{400000 + i}',
+            description='Spacious home close to schools, parks and public transport. ' * 3,
+            price=500000 + (i * 7919) % 4500000,
+            bedrooms=i % 5 + 1,
+            bathrooms=i % 3 + 1,
+            garage=i % 2,
+            sqft=600 + (i * 31) % 2400,
+            lot_size=Decimal('0.25') + Decimal(i % 8) / 4,
+        )
+        for i in range(count)
+    )
+    return realtor
+
+
+def best_of(fn, repeat):
+    """Return (best wall time in seconds, last result) over `repeat` runs."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_api(rows, repeat):
+    """Listing API payload size vs album HTML, and serializer speed vs model serialization."""
+    from django.core import serializers
+    from django.template.loader import render_to_string
+    from django.test import Client
+    from . import api
+    from .models import Listing
+    from .viewmodels import summaries
+
+    seed_listings(rows)
+    limit = min(rows, api.MAX_PAGE_SIZE)
+    params = {'limit': str(limit)}
+    # Like for like: everything a property card prints (description stands in
+    # for its excerpt and photo_main for the cover, so the JSON side is if
+    # anything larger)
+    card_params = {
+        'limit': str(limit),
+        'fields': 'id,title,city,state,price,bedrooms,bathrooms,garage,description,photo_main,is_featured',
+    }
+
+    def per_listing(body, count):
+        return len(body) / count, len(gzip.compress(body)) / count
+
+    page_html = per_listing(Client().get('/album/').getvalue(), rows)
+    page = Listing.objects.filter(is_published=True).order_by('-list_date', '-id')[:limit]
+    cards_html = per_listing(render_to_string('components/card_columns.html', {'listings': summaries(page)}).encode(), limit)
+    card_json = per_listing(api.dumps(api.listing_page(card_params)), limit)
+    default_json = per_listing(api.dumps(api.listing_page(params)), limit)
+    # The target is for the default payload; clients ask for more with fields=
+    reduction = page_html[0] / default_json[0]
+
+    fast, _ = best_of(lambda: api.dumps(api.listing_page(params)), repeat)
+    baseline, _ = best_of(
+        lambda: serializers.serialize(
+            'json', Listing.objects.filter(is_published=True).order_by('-list_date', '-id')[:limit]
+        ),
+        repeat,
+    )
+
+    return [
+        f'listings seeded:            {rows}',
+        f'album page bytes/listing:   {page_html[0]:,.0f} ({page_html[1]:,.0f} gzipped)',
+        f'card HTML bytes/listing:    {cards_html[0]:,.0f} ({cards_html[1]:,.0f} gzipped)',
+        f'API JSON bytes/listing:     {default_json[0]:,.0f} ({default_json[1]:,.0f} gzipped), default fields',
+        f'                            {card_json[0]:,.0f} ({card_json[1]:,.0f} gzipped), every card field',
+        f'payload reduction, default fields vs album page: {reduction:.1f}x '
+        f'({page_html[1] / default_json[1]:.1f}x gzipped)',
+        f'payload reduction, card fields vs album page:    {page_html[0] / card_json[0]:.1f}x '
+        f'({page_html[1] / card_json[1]:.1f}x gzipped)',
+        f'payload reduction, card fields vs card HTML:     {cards_html[0] / card_json[0]:.1f}x '
+        f'({cards_html[1] / card_json[1]:.1f}x gzipped)',
+        f'10x payload target:         {"met" if reduction >= 10 else "NOT met"} ({reduction:.1f}x, default fields vs album page)',
+        f'API page of {limit} (query+serialize):    {fast * 1000:.2f} ms',
+        f'model-instance serializer, same page:  {baseline * 1000:.2f} ms',
+        f'serialization speedup:      {baseline / fast:.1f}x'
+        f' (orjson={"yes" if api._ORJSON_AVAILABLE else "no"})',
+        f'5x serialization target:    {"met" if baseline / fast >= 5 else "NOT met"}',
+    ]
+
+
+def bench_similar(rows, repeat):
+    """Top-k latency of the in-memory similar listings index."""
+    import random
+    from . import similar
+
+    if not similar._NUMPY_AVAILABLE:
+        return ['NumPy is not installed; similar listings use the database fallback']
+
+    rng = random.Random(42)
+    synthetic = [
+        (
+            i,
+            rng.randint(300000, 9000000),
+            rng.randint(400, 5000),
+            rng.randint(1, 6),
+            rng.randint(1, 4),
+            rng.randint(0, 3),
+            Decimal(rng.randint(10, 500)) / 100,
+            f'City {rng.randint(0, 400)}',
+        )
+        for i in range(rows)
+    ]
+    build, index = best_of(lambda: similar.SimilarityIndex(synthetic), 1)
+    probes = [rng.randrange(rows) for _ in range(repeat)]
+    query, _ = best_of(lambda: [index.nearest(pk, 3) for pk in probes], 5)
+
+    return [
+        f'listings indexed:     {rows:,}',
+        f'index build:          {build * 1000:.1f} ms',
+        f'top-3 query:          {query / len(probes) * 1000:.3f} ms',
+    ]
+
+
+def bench_ratelimit(rows, repeat):
+    """Per-request overhead of the contact_agent rate limit and dedup checks."""
+    from django.core.cache import cache, caches
+    from django.test import RequestFactory
+    from . import ratelimit
+
+    factory = RequestFactory()
+    requests = [
+        factory.post('/listing/1/contact/', {
+            'name': 'Bench', 'email': f'buyer{i}@example.com', 'phone': '123', 'message': f'Inquiry {i}',
+        }, REMOTE_ADDR=f'10.0.{i // 250}.{i % 250}')
+        for i in range(rows)
+    ]
+
+    def run():
+        cache.clear()
+        for i, request in enumerate(requests):
+            ratelimit.check_inquiry(request, i)
+
+    elapsed, _ = best_of(run, repeat)
+    return [
+        f'cache backend:        {type(caches["default"]).__name__}',
+        f'checks per run:       {rows}',
+        f'overhead per request: {elapsed / rows * 1e6:.1f} us',
+    ]
+
+
+# property_card.html when cards were rendered from Listing instances
+LEGACY_CARD = """
+<div class="card shadow-sm h-100 d-flex flex-column position-relative">
+  {% if is_featured %}
+  <span class="badge bg-bd-primary position-absolute top-0 end-0 m-2">⭐</span>
+  {% endif %}
+
+  {% if listing.photo_main %}
+    <img src="{{ listing.photo_main.url }}" class="card-img-top" style="height:225px; object-fit:cover;">
+  {% elif listing.images.all|length > 0 %}
+    {% with first_image=listing.images.all.0 %}
+      <img src="{{ first_image.image.url }}" class="card-img-top" style="height:225px; object-fit:cover;">
+    {% endwith %}
+  {% else %}
+    <svg class="bd-placeholder-img card-img-top" height="225" width="100%">
+      <rect width="100%" height="100%" fill="#55595c"></rect>
+      <text x="50%" y="50%" fill="#eceeef" dy=".3em">No Image</text>
+    </svg>
+  {% endif %}
+
+  <div class="card-body d-flex flex-column">
+    <h6 class="mb-2">{{ listing.title }}</h6>
+    <p class="card-text mb-2 text-muted small">
+      {{ listing.city }}, {{ listing.state }} <br>
+      <strong>₹{{ listing.price|floatformat:0 }}</strong>
+    </p>
+
+    <p class="card-text mb-3" style="min-height:3.5rem; max-height:3.5rem; overflow:hidden;">
+      <small>{{ listing.description|truncatewords:18 }}</small>
+    </p>
+
+    <div class="mt-auto d-flex justify-content-between align-items-center">
+      <a href="{% url 'listing_detail' listing.id %}" class="btn btn-sm btn-bd-primary">View</a>
+      <small class="text-muted">
+        {{ listing.bedrooms }} bed • {{ listing.bathrooms }} bath • {{ listing.garage }} car
+      </small>
+    </div>
+  </div>
+</div>
+"""
+
+
+@contextmanager
+def card_engines():
+    """{cached: Engine} loading LEGACY_CARD as legacy_card.html and the app's own templates."""
+    import tempfile
+    from pathlib import Path
+    from django.template.backends.django import DjangoTemplates
+
+    with tempfile.TemporaryDirectory() as directory:
+        Path(directory, 'legacy_card.html').write_text(LEGACY_CARD, encoding='utf-8')
+        dirs = [directory, Path(__file__).resolve().parent / 'templates']
+        engines = {}
+        for cached in (False, True):
+            loaders = ['django.template.loaders.filesystem.Loader']
+            if cached:
+                loaders = [('django.template.loaders.cached.Loader', loaders)]
+            engines[cached] = DjangoTemplates({
+                'NAME': f'bench-{cached}', 'DIRS': dirs, 'APP_DIRS': False, 'OPTIONS': {'loaders': loaders},
+            }).engine
+        yield engines
+
+
+LEGACY_CARDS = (
+    '{% for listing in listings %}<div class="col">'
+    '{% include "legacy_card.html" with is_featured=listing.is_featured %}'
+    '</div>{% endfor %}'
+)
+SUMMARY_CARDS = '{% include "components/card_columns.html" %}'
+
+
+def bench_cards(rows, repeat):
+    """Album card rendering: the include per card with and without the cached loader, before and after ListingSummary."""
+    from django.template import Context
+    from .models import Listing
+    from .viewmodels import summaries
+
+    seed_listings(rows)
+    queryset = Listing.objects.order_by('-list_date')[:rows]
+    instances = list(queryset.prefetch_related('images'))
+    compact = summaries(queryset)
+
+    results = []
+    with card_engines() as engines:
+        for label, source, cached, listings in [
+            ('Listing, uncached loader', LEGACY_CARDS, False, instances),
+            ('Listing, cached loader', LEGACY_CARDS, True, instances),
+            ('ListingSummary, cached', SUMMARY_CARDS, True, compact),
+        ]:
+            page = engines[cached].from_string(source)
+            elapsed, _ = best_of(lambda: page.render(Context({'listings': listings})), repeat)
+            results.append((label, elapsed))
+
+    baseline = results[0][1]
+    lines = [f'cards per page:           {rows}']
+    for label, elapsed in results:
+        lines.append(f'{label + ":":<26}{rows / elapsed:>10,.0f} cards/s  ({baseline / elapsed:.1f}x)')
+    return lines
+
+
+def bench_streaming(rows, repeat):
+    """album: time to first byte and peak memory, buffered vs streamed."""
+    import tracemalloc
+    from django.test import Client
+    import importlib
+    # The package re-exports the listings view under the same name as its module
+    views = importlib.import_module('page1.views.listings')
+
+    seed_listings(rows)
+    client = Client()
+
+    def measure(streaming):
+        views.ALBUM_STREAMING = streaming
+        first_bytes, totals, peaks = [], [], []
+        for _ in range(repeat):
+            tracemalloc.start()
+            start = time.perf_counter()
+            response = client.get('/album/')
+            chunks = iter(response.streaming_content if response.streaming else [response.content])
+            next(chunks)
+            first_bytes.append(time.perf_counter() - start)
+            for _ in chunks:
+                pass
+            totals.append(time.perf_counter() - start)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        return min(first_bytes), min(totals), min(peaks)
+
+    original = views.ALBUM_STREAMING
+    try:
+        buffered = measure(False)
+        streamed = measure(True)
+    finally:
+        views.ALBUM_STREAMING = original
+
+    lines = [f'listings on the page:   {rows}']
+    for label, (ttfb, total, peak) in [('buffered', buffered), ('streamed', streamed)]:
+        lines.append(
+            f'{label + ":":<10} first byte {ttfb * 1000:7.1f} ms   '
+            f'full page {total * 1000:7.1f} ms   peak memory {peak / 1024 / 1024:6.1f} MiB'
+        )
+    return lines
+
+
+def bench_cache(rows, repeat):
+    """Thundering herd on a cold key, plain cache vs the layered cache, and per-layer hit cost."""
+    import threading
+    from django.core.cache import cache, caches
+    from .cache import LayeredCache
+
+    threads = 32
+    build_time = 0.05
+
+    def herd(get):
+        cache.clear()
+        builds = []
+        barrier = threading.Barrier(threads)
+
+        def build():
+            builds.append(1)
+            time.sleep(build_time)
+            return list(range(rows))
+
+        def worker():
+            barrier.wait()
+            get(build)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        start = time.perf_counter()
+        for worker_thread in workers:
+            worker_thread.start()
+        for worker_thread in workers:
+            worker_thread.join()
+        return time.perf_counter() - start, len(builds)
+
+    def plain(build):
+        value = cache.get('bench:herd')
+        if value is None:
+            value = build()
+            cache.set('bench:herd', value, 60)
+        return value
+
+    layered = LayeredCache()
+    lines = [f'concurrent requests:  {threads} (build takes {build_time * 1000:.0f} ms)']
+    for label, get in [('get/set', plain), ('layered', lambda build: layered.get_or_set('bench:herd', build, 60))]:
+        elapsed, builds = herd(get)
+        lines.append(f'{label + ":":<10} {builds:>3} build(s), all served in {elapsed * 1000:6.1f} ms')
+
+    layered.set('bench:hit', list(range(rows)), 60)
+    l1, _ = best_of(lambda: [layered.get_or_set('bench:hit', list, 60) for _ in range(1000)], repeat)
+    layered.l1.clear()
+    layered.l1_ttl = 0
+    l2, _ = best_of(lambda: [layered.get_or_set('bench:hit', list, 60) for _ in range(1000)], repeat)
+    lines.append(f'L1 hit:     {l1 / 1000 * 1e6:6.1f} us')
+    lines.append(f'L2 hit:     {l2 / 1000 * 1e6:6.1f} us  ({type(caches["default"]).__name__}, {rows}-item value)')
+    return lines
+
+
+def bench_summaries(rows, repeat):
+    """Memory and build time of card data: Listing instances vs ListingSummary tuples."""
+    import pickle
+    import tracemalloc
+    from django.template import Context
+    from .models import Listing, PropertyImage
+    from .viewmodels import summaries
+
+    realtor = seed_listings(rows)
+    # Every other listing gets an image, so half the covers come from the images table
+    PropertyImage.objects.bulk_create(
+        PropertyImage(listing_id=pk, image=f'property_images/bench/{pk}.jpg', position=0)
+        for pk in Listing.objects.filter(realtor=realtor).values_list('id', flat=True)[::2]
+    )
+    queryset = Listing.objects.order_by('-list_date')
+
+    def measure(build):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        data = build()
+        elapsed = time.perf_counter() - start
+        size = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        return data, elapsed, size
+
+    instances, instance_time, instance_size = measure(lambda: list(queryset.prefetch_related('images')))
+    compact, summary_time, summary_size = measure(lambda: summaries(queryset))
+
+    with card_engines() as engines:
+        legacy, current = engines[True].from_string(LEGACY_CARDS), engines[True].from_string(SUMMARY_CARDS)
+        render_instances, _ = best_of(lambda: legacy.render(Context({'listings': instances})), max(repeat // 4, 1))
+        render_summaries, _ = best_of(lambda: current.render(Context({'listings': compact})), max(repeat // 4, 1))
+
+    lines = [f'listings:             {rows:,}']
+    for label, data, elapsed, size, render in [
+        ('model instances', instances, instance_time, instance_size, render_instances),
+        ('ListingSummary', compact, summary_time, summary_size, render_summaries),
+    ]:
+        lines.append(
+            f'{label + ":":<17} {size / len(data):7,.0f} B/listing in memory, '
+            f'{len(pickle.dumps(data)) / len(data):6,.0f} B/listing pickled, '
+            f'load {elapsed * 1000:6.1f} ms, render {render * 1000:6.1f} ms'
+        )
+    lines.append(f'memory ratio:         {instance_size / summary_size:.1f}x smaller')
+    return lines
+
+
+def bench_inquiries(rows, repeat):
+    """Inquiry intake from concurrent requests: one commit per inquiry vs the journaled group commit."""
+    import statistics
+    import tempfile
+    import threading
+    import uuid
+    from django.db import OperationalError, close_old_connections
+    from django.utils import timezone
+    from . import inquiries
+    from .models import Contact, Listing
+
+    seed_listings(20)
+    listing_ids = list(Listing.objects.values_list('id', flat=True))
+    threads = 8
+    per_thread = max(1, rows // threads)
+
+    def record(i):
+        return {
+            'submission_id': uuid.uuid4().hex,
+            'submitted_at': timezone.now().isoformat(),
+            'listing_id': listing_ids[i % len(listing_ids)],
+            'listing_title': 'Bench listing',
+            'name': 'Buyer', 'email': f'buyer{i}@example.com', 'phone': '9999999999',
+            'message': 'Is this still available?', 'user_id': None, 'dashboard_url': 'http://testserver/properties/',
+        }
+
+    def run(accept):
+        latencies, failures = [], []
+        barrier = threading.Barrier(threads)
+
+        def worker(offset):
+            close_old_connections()
+            barrier.wait()
+            for i in range(offset, offset + per_thread):
+                start = time.perf_counter()
+                try:
+                    accept(record(i))
+                except OperationalError:
+                    # SQLite gave up waiting for the write lock
+                    failures.append(i)
+                    continue
+                latencies.append(time.perf_counter() - start)
+            connection.close()
+
+        workers = [threading.Thread(target=worker, args=(n * per_thread,)) for n in range(threads)]
+        start = time.perf_counter()
+        for worker_thread in workers:
+            worker_thread.start()
+        for worker_thread in workers:
+            worker_thread.join()
+        return start, latencies, len(failures)
+
+    lines = [f'inquiries:            {threads * per_thread} from {threads} threads ({connection.vendor}, on disk)']
+
+    before = Contact.objects.count()
+    start, latencies, failed = run(lambda item: inquiries.commit([item]))
+    elapsed = time.perf_counter() - start
+    results = [('per request', elapsed, latencies, Contact.objects.count() - before, failed)]
+
+    with tempfile.TemporaryDirectory() as journal:
+        buffer = inquiries.InquiryBuffer(directory=journal)
+        before = Contact.objects.count()
+        start, latencies, failed = run(buffer.submit)
+        while buffer.pending():
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        results.append(('group commit', elapsed, latencies, Contact.objects.count() - before, failed))
+
+    # Throughput counts inquiries stored, i.e. committed, not just acknowledged
+    baseline = results[0][3] / results[0][1]
+    for label, elapsed, latencies, stored, failed in results:
+        latencies.sort()
+        rate = stored / elapsed
+        lines.append(
+            f'{label + ":":<14} {rate:>8,.0f} inquiries/s ({rate / baseline:4.1f}x)   '
+            f'ack p50 {statistics.median(latencies) * 1000:6.2f} ms  p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms   '
+            f'{stored} stored, {failed} failed'
+        )
+    return lines
+
+
+bench_inquiries.on_disk = True
+
+
+SUITES = {
+    'api': bench_api,
+    'similar': bench_similar,
+    'ratelimit': bench_ratelimit,
+    'cards': bench_cards,
+    'streaming': bench_streaming,
+    'cache': bench_cache,
+    'summaries': bench_summaries,
+    'inquiries': bench_inquiries,
+}
@@ -0,0 +1,61 @@
+"""Set-based listing updates.
+
+queryset.update() skips Listing.save(), so it also skips everything that
+hangs off a save. update_listings() runs one UPDATE per chunk of ids and
+then does those things itself:
+- logs a change row per listing
+- bumps updated_at and marks the rank score stale
+- invalidates detail caches, the home page sections and the similar-listings index
+- queues saved-search alerts for newly published listings
+
+reorder_images() does the same for PropertyImage.objects.reorder().
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import alerts
+from .models import Listing, ListingChange, PropertyImage
+from .similar import bump_version as bump_similar_version
+from .viewmodels import invalidate_featured_sections, invalidate_listing_detail
+
+CHUNK_SIZE = 500
+
+
+def update_listings(queryset, **values):
+    """Apply `values` to the listings in `queryset`; returns how many changed."""
+    # Listings that already have every value are left alone and not logged
+    ids = list(queryset.exclude(**values).values_list('id', flat=True))
+    if not ids:
+        return 0
+
+    if 'is_published' in values:
+        action = ListingChange.PUBLISH if values['is_published'] else ListingChange.UNPUBLISH
+    else:
+        action = ListingChange.UPDATE
+
+    now = timezone.now()
+    with transaction.atomic():
+        newly_published = []
+        if values.get('is_published'):
+            newly_published = list(Listing.objects.filter(id__in=ids, is_published=False))
+        for start in range(0, len(ids), CHUNK_SIZE):
+            chunk = ids[start:start + CHUNK_SIZE]
+            Listing.objects.filter(id__in=chunk).update(**values, updated_at=now, ranked_at=None)
+            ListingChange.record_many(chunk, action, values)
+        for listing in newly_published:
+            listing.is_published = True
+            alerts.listing_published(listing)
+
+    # After the caller's transaction too, if there is one: see signals.py
+    transaction.on_commit(lambda: invalidate_listing_detail(*ids))
+    transaction.on_commit(invalidate_featured_sections)
+    bump_similar_version()
+    return len(ids)
+
+
+def reorder_images(listing_id, image_ids):
+    """PropertyImage.objects.reorder(), then drop the caches that show the images or the cover."""
+    PropertyImage.objects.reorder(listing_id, image_ids)
+    transaction.on_commit(lambda: invalidate_listing_detail(listing_id))
+    # Summary cards show the cover
+    transaction.on_commit(invalidate_featured_sections)
@@ -0,0 +1,285 @@
+"""Two-level cache for expensive view data.
+
+L1 is a small LRU in each process with a short TTL. L2 is a shared
+Django cache alias (CACHE_BACKEND in settings: file or redis in
+production, locmem in development and tests), so a key built by one
+worker is warm in all of them and survives restarts.
+
+`layered.get_or_set(key, build, ttl, stale)`:
+- fresh values come from L1, then L2
+- a value past `ttl` but within `stale` more seconds is returned as-is
+  while one background thread rebuilds it (stale-while-revalidate)
+- on a miss only one caller builds: threads of the same process wait for
+  it, other processes wait on a lock key in L2 and read the result
+  (single-flight)
+
+Values are shared between requests through L1 and must be treated as
+read-only. `None` is never cached. Deleting a key clears L2 and this
+process's L1; other processes drop their L1 copy within L1_TTL.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+L2_ALIAS = getattr(settings, 'LAYERED_CACHE_ALIAS', 'default')
+L1_MAX_ENTRIES = getattr(settings, 'LAYERED_CACHE_L1_MAX_ENTRIES', 512)
+# Upper bound on how long another process's invalidation can go unseen
+L1_TTL = getattr(settings, 'LAYERED_CACHE_L1_TTL', 5)
+# Rebuild stale values in a worker thread; off, the request that finds them rebuilds inline
+BACKGROUND_REVALIDATE = getattr(settings, 'LAYERED_CACHE_BACKGROUND_REVALIDATE', True)
+
+KEY_PREFIX = 'layered:'
+# A builder that takes longer than this loses its lock and may be duplicated
+LOCK_TIMEOUT = 30
+LOCK_POLL_INTERVAL = 0.05
+
+COUNTERS = ('l1_hits', 'l2_hits', 'stale_hits', 'misses', 'coalesced', 'builds', 'revalidations', 'errors')
+
+
+class LRU:
+    """Thread-safe LRU of key -> (entry, expires_at), bounded by entry count."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[1] <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key, entry, expires_at):
+        with self._lock:
+            self._data[key] = (entry, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Flight:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LayeredCache:
+
+    def __init__(self, alias=L2_ALIAS, l1_max_entries=L1_MAX_ENTRIES, l1_ttl=L1_TTL):
+        self.alias = alias
+        self.l1 = LRU(l1_max_entries)
+        self.l1_ttl = l1_ttl
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._counts = dict.fromkeys(COUNTERS, 0)
+        self._counts_lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def l2(self):
+        return caches[self.alias]
+
+    def _count(self, name):
+        with self._counts_lock:
+            self._counts[name] += 1
+
+    def _store_l1(self, key, entry, now):
+        # entry is (value, fresh_until, stale_until)
+        self.l1.set(key, entry, min(now + self.l1_ttl, entry[2]))
+
+    def get_or_set(self, key, build, ttl, stale=0):
+        """Return the cached value for `key`, calling `build()` when there is none."""
+        key = KEY_PREFIX + key
+        now = time.time()
+        entry = self.l1.get(key, now)
+        if entry is not None and now < entry[1]:
+            self._count('l1_hits')
+            return entry[0]
+
+        # Missing or stale in L1: another process may have rebuilt it already
+        entry = self.l2.get(key)
+        if entry is not None:
+            self._store_l1(key, entry, now)
+            if now < entry[1]:
+                self._count('l2_hits')
+                return entry[0]
+            if now < entry[2]:
+                self._count('stale_hits')
+                self._revalidate(key, build, ttl, stale)
+                return entry[0]
+
+        self._count('misses')
+        return self._build_once(key, build, ttl, stale)
+
+    def set(self, key, value, ttl, stale=0):
+        self._set(KEY_PREFIX + key, value, ttl, stale)
+
+    def _set(self, key, value, ttl, stale):
+        if value is None:
+            return
+        now = time.time()
+        entry = (value, now + ttl, now + ttl + stale)
+        self.l2.set(key, entry, ttl + stale)
+        self._store_l1(key, entry, now)
+
+    def delete(self, *keys):
+        keys = [KEY_PREFIX + key for key in keys]
+        for key in keys:
+            self.l1.delete(key)
+        self.l2.delete_many(keys)
+
+    def clear_local(self):
+        """Drop this process's L1 and counters (L2 is left alone)."""
+        self.l1.clear()
+        with self._counts_lock:
+            self._counts = dict.fromkeys(COUNTERS, 0)
+
+    def _build_once(self, key, build, ttl, stale):
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.value is not None:
+                self._count('coalesced')
+                return flight.value
+            # The flight was a revalidation that did not get the lock
+            return self._build_shared(key, build, ttl, stale)
+
+        try:
+            flight.value = self._build_shared(key, build, ttl, stale)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _build_shared(self, key, build, ttl, stale):
+        lock_key = key + ':lock'
+        if not self.l2.add(lock_key, 1, LOCK_TIMEOUT):
+            # Another process is building it: wait for its result instead
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                entry = self.l2.get(key)
+                if entry is not None and time.time() < entry[1]:
+                    self._count('coalesced')
+                    self._store_l1(key, entry, time.time())
+                    return entry[0]
+                if self.l2.add(lock_key, 1, LOCK_TIMEOUT):
+                    break
+            else:
+                # The holder is stuck; build without the lock rather than fail
+                return self._build(key, build, ttl, stale)
+        try:
+            return self._build(key, build, ttl, stale)
+        finally:
+            self.l2.delete(lock_key)
+
+    def _build(self, key, build, ttl, stale):
+        self._count('builds')
+        value = build()
+        self._set(key, value, ttl, stale)
+        return value
+
+    def _revalidate(self, key, build, ttl, stale):
+        with self._flights_lock:
+            if key in self._flights:
+                return
+            flight = self._flights[key] = _Flight()
+
+        def run():
+            try:
+                lock_key = key + ':lock'
+                # Only one process rebuilds; the others keep serving stale
+                if self.l2.add(lock_key, 1, LOCK_TIMEOUT):
+                    try:
+                        self._count('revalidations')
+                        flight.value = build()
+                        self._set(key, flight.value, ttl, stale)
+                    finally:
+                        self.l2.delete(lock_key)
+            except Exception:
+                self._count('errors')
+                logger.exception('Revalidating %s failed', key)
+            finally:
+                with self._flights_lock:
+                    del self._flights[key]
+                flight.done.set()
+
+        if BACKGROUND_REVALIDATE:
+            self.submit(run)
+        else:
+            run()
+
+    def submit(self, fn):
+        """Run `fn` on the background worker threads, with their own DB connections."""
+        if self._executor is None:
+            with self._flights_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-revalidate')
+
+        def task():
+            # Worker threads get their own DB connection; don't leak it
+            close_old_connections()
+            try:
+                fn()
+            finally:
+                close_old_connections()
+
+        self._executor.submit(task)
+
+    def stats(self):
+        """Per-process counters and hit ratios for each layer."""
+        with self._counts_lock:
+            counts = dict(self._counts)
+        lookups = counts['l1_hits'] + counts['l2_hits'] + counts['stale_hits'] + counts['misses']
+        l2_lookups = lookups - counts['l1_hits']
+        return {
+            **counts,
+            'lookups': lookups,
+            'l1_entries': len(self.l1),
+            'l1_hit_ratio': counts['l1_hits'] / lookups if lookups else None,
+            'l2_hit_ratio': (counts['l2_hits'] + counts['stale_hits']) / l2_lookups if l2_lookups else None,
+            'overall_hit_ratio': (lookups - counts['misses']) / lookups if lookups else None,
+            'l2_backend': type(self.l2).__name__,
+        }
+
+
+layered = LayeredCache()
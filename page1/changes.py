@@ -0,0 +1,38 @@
+"""Incremental change feed over ListingChange.
+
+Consumers keep the id of the last change they processed and ask for
+everything after it. The cursor is the ListingChange primary key: rows
+are appended in the same transaction as the listing mutation, and
+SQLite serializes writers, so ids become visible in order.
+
+Served at GET /api/v1/changes/?since=<id> and tailed by
+`manage.py tail_changes`.
+"""
+from .models import ListingChange
+
+CHANGE_FIELDS = ('id', 'listing_id', 'action', 'fields', 'changed_at')
+
+
+def latest_change_id():
+    return ListingChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def changes_since(since, limit=100):
+    """Return (changes, next_since, has_more) for changes with id > since, oldest first."""
+    rows = list(
+        ListingChange.objects.filter(id__gt=since)
+        .order_by('id')
+        .values_list(*CHANGE_FIELDS)[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    changes = [dict(zip(CHANGE_FIELDS, row)) for row in rows[:limit]]
+    next_since = changes[-1]['id'] if changes else since
+    return changes, next_since, has_more
+
+
+def changed_listing_ids(since, limit=1000):
+    """Distinct listing ids touched after `since`, plus the cursor to resume from.
+
+    For caches and indexes that only need to know what to refresh."""
+    changes, next_since, has_more = changes_since(since, limit)
+    return list(dict.fromkeys(change['listing_id'] for change in changes)), next_since, has_more
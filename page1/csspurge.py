@@ -0,0 +1,144 @@
+"""Remove CSS rules whose selectors can never match the site's markup.
+
+Used by storage.CompressedManifestStaticFilesStorage while running
+collectstatic. Every word-like token in the templates, forms and app
+JavaScript counts as "used". This over-approximates class names, so a
+rule is only dropped when one of its class or id selectors appears
+nowhere in the source. Classes that Bootstrap's JavaScript adds at
+runtime are never in the source and are kept by SAFELIST.
+"""
+import re
+from pathlib import Path
+
+TOKEN_RE = re.compile(r'[A-Za-z_][\w-]*')
+SELECTOR_NAME_RE = re.compile(r'[.#](-?[A-Za-z_][\w-]*)')
+# Attribute values and :not() arguments never have to be present for a match
+IGNORED_SELECTOR_PARTS_RE = re.compile(r'\[[^\]]*\]|:not\([^)]*\)')
+
+# Classes bootstrap.bundle.js toggles itself, and the alert-{{ message.tags }} family
+SAFELIST = {
+    'show', 'showing', 'hiding', 'fade', 'active', 'disabled', 'collapse', 'collapsing',
+    'collapse-horizontal', 'modal-open', 'modal-backdrop', 'modal-static', 'offcanvas-backdrop',
+    'dropdown-menu-end', 'dropdown-menu-start', 'was-validated', 'is-valid', 'is-invalid',
+}
+SAFELIST_PREFIXES = ('alert-', 'carousel-', 'tooltip', 'popover', 'bs-', 'bd-', 'toast')
+
+# At-rules whose block holds further rules; everything else (@keyframes,
+# @font-face, ...) is kept verbatim
+NESTED_AT_RULES = ('@media', '@supports', '@layer', '@container')
+
+
+def collect_tokens(paths):
+    """Every identifier-like token in the files under `paths`."""
+    tokens = set()
+    for path in paths:
+        path = Path(path)
+        files = path.rglob('*') if path.is_dir() else [path]
+        for file in files:
+            if file.is_file() and file.suffix in ('.html', '.py', '.js', '.txt'):
+                tokens.update(TOKEN_RE.findall(file.read_text(encoding='utf-8', errors='ignore')))
+    return tokens
+
+
+def _is_used(name, used, safelist):
+    return name in used or (safelist and (name in SAFELIST or name.startswith(SAFELIST_PREFIXES)))
+
+
+def _selector_names(selector):
+    return SELECTOR_NAME_RE.findall(IGNORED_SELECTOR_PARTS_RE.sub('', selector))
+
+
+def _split_top_level(text, sep=','):
+    """Split on `sep` outside brackets, parentheses and strings."""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote and text[i - 1] != '\\':
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _skip_string(css, i):
+    quote = css[i]
+    i += 1
+    while i < len(css) and css[i] != quote:
+        i += 2 if css[i] == '\\' else 1
+    return i + 1
+
+
+def _block_end(css, i):
+    """Index just past the '}' matching the '{' at css[i]."""
+    depth = 0
+    while i < len(css):
+        ch = css[i]
+        if ch in '"\'':
+            i = _skip_string(css, i)
+            continue
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _rules(css):
+    """Yield (prelude, body) for each top-level rule; body is None for statements like @charset."""
+    i, n = 0, len(css)
+    while i < n:
+        if css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        if css[i].isspace():
+            i += 1
+            continue
+        start = i
+        while i < n and css[i] not in '{;}':
+            i = _skip_string(css, i) if css[i] in '"\'' else i + 1
+        if i >= n or css[i] != '{':
+            # @charset/@import statement, or a stray '}'
+            yield css[start:i].strip(), None
+            i += 1
+            continue
+        end = _block_end(css, i)
+        yield css[start:i].strip(), css[i + 1:end - 1]
+        i = end
+
+
+def purge_css(css, used, safelist=True):
+    """Return `css` without the rules whose selectors reference unused names.
+
+    `safelist=False` also drops the runtime-only classes, for critical CSS
+    that only has to cover the first paint."""
+    out = []
+    for prelude, body in _rules(css):
+        if body is None:
+            if prelude.startswith('@'):
+                out.append(prelude + ';')
+        elif prelude.startswith(NESTED_AT_RULES):
+            inner = purge_css(body, used, safelist)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            out.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [
+                selector for selector in _split_top_level(prelude)
+                if all(_is_used(name, used, safelist) for name in _selector_names(selector))
+            ]
+            if selectors:
+                out.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(out)
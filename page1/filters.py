@@ -0,0 +1,38 @@
+from .models import Listing
+
+
+def _int_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def filter_listings(params, qs=None):
+    """Apply the album search filters (keyword, city, bedrooms, max_price).
+
+    `params` is any mapping such as request.GET. Shared by the HTML pages
+    and the JSON API so both always agree on what a search matches."""
+    if qs is None:
+        qs = Listing.objects.filter(is_published=True)
+
+    keyword = params.get('keyword')
+    if keyword:
+        qs = qs.filter(title__icontains=keyword)
+
+    city = params.get('city')
+    if city:
+        qs = qs.filter(city__icontains=city)
+
+    bedrooms = _int_param(params, 'bedrooms')
+    if bedrooms is not None:
+        qs = qs.filter(bedrooms__gte=bedrooms)
+
+    max_price = _int_param(params, 'max_price')
+    if max_price is not None:
+        qs = qs.filter(price__lte=max_price)
+
+    return qs
@@ -82,7 +82,11 @@ class ListingForm(forms.ModelForm):
 
     class Meta:
         model = Listing
-        exclude = ['realtor', 'is_published', 'list_date', 'photo_main']
+        # is_featured is curated by staff in the admin, not self-service
+        exclude = [
+            'realtor', 'is_published', 'list_date', 'photo_main', 'is_featured',
+            'rank_score', 'ranked_at', 'is_deleted', 'deleted_at',
+        ]
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'address': forms.TextInput(attrs={'class': 'form-control'}),
@@ -96,7 +100,6 @@ class ListingForm(forms.ModelForm):
             'garage': forms.NumberInput(attrs={'class': 'form-control'}),
             'sqft': forms.NumberInput(attrs={'class': 'form-control'}),
             'lot_size': forms.NumberInput(attrs={'class': 'form-control'}),
-            'is_featured': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
 
@@ -0,0 +1,257 @@
+"""Resized PropertyImage variants, served at `/img/<id>/<w>x<h>.<fmt>`.
+
+A variant is generated from the original upload on its first request. It
+is fitted inside w x h, keeps its aspect ratio and is stored under
+IMAGE_VARIANT_ROOT as `<image id>/<w>x<h>-<source token>.<fmt>`. The token
+is a hash of the original's file name, so replacing the upload yields new
+variants. Only the sizes in IMAGE_VARIANT_SIZES and the formats in
+VARIANT_FORMATS are served; anything else is a 404, so a client cannot fill
+the disk with arbitrary sizes.
+
+The variant directory is a bounded LRU cache:
+- a hit bumps the file's mtime, at most once per TOUCH_INTERVAL
+- `VariantCache.evict` deletes the least recently used files until the
+  total is back under IMAGE_VARIANT_MAX_BYTES; it runs every EVICT_EVERY
+  generated variants and as a scheduled job
+- variants of deleted images are removed when the image row goes
+  (signals.py), and `sweep` removes those whose image no longer exists
+
+With IMAGE_SENDFILE set to 'x-accel-redirect' (nginx) or 'x-sendfile'
+(Apache, lighttpd) the response only names the file, and the web server
+sends the bytes.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+VARIANT_ROOT = Path(getattr(settings, 'IMAGE_VARIANT_ROOT', Path(settings.MEDIA_ROOT) / 'image_variants'))
+VARIANT_SIZES = frozenset(
+    tuple(size) for size in getattr(settings, 'IMAGE_VARIANT_SIZES', [(160, 120), (320, 240), (640, 480), (1280, 960)])
+)
+MAX_BYTES = getattr(settings, 'IMAGE_VARIANT_MAX_BYTES', 512 * 1024 * 1024)
+SENDFILE = getattr(settings, 'IMAGE_SENDFILE', None)
+# nginx: `location /_variants/ { internal; alias <IMAGE_VARIANT_ROOT>/; }`
+ACCEL_REDIRECT_PREFIX = getattr(settings, 'IMAGE_ACCEL_REDIRECT_PREFIX', '/_variants/')
+CACHE_MAX_AGE = getattr(settings, 'IMAGE_VARIANT_MAX_AGE', 60 * 60 * 24)
+
+# extension -> (Pillow format, content type, save options)
+VARIANT_FORMATS = {
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+}
+# Evicting after a fill to this fraction of MAX_BYTES leaves room before the next run
+EVICT_TARGET = 0.9
+EVICT_EVERY = 200
+TOUCH_INTERVAL = 60 * 60
+
+
+def source_token(source_name):
+    return hashlib.sha1(source_name.encode()).hexdigest()[:12]
+
+
+def variant_name(image_id, source_name, width, height, fmt):
+    return f'{image_id}/{width}x{height}-{source_token(source_name)}.{fmt}'
+
+
+def variant_etag(image_id, source_name, width, height, fmt):
+    return f'"{image_id}-{width}x{height}-{source_token(source_name)}.{fmt}"'
+
+
+def variant_url(image_id, width, height, fmt='jpg'):
+    return reverse('image_variant', args=[image_id, width, height, fmt])
+
+
+def is_allowed(width, height, fmt):
+    return (width, height) in VARIANT_SIZES and fmt in VARIANT_FORMATS
+
+
+class UnusableSource(Exception):
+    """The original can't be turned into a variant (over Pillow's pixel limit)."""
+
+
+def render_variant(source, target, width, height, fmt):
+    """Write `source` fitted inside width x height to `target`, atomically."""
+    # Pillow is imported on the first variant, not when a worker boots
+    from PIL import Image, ImageOps
+
+    pil_format, _, options = VARIANT_FORMATS[fmt]
+    try:
+        with Image.open(source) as original:
+            # JPEG sources are decoded at the smallest scale still >= the target size
+            original.draft('RGB', (width, height))
+            img = ImageOps.exif_transpose(original)
+            img.thumbnail((width, height), Image.Resampling.LANCZOS)
+    except Image.DecompressionBombError as e:
+        # Not an OSError; Pillow raises it for originals over MAX_IMAGE_PIXELS
+        raise UnusableSource(str(e)) from e
+    if img.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.convert('RGBA').split()[3])
+        img = background
+    temp = target.with_name(f'.{target.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        img.save(temp, format=pil_format, **options)
+        os.replace(temp, target)
+    finally:
+        if temp.exists():
+            temp.unlink()
+
+
+class VariantCache:
+    """Disk cache of generated variants, bounded by total size."""
+
+    def __init__(self, root=VARIANT_ROOT, max_bytes=MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._generated = 0
+
+    def get(self, image_id, source_name, source_path, width, height, fmt):
+        """Path of the variant, generating it on a miss."""
+        path = self.root / variant_name(image_id, source_name, width, height, fmt)
+        if self._hit(path):
+            return path
+        # One render per variant in this process; other processes may race, os.replace keeps that safe
+        with self._locks_lock:
+            lock = self._locks.setdefault(path, threading.Lock())
+        with lock:
+            try:
+                if not self._hit(path):
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    render_variant(source_path, path, width, height, fmt)
+                    self._generated += 1
+                    if self._generated % EVICT_EVERY == 0:
+                        from .cache import layered
+                        layered.submit(self.evict)
+            finally:
+                with self._locks_lock:
+                    self._locks.pop(path, None)
+        return path
+
+    def _hit(self, path):
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        now = time.time()
+        if now - mtime > TOUCH_INTERVAL:
+            # mtime is the recency eviction goes by; bumped sparingly to keep hits read-only
+            try:
+                os.utime(path, (now, now))
+            except FileNotFoundError:
+                return False
+        return True
+
+    def _files(self):
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def size(self):
+        return sum(size for _, size, _ in self._files())
+
+    def evict(self, max_bytes=None):
+        """Delete least recently used variants while over budget. Returns (files, bytes)."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        files = list(self._files())
+        total = sum(size for _, size, _ in files)
+        if total <= max_bytes:
+            return 0, 0
+        removed = freed = 0
+        for path, size, _ in sorted(files, key=lambda item: item[2]):
+            if total <= max_bytes * EVICT_TARGET:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+            freed += size
+        self._remove_empty_dirs()
+        logger.info('Evicted %d image variant(s), %d bytes', removed, freed)
+        return removed, freed
+
+    def remove_image(self, image_id):
+        """Delete every variant of one image."""
+        shutil.rmtree(self.root / str(image_id), ignore_errors=True)
+
+    def sweep(self, image_ids):
+        """Delete the variants of images not in `image_ids`. Returns (files, bytes)."""
+        live = {str(image_id) for image_id in image_ids}
+        removed = freed = 0
+        if not self.root.is_dir():
+            return 0, 0
+        for entry in os.scandir(self.root):
+            if not entry.is_dir() or entry.name in live:
+                continue
+            for directory, _, names in os.walk(entry.path):
+                for name in names:
+                    try:
+                        freed += os.stat(os.path.join(directory, name)).st_size
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+            shutil.rmtree(entry.path, ignore_errors=True)
+        return removed, freed
+
+    def _remove_empty_dirs(self):
+        if not self.root.is_dir():
+            return
+        for entry in os.scandir(self.root):
+            if entry.is_dir():
+                try:
+                    os.rmdir(entry.path)
+                except OSError:
+                    pass  # not empty
+
+
+variants = VariantCache()
+
+
+def serve_variant(image_id, source_name, source_path, width, height, fmt, etag):
+    """Response for a variant, generated if needed.
+
+    Eviction can delete the file between get() and the open; it is then
+    generated once more."""
+    for attempt in range(2):
+        path = variants.get(image_id, source_name, source_path, width, height, fmt)
+        try:
+            return variant_response(path, fmt, etag)
+        except FileNotFoundError:
+            if attempt:
+                raise
+
+
+def variant_response(path, fmt, etag):
+    """Response for a variant file; the web server sends the bytes when IMAGE_SENDFILE is set."""
+    content_type = VARIANT_FORMATS[fmt][1]
+    if SENDFILE == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = ACCEL_REDIRECT_PREFIX + path.relative_to(variants.root).as_posix()
+    elif SENDFILE == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = str(path)
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={CACHE_MAX_AGE}'
+    return response
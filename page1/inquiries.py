@@ -0,0 +1,374 @@
+"""Group-committed ingestion of contact_agent inquiries.
+
+On SQLite every commit is an fsync under the one database write lock, so
+one transaction per inquiry caps how many inquiries a burst can take in.
+Instead, `submit` only appends the inquiry to a local journal and returns
+its submission id. A flusher thread then writes everything pending with one
+`bulk_create` every INQUIRY_FLUSH_INTERVAL seconds, or sooner once
+INQUIRY_BATCH_SIZE inquiries are waiting. The realtor emails go out after
+that commit.
+
+Durability: `submit` returns only after the journal line is fsynced.
+Concurrent submitters share one fsync (group commit): whoever takes the
+sync lock first syncs everything written so far. Each process writes to its
+own segment file under INQUIRY_JOURNAL_DIR and holds an flock on it. A
+segment is created under a temporary name and gets its journal name only
+once it is locked. At every flush the segment is rotated, and it is deleted
+once its inquiries are committed. Segments left behind by a crashed process
+are unlocked, and `recover` replays them. Contact.submission_id is unique,
+so a replay never duplicates an inquiry that was already committed.
+
+Inquiries for a listing that was reaped before they were committed can't be
+stored; they are logged and kept in DEAD_LETTER_NAME in the journal
+directory.
+"""
+import atexit
+import fcntl
+import itertools
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import analytics
+from .models import Contact, Listing
+from .viewmodels import get_listing_detail
+
+logger = logging.getLogger(__name__)
+
+INQUIRY_BUFFERING = getattr(settings, 'INQUIRY_BUFFERING', True)
+FLUSH_INTERVAL = getattr(settings, 'INQUIRY_FLUSH_INTERVAL', 0.02)
+BATCH_SIZE = getattr(settings, 'INQUIRY_BATCH_SIZE', 200)
+JOURNAL_DIR = Path(getattr(settings, 'INQUIRY_JOURNAL_DIR', Path(settings.BASE_DIR) / '.journal'))
+
+SEGMENT_GLOB = 'inquiries-*.jsonl'
+DEAD_LETTER_NAME = 'dead-letter.jsonl'
+RECORD_FIELDS = ('listing_id', 'listing_title', 'name', 'email', 'phone', 'message', 'user_id')
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class Segment:
+    """One journal file, exclusively locked by the process writing it."""
+
+    _numbers = itertools.count()
+
+    def __init__(self, directory):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f'inquiries-{os.getpid()}-{uuid.uuid4().hex[:8]}-{next(self._numbers)}.jsonl'
+        # Until it is locked, `recover` could take the file for a dead process's:
+        # open and lock it under a name SEGMENT_GLOB doesn't match, then rename
+        new_path = self.path.with_name(self.path.name + '.new')
+        self.file = open(new_path, 'ab')
+        fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.rename(new_path, self.path)
+        # The new directory entry must survive a crash too
+        _fsync_dir(directory)
+
+    def append(self, record):
+        self.file.write(json.dumps(record, separators=(',', ':')).encode() + b'\n')
+        self.file.flush()
+
+    def sync(self):
+        os.fsync(self.file.fileno())
+
+    def remove(self):
+        self.path.unlink(missing_ok=True)
+        self.file.close()
+
+
+def read_segment(path):
+    """Records of a journal file; a torn last line from a crash mid-write is skipped."""
+    records = []
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning('Skipping a torn line in %s', path)
+    return records
+
+
+def commit(records, directory=JOURNAL_DIR):
+    """Insert the inquiries not yet stored, then count them and email the realtors.
+
+    Inquiries whose listing is gone go to the dead-letter file in `directory`.
+    Returns the number of new Contact rows."""
+    if not records:
+        return 0
+    ids = [record['submission_id'] for record in records]
+    listing_ids = {record['listing_id'] for record in records}
+    # Read outside the write transaction: on SQLite a transaction that reads
+    # and then writes can fail with "database is locked" instead of waiting
+    stored = set(Contact.objects.filter(submission_id__in=ids).values_list('submission_id', flat=True))
+    existing = set(Listing.all_objects.filter(id__in=listing_ids).values_list('id', flat=True))
+    new, orphaned = [], []
+    for record in records:
+        if record['submission_id'] in stored:
+            continue
+        (new if record['listing_id'] in existing else orphaned).append(record)
+    if orphaned:
+        # The listing was reaped between submission and commit
+        dead_letter(orphaned, directory)
+    # ignore_conflicts: a concurrent replay of the same journal may have inserted some already
+    Contact.objects.bulk_create(
+        [
+            Contact(
+                submission_id=record['submission_id'],
+                contact_date=parse_datetime(record['submitted_at']),
+                **{field: record[field] for field in RECORD_FIELDS},
+            )
+            for record in new
+        ],
+        ignore_conflicts=True,
+    )
+    for record in new:
+        analytics.record_inquiry(record['listing_id'])
+    notify(new)
+    return len(new)
+
+
+def dead_letter(records, directory=JOURNAL_DIR):
+    """Keep inquiries that can't be stored in the dead-letter file of the journal."""
+    for record in records:
+        logger.warning(
+            'Inquiry %s from %s for listing %s not stored: the listing no longer exists',
+            record['submission_id'], record['email'], record['listing_id'],
+        )
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / DEAD_LETTER_NAME, 'ab') as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(',', ':')).encode() + b'\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def inquiry_email(record, detail):
+    listing, realtor = detail['listing'], detail['realtor']
+    message_body = f"""
+New Property Inquiry
+
+A potential buyer has shown interest in your property listing.
+
+--- PROPERTY DETAILS ---
+Title: {listing['title']}
+Address: {listing['address']}, {listing['city']}, {listing['state']} {listing['zipcode']}
+Price: ₹{listing['price']:,}
+Bedrooms: {listing['bedrooms']}
+Bathrooms: {listing['bathrooms']}
+Garage: {listing['garage']}
+Square Feet: {listing['sqft']}
+Lot Size: {listing['lot_size']} acres
+
+--- BUYER INFORMATION ---
+Name: {record['name']}
+Email: {record['email']}
+Phone: {record['phone']}
+
+--- MESSAGE ---
+{record['message'] if record['message'] else '(No message provided)'}
+
+---
+To view this inquiry and respond, visit your dashboard at:
+{record['dashboard_url']}
+"""
+    return EmailMessage(
+        subject=f"New Inquiry for Property: {listing['title']}",
+        body=message_body,
+        from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+        to=[realtor['email']],
+    )
+
+
+def notify(records):
+    """Email each realtor about their new inquiries, over one mail connection."""
+    messages = []
+    for record in records:
+        # The cached detail view model has every field the email needs
+        detail = get_listing_detail(record['listing_id'])
+        if detail is not None:
+            messages.append(inquiry_email(record, detail))
+    if not messages:
+        return
+    logger.info('Sending %d inquiry email(s) using backend=%s', len(messages), getattr(settings, 'EMAIL_BACKEND', 'not-set'))
+    try:
+        get_connection().send_messages(messages)
+    except Exception:
+        # The inquiries are stored; the realtor still sees them on the dashboard
+        logger.exception('Error sending inquiry emails')
+
+
+class InquiryBuffer:
+    """Journaled, group-committed queue of inquiries for this process."""
+
+    def __init__(self, directory=JOURNAL_DIR, interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._segment = None
+        self._pending = []
+        self._written = 0
+        self._synced = 0
+        # Rotated segments whose inquiries are not committed yet, with those inquiries
+        self._uncommitted = []
+        self._wake = threading.Event()
+        self._flusher_pid = None
+
+    def submit(self, record):
+        """Journal `record` durably and queue it for the next group commit."""
+        with self._lock:
+            if self._segment is None:
+                self._segment = Segment(self.directory)
+            self._segment.append(record)
+            self._pending.append(record)
+            self._written += 1
+            seq = self._written
+            full = len(self._pending) >= self.batch_size
+        self._sync(seq)
+        self._ensure_flusher()
+        if full:
+            self._wake.set()
+        return record['submission_id']
+
+    def _sync(self, seq):
+        with self._sync_lock:
+            if self._synced >= seq:
+                # Another submitter's fsync already covered this record
+                return
+            with self._lock:
+                segment, written = self._segment, self._written
+            segment.sync()
+            self._synced = written
+
+    def _rotate(self):
+        """Swap in a fresh segment; returns the pending records of the old one."""
+        with self._sync_lock:
+            with self._lock:
+                segment, records = self._segment, self._pending
+                if segment is None:
+                    return
+                self._segment, self._pending = None, []
+                # In the same step, so `pending` always sees the records in one list or the other
+                self._uncommitted.append((segment, records))
+                written = self._written
+            segment.sync()
+            self._synced = written
+
+    def flush(self):
+        """Commit every journaled inquiry of this process. Returns the number of new rows."""
+        with self._flush_lock:
+            self._rotate()
+            with self._lock:
+                uncommitted = list(self._uncommitted)
+            if not uncommitted:
+                return 0
+            records = [record for _, batch in uncommitted for record in batch]
+            try:
+                count = commit(records, self.directory)
+            except Exception:
+                # Kept journaled; the next flush retries them
+                logger.exception('Failed to commit %d inquiries', len(records))
+                return 0
+            for segment, _ in uncommitted:
+                segment.remove()
+            with self._lock:
+                # _rotate, the only writer, runs under _flush_lock too
+                del self._uncommitted[:len(uncommitted)]
+            return count
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending) + sum(len(batch) for _, batch in self._uncommitted)
+
+    def recover(self):
+        """Commit and remove the segments of processes that died before committing them."""
+        recovered = 0
+        for path in sorted(self.directory.glob(SEGMENT_GLOB)):
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            with f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # A live process owns it
+                    continue
+                recovered += commit(read_segment(path), self.directory)
+                path.unlink(missing_ok=True)
+        return recovered
+
+    def _ensure_flusher(self):
+        # A forked worker inherits the buffer but not the thread
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._run, name='inquiry-flusher', daemon=True).start()
+
+    def _run(self):
+        try:
+            self.recover()
+        except Exception:
+            logger.exception('Failed to recover the inquiry journal')
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self.flush():
+                # Don't keep the flusher's connection open while idle
+                connection.close()
+
+
+buffer = InquiryBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        buffer.flush()
+    except Exception:
+        # Whatever is left stays in the journal for the next start
+        pass
+
+
+def submit(listing_id, listing_title, data, user_id=None, dashboard_url=''):
+    """Accept an inquiry (ContactAgentForm.cleaned_data) and return its submission id.
+
+    With INQUIRY_BUFFERING off it is committed, counted and emailed before
+    this returns."""
+    record = {
+        'submission_id': uuid.uuid4().hex,
+        'submitted_at': timezone.now().isoformat(),
+        'listing_id': listing_id,
+        'listing_title': listing_title,
+        'name': data['name'],
+        'email': data['email'],
+        'phone': data['phone'],
+        'message': data.get('message') or '',
+        'user_id': user_id,
+        'dashboard_url': dashboard_url,
+    }
+    if not INQUIRY_BUFFERING:
+        commit([record])
+        return record['submission_id']
+    return buffer.submit(record)
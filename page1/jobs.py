@@ -0,0 +1,101 @@
+"""Periodic jobs run by `manage.py run_scheduler` (see scheduler.py).
+
+Most jobs call the management command that does the same thing by hand,
+and store its output as the run's message.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+
+from . import imageserver, maintenance
+from .scheduler import job
+
+
+def _command(name, **options):
+    out = StringIO()
+    call_command(name, stdout=out, stderr=out, **options)
+    return out.getvalue().strip()
+
+
+@job('*/15 * * * *', jitter=60)
+def rollup_listing_stats():
+    return _command('rollup_listing_stats')
+
+
+@job('*/5 * * * *', jitter=30)
+def rank_listings():
+    return _command('rank_listings')
+
+
+@job('*/10 * * * *', jitter=60)
+def refresh_market_stats():
+    return _command('refresh_market_stats')
+
+
+@job('*/10 * * * *', jitter=60)
+def export_search_index():
+    return _command('export_search_index')
+
+
+@job('*/30 * * * *', jitter=120, timeout=1800)
+def warm_caches():
+    return _command('warm_caches')
+
+
+@job('0 * * * *', jitter=300)
+def send_alert_digests():
+    return _command('send_alert_digests')
+
+
+@job('20 * * * *', jitter=300)
+def clear_sessions():
+    return _command('clearsessions')
+
+
+@job('30 3 * * *', jitter=600)
+def reap_deleted_listings():
+    return _command('reap_deleted_listings', batch_size=500, grace_minutes=60)
+
+
+@job('45 3 * * *', jitter=600)
+def sweep_orphaned_files():
+    files, size = maintenance.sweep_orphaned_files()
+    return f'Removed {files} orphaned file(s), {size / 1024 / 1024:.1f} MiB'
+
+
+@job('50 3 * * *', jitter=600)
+def sweep_image_variants():
+    files, size = maintenance.sweep_image_variants()
+    return f'Removed {files} variant(s) of deleted images, {size / 1024 / 1024:.1f} MiB'
+
+
+@job('5 * * * *', jitter=300)
+def evict_image_variants():
+    files, size = imageserver.variants.evict()
+    return f'Evicted {files} image variant(s), {size / 1024 / 1024:.1f} MiB'
+
+
+@job('0 4 * * *', jitter=600)
+def prune_job_runs():
+    return f'Deleted {maintenance.prune_job_runs()} old job run(s)'
+
+
+@job('*/30 * * * *', jitter=60, timeout=600)
+def sqlite_checkpoint():
+    # Folds the WAL (journal_mode=WAL, on with SQLITE_WAL=True) back into the
+    # database file so it does not grow unbounded; a no-op in rollback mode
+    return maintenance.sqlite_pragma('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+@job('15 4 * * *', jitter=600)
+def sqlite_analyze():
+    # Refreshes the planner statistics (sqlite_stat1) the admin row estimates also read
+    maintenance.sqlite_pragma('ANALYZE')
+    return maintenance.sqlite_pragma('PRAGMA optimize')
+
+
+@job('30 4 * * 0', jitter=600, timeout=3 * 3600)
+def sqlite_vacuum():
+    before = maintenance.sqlite_file_size()
+    maintenance.sqlite_pragma('VACUUM')
+    return f'{before / 1024 / 1024:.1f} MiB -> {maintenance.sqlite_file_size() / 1024 / 1024:.1f} MiB'
@@ -0,0 +1,81 @@
+"""Housekeeping tasks run by the scheduler (see jobs.py)."""
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import imageserver
+from .models import JobRun, Listing, PropertyImage, Realtor
+
+MEDIA_SUBDIRS = ('property_images',)
+# Files younger than this may belong to an upload that has not been saved yet
+ORPHAN_GRACE = timedelta(hours=24)
+JOB_RUN_RETENTION = timedelta(days=getattr(settings, 'JOB_RUN_RETENTION_DAYS', 30))
+
+
+def referenced_files():
+    """Every media name a row still points at."""
+    names = set(PropertyImage.objects.exclude(image='').values_list('image', flat=True))
+    names.update(Listing.all_objects.exclude(photo_main='').values_list('photo_main', flat=True))
+    names.update(Realtor.objects.exclude(photo='').values_list('photo', flat=True))
+    return {os.path.normpath(name) for name in names}
+
+
+def sweep_orphaned_files(grace=ORPHAN_GRACE, dry_run=False):
+    """Delete files under MEDIA_SUBDIRS that no row references. Returns (files, bytes)."""
+    referenced = referenced_files()
+    cutoff = time.time() - grace.total_seconds()
+    removed = freed = 0
+    for subdir in MEDIA_SUBDIRS:
+        top = os.path.join(settings.MEDIA_ROOT, subdir)
+        # Bottom-up, so directories emptied by this sweep are removed too
+        for directory, _, names in os.walk(top, topdown=False):
+            for name in names:
+                path = os.path.join(directory, name)
+                if os.path.relpath(path, settings.MEDIA_ROOT) in referenced:
+                    continue
+                try:
+                    stat = os.stat(path)
+                    if stat.st_mtime > cutoff:
+                        continue
+                    if not dry_run:
+                        os.remove(path)
+                except FileNotFoundError:
+                    continue
+                removed += 1
+                freed += stat.st_size
+            if directory != top and not dry_run:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass  # not empty
+    return removed, freed
+
+
+def sweep_image_variants():
+    """Delete resized variants of images that no longer exist. Returns (files, bytes)."""
+    return imageserver.variants.sweep(PropertyImage.objects.values_list('id', flat=True).iterator())
+
+
+def prune_job_runs(retention=JOB_RUN_RETENTION):
+    deleted, _ = JobRun.objects.filter(started_at__lt=timezone.now() - retention).delete()
+    return deleted
+
+
+def sqlite_pragma(sql):
+    """Run a maintenance statement on SQLite; returns its rows, or None on other databases."""
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        return cursor.fetchall()
+
+
+def sqlite_file_size():
+    if connection.vendor != 'sqlite':
+        return 0
+    name = connection.settings_dict['NAME']
+    return os.path.getsize(name) if os.path.exists(str(name)) else 0
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from page1.benchmarks import SUITES, benchmark_database
+
+
+class Command(BaseCommand):
+    help = 'Run a performance benchmark suite against a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=sorted(SUITES))
+        parser.add_argument('--rows', type=int, default=500, help='Number of synthetic listings to seed')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement (best time is reported)')
+
+    def handle(self, *args, **options):
+        suite = SUITES[options['suite']]
+        with benchmark_database(on_disk=getattr(suite, 'on_disk', False)):
+            lines = suite(rows=options['rows'], repeat=options['repeat'])
+        for line in lines:
+            self.stdout.write(line)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from page1 import startup
+
+
+class Command(BaseCommand):
+    help = 'Check that a cold worker boot does not import the lazily loaded libraries, and report its import time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget-ms', type=float, default=startup.IMPORT_BUDGET_MS,
+            help='Also fail when the total import time is over this many milliseconds',
+        )
+        parser.add_argument('--runs', type=int, default=3, help='Boots to measure (the fastest is kept)')
+        parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to list')
+
+    def handle(self, *args, **options):
+        result = startup.measure_best(options['runs'])
+        budget = options['budget_ms']
+        self.stdout.write(f'import time:  {result.import_ms:.0f} ms' + (f' (budget {budget:.0f} ms)' if budget else ''))
+        self.stdout.write(f'max RSS:      {result.max_rss_kb / 1024:.1f} MiB')
+        self.stdout.write('slowest top-level imports:')
+        for name, cumulative in result.slowest(options['top']):
+            self.stdout.write(f'  {cumulative / 1000:7.1f} ms  {name}')
+        self.stdout.write('project modules:')
+        for name, cumulative in result.slowest(options['top'], prefixes=('page1', 're_market')):
+            self.stdout.write(f'  {cumulative / 1000:7.1f} ms  {name}')
+
+        problems = []
+        loaded = result.lazy_modules_loaded()
+        if loaded:
+            problems.append(f'imported at boot but meant to be lazy: {", ".join(loaded)}')
+        if budget and result.import_ms > budget:
+            problems.append(f'import time {result.import_ms:.0f} ms is over the {budget:.0f} ms budget')
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('No lazily loaded library imported at boot'))
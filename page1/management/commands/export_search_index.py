@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from page1.searchindex import SEARCH_INDEX_ROOT, export
+
+
+class Command(BaseCommand):
+    help = 'Export published listings as static, per-city search index shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(SEARCH_INDEX_ROOT), help='Index directory')
+        parser.add_argument('--force', action='store_true', help='Export even if the index is already current')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        manifest = export(options['output'], force=options['force'])
+        if manifest is None:
+            self.stdout.write('Search index is already current')
+            return
+        shards = manifest['shards']
+        self.stdout.write(
+            f'Exported {sum(shard["count"] for shard in shards)} listing(s) in {len(shards)} shard(s), '
+            f'{sum(shard["bytes"] for shard in shards) / 1024:.1f} KiB, version {manifest["version"]}, '
+            f'in {time.perf_counter() - start:.2f}s'
+        )
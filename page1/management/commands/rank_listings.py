@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from page1.ranking import rank_listings
+
+
+class Command(BaseCommand):
+    help = 'Recompute rank_score for published listings whose score is stale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rescore every published listing')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = rank_listings(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(f'Rescored {count} listing(s) in {time.perf_counter() - start:.2f}s')
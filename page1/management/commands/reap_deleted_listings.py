@@ -0,0 +1,31 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from page1.reaper import reap
+
+
+class Command(BaseCommand):
+    help = 'Hard-delete soft-deleted listings with their images, inquiries and files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Listings to reap in this run')
+        parser.add_argument('--grace-minutes', type=int, default=0, help='Only reap listings deleted at least this long ago')
+        parser.add_argument('--audit-file', help='Also append the JSON audit records to this file')
+
+    def handle(self, *args, **options):
+        grace = timedelta(minutes=options['grace_minutes'])
+        audit_file = open(options['audit_file'], 'a') if options['audit_file'] else None
+        count = 0
+        try:
+            for record in reap(batch_size=options['batch_size'], grace=grace):
+                line = json.dumps(record)
+                self.stdout.write(line)
+                if audit_file:
+                    audit_file.write(line + '\n')
+                count += 1
+        finally:
+            if audit_file:
+                audit_file.close()
+        self.stderr.write(f'Reaped {count} listing(s)')
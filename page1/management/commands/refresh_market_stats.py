@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from page1.market import refresh
+
+
+class Command(BaseCommand):
+    help = 'Refresh per-city/state market statistics from the listing change log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every area instead of only changed ones')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Changes read per query')
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        written, changes = refresh(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(
+            f'Processed {changes} change(s), wrote {written} area(s) in {time.monotonic() - start:.2f}s'
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from page1.inquiries import buffer
+
+
+class Command(BaseCommand):
+    help = 'Commit inquiries left in the journal by worker processes that exited before committing them'
+
+    def handle(self, *args, **options):
+        count = buffer.recover()
+        self.stdout.write(f'Recovered {count} inquiry(ies) from {buffer.directory}')
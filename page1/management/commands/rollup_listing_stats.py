@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from page1 import analytics
+from page1.models import ListingStats
+
+
+class Command(BaseCommand):
+    help = 'Flush buffered listing analytics and roll hourly stats up into daily/weekly rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Recompute buckets touched in the last N days')
+        parser.add_argument(
+            '--keep-hourly-days', type=int, default=35,
+            help='Delete hourly rows older than N days (0 keeps everything)',
+        )
+
+    def handle(self, *args, **options):
+        analytics.buffer.flush()
+
+        since = timezone.now() - timedelta(days=options['days'])
+        for period in (ListingStats.DAY, ListingStats.WEEK):
+            count = analytics.rollup(period, since)
+            self.stdout.write(f'{period}: {count} bucket(s) recomputed')
+
+        if options['keep_hourly_days']:
+            before = analytics.hour_bucket() - timedelta(days=options['keep_hourly_days'])
+            self.stdout.write(f'hour: {analytics.prune_hourly(before)} old row(s) pruned')
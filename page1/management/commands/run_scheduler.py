@@ -0,0 +1,58 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+import page1.jobs  # noqa: F401  registers the jobs
+from page1.models import JobLock, JobRun
+from page1.scheduler import JOBS, SCHEDULER_TICK, SCHEDULER_WORKERS, Scheduler
+
+
+class Command(BaseCommand):
+    help = 'Run the periodic maintenance jobs (page1/jobs.py) on this node'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due now, then exit')
+        parser.add_argument('--run', metavar='JOB', help='Run one job immediately and exit')
+        parser.add_argument('--list', action='store_true', help='Show the jobs, their next run and last outcome')
+        parser.add_argument('--interval', type=float, default=SCHEDULER_TICK, help='Seconds between checks')
+        parser.add_argument('--workers', type=int, default=SCHEDULER_WORKERS, help='Jobs run in parallel')
+
+    def handle(self, *args, **options):
+        scheduler = Scheduler(workers=options['workers'])
+
+        if options['list']:
+            scheduler.sync()
+            self._list()
+            return
+
+        if options['run']:
+            if options['run'] not in JOBS:
+                raise CommandError(f'Unknown job {options["run"]!r}; see --list')
+            status = scheduler.run_now(options['run'])
+            self.stdout.write(f'{options["run"]}: {status or "already running on another node"}')
+            return
+
+        if options['once']:
+            scheduler.sync()
+            started = scheduler.tick()
+            scheduler.shutdown()
+            self.stdout.write(f'Ran {len(started)} job(s): {", ".join(started) or "none due"}')
+            return
+
+        # Finish running jobs on Ctrl-C / SIGTERM instead of abandoning their leases
+        signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+        signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+        self.stdout.write(f'Scheduler {scheduler.node} started with {len(JOBS)} job(s)')
+        scheduler.run_forever(interval=options['interval'])
+
+    def _list(self):
+        locks = {lock.name: lock for lock in JobLock.objects.filter(name__in=JOBS)}
+        now = timezone.now()
+        for name, job in sorted(JOBS.items()):
+            lock = locks.get(name)
+            last = JobRun.objects.filter(job=name).order_by('-started_at').first()
+            running = f' running on {lock.owner}' if lock and lock.locked_until and lock.locked_until > now else ''
+            last_text = f'last {last.status} {last.duration:.1f}s at {timezone.localtime(last.started_at):%Y-%m-%d %H:%M}' if last else 'never run'
+            next_text = f'{timezone.localtime(lock.next_run_at):%Y-%m-%d %H:%M:%S}' if lock and lock.next_run_at else '-'
+            self.stdout.write(f'{name:<24} {str(job.cron):<16} next {next_text}  {last_text}{running}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from page1.alerts import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Email pending saved-search alerts as one digest per user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='Maximum number of alerts to send in one run')
+
+    def handle(self, *args, **options):
+        emails, alerts = send_digests(limit=options['limit'])
+        self.stdout.write(f'Sent {emails} digest email(s) covering {alerts} alert(s)')
@@ -0,0 +1,58 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from page1.changes import changes_since, latest_change_id
+
+
+class Command(BaseCommand):
+    help = 'Print listing changes as JSON lines, optionally following new ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=int, help='Start after this change id (default: the cursor file, else 0)')
+        parser.add_argument('--from-now', action='store_true', help='Skip existing changes and only print new ones')
+        parser.add_argument('--cursor-file', help='Read the start cursor from, and save progress to, this file')
+        parser.add_argument('--follow', '-f', action='store_true', help='Keep polling for new changes')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls with --follow')
+        parser.add_argument('--batch-size', type=int, default=500, help='Changes fetched per query')
+
+    def read_cursor(self, options):
+        if options['since'] is not None:
+            return options['since']
+        if options['from_now']:
+            return latest_change_id()
+        path = options['cursor_file']
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    return int(f.read().strip() or 0)
+            except ValueError:
+                raise CommandError(f'Cursor file {path} does not contain a change id')
+        return 0
+
+    def save_cursor(self, path, cursor):
+        # Write-then-rename so a crash never leaves a truncated cursor behind
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(cursor))
+        os.replace(tmp_path, path)
+
+    def handle(self, *args, **options):
+        cursor = self.read_cursor(options)
+        try:
+            while True:
+                changes, cursor, has_more = changes_since(cursor, options['batch_size'])
+                for change in changes:
+                    self.stdout.write(json.dumps(change, cls=DjangoJSONEncoder))
+                if changes and options['cursor_file']:
+                    self.save_cursor(options['cursor_file'], cursor)
+                if has_more:
+                    continue
+                if not options['follow']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from page1.warming import WARM_CONCURRENCY, warm
+
+
+class Command(BaseCommand):
+    help = 'Precompute the home page, album facets and top listing pages into the shared cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--details', type=int, default=50, help='Top ranked and most viewed listings to warm')
+        parser.add_argument('--cities', type=int, default=5, help='Largest cities whose first album page is warmed')
+        parser.add_argument('--concurrency', type=int, default=WARM_CONCURRENCY, help='Worker threads')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        report = warm(details=options['details'], cities=options['cities'], concurrency=options['concurrency'])
+        for group, (count, wall, summed) in report.items():
+            self.stdout.write(
+                f'{group}: {count} entr{"y" if count == 1 else "ies"} built in {wall:.2f}s wall clock '
+                f'({summed:.2f}s summed across threads)'
+            )
+        self.stdout.write(
+            f'Warmed {sum(count for count, _, _ in report.values())} entries in {time.perf_counter() - start:.2f}s '
+            f'with {options["concurrency"]} worker(s)'
+        )
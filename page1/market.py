@@ -0,0 +1,225 @@
+"""Market statistics per city and per state.
+
+MarketStats rows hold the median, percentile and price-per-sqft figures
+for the published listings of each city (and of each state, city='').
+Pages never aggregate listings themselves. They read the rows through
+an in-process MarketIndex that is reloaded when the refresh job bumps
+VERSION_KEY.
+
+`refresh()` follows the ListingChange feed from its SyncCursor and only
+recomputes the areas of listings that changed since the last run. It
+falls back to a full rebuild when it cannot tell which area a change
+left: a listing that moved city/state, or one that was hard-deleted
+without being soft-deleted first.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.functions import Lower, Trim
+from django.utils import timezone
+
+from .changes import changes_since
+from .models import Listing, ListingChange, MarketStats, SyncCursor
+
+VERSION_KEY = 'market:version'
+CURSOR_NAME = 'market_stats'
+
+# A listing is "below market" when its price per sqft is under this share of the city median
+BELOW_MARKET_RATIO = getattr(settings, 'MARKET_BELOW_RATIO', 0.9)
+# Areas with fewer published listings get no badge and no comparison
+MIN_SAMPLE = getattr(settings, 'MARKET_MIN_SAMPLE', 5)
+# How often a process checks whether the stats were refreshed
+VERSION_CHECK_INTERVAL = 5
+
+
+def area_key(city, state):
+    return (city or '').strip().lower(), (state or '').strip().lower()
+
+
+def percentile(ordered, q):
+    """Linear-interpolated percentile of an already sorted list."""
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(rows):
+    """MarketStats field values for a list of (price, sqft) rows."""
+    prices = sorted(price for price, _ in rows)
+    ppsf = sorted(price / sqft for price, sqft in rows if sqft > 0) or [0.0]
+    return {
+        'listings': len(prices),
+        'median_price': round(percentile(prices, 0.5)),
+        'p25_price': round(percentile(prices, 0.25)),
+        'p75_price': round(percentile(prices, 0.75)),
+        'p90_price': round(percentile(prices, 0.9)),
+        'median_ppsf': percentile(ppsf, 0.5),
+        'p25_ppsf': percentile(ppsf, 0.25),
+        'p75_ppsf': percentile(ppsf, 0.75),
+    }
+
+
+def _published_rows(states=None):
+    qs = Listing.objects.filter(is_published=True)
+    if states is not None:
+        qs = qs.annotate(state_key=Lower(Trim('state'))).filter(state_key__in=states)
+    return qs.values_list('city', 'state', 'price', 'sqft').iterator(chunk_size=2000)
+
+
+def _group(rows):
+    areas = defaultdict(list)
+    for city, state, price, sqft in rows:
+        city, state = area_key(city, state)
+        areas[(city, state)].append((price, sqft))
+        areas[('', state)].append((price, sqft))
+    return areas
+
+
+def _write(areas, stale):
+    """Upsert the `areas` rows and delete the `stale` areas that have no listings left."""
+    now = timezone.now()
+    MarketStats.objects.bulk_create(
+        [MarketStats(city=city, state=state, refreshed_at=now, **summarize(rows)) for (city, state), rows in areas.items()],
+        update_conflicts=True,
+        unique_fields=['city', 'state'],
+        update_fields=[
+            'listings', 'median_price', 'p25_price', 'p75_price', 'p90_price',
+            'median_ppsf', 'p25_ppsf', 'p75_ppsf', 'refreshed_at',
+        ],
+    )
+    for city, state in stale - set(areas):
+        MarketStats.objects.filter(city=city, state=state).delete()
+
+
+def rebuild():
+    """Recompute every area. Returns the number of areas written."""
+    areas = _group(_published_rows())
+    existing = set(MarketStats.objects.values_list('city', 'state'))
+    with transaction.atomic():
+        _write(areas, existing)
+    return len(areas)
+
+
+def refresh_areas(listing_ids):
+    """Recompute the areas the given (still existing) listings belong to."""
+    keys = {area_key(city, state) for city, state in Listing.all_objects.filter(id__in=listing_ids).values_list('city', 'state')}
+    states = {state for _, state in keys}
+    areas = _group(_published_rows(states))
+    # Only the touched cities; other cities of the same states are unchanged
+    areas = {key: rows for key, rows in areas.items() if key in keys or key[0] == ''}
+    stale = keys | {('', state) for state in states}
+    with transaction.atomic():
+        _write(areas, stale)
+    return len(areas)
+
+
+def refresh(full=False, batch_size=5000):
+    """Bring MarketStats up to date with the change log. Returns (areas written, changes read)."""
+    cursor = SyncCursor.get(CURSOR_NAME)
+    listing_ids = set()
+    needs_rebuild = full or cursor == 0
+    changes_read = 0
+    while True:
+        changes, cursor, has_more = changes_since(cursor, batch_size)
+        changes_read += len(changes)
+        for change in changes:
+            listing_ids.add(change['listing_id'])
+            if 'city' in change['fields'] or 'state' in change['fields']:
+                needs_rebuild = True
+            elif change['action'] == ListingChange.DELETE and not change['fields']:
+                # Hard delete without a soft delete: the row and its area are gone
+                needs_rebuild = True
+        if not has_more:
+            break
+
+    if needs_rebuild:
+        written = rebuild()
+    elif listing_ids:
+        written = refresh_areas(listing_ids)
+    else:
+        written = 0
+    SyncCursor.set(CURSOR_NAME, cursor)
+    if written or needs_rebuild:
+        bump_version()
+    return written, changes_read
+
+
+class MarketIndex:
+    """All MarketStats rows keyed by (city, state), for per-card lookups."""
+
+    def __init__(self, rows, version=0):
+        self.version = version
+        self.checked_at = time.monotonic()
+        self._areas = {(row['city'], row['state']): row for row in rows}
+
+    @classmethod
+    def load(cls, version=0):
+        return cls(MarketStats.objects.values(), version=version)
+
+    def area(self, city, state):
+        """Stats for the city, or None if it has too few listings to compare against."""
+        stats = self._areas.get(area_key(city, state))
+        return stats if stats and stats['listings'] >= MIN_SAMPLE else None
+
+    def state(self, state):
+        stats = self._areas.get(('', area_key('', state)[1]))
+        return stats if stats and stats['listings'] >= MIN_SAMPLE else None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def get_index():
+    global _index
+    index = _index
+    # Cards look the index up once each, so the version is checked at most every few seconds
+    if index is not None and time.monotonic() - index.checked_at < VERSION_CHECK_INTERVAL:
+        return index
+    version = cache.get(VERSION_KEY, 0)
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = MarketIndex.load(version)
+        _index.checked_at = time.monotonic()
+        return _index
+
+
+def price_per_sqft(price, sqft):
+    return price / sqft if sqft else None
+
+
+def is_below_market(listing):
+    stats = get_index().area(listing.city, listing.state)
+    ppsf = price_per_sqft(listing.price, listing.sqft)
+    return bool(stats and ppsf and ppsf < stats['median_ppsf'] * BELOW_MARKET_RATIO)
+
+
+def comparison(listing):
+    """Market figures for the detail page of `listing` (a view-model dict), or None."""
+    index = get_index()
+    stats = index.area(listing['city'], listing['state'])
+    state_stats = index.state(listing['state'])
+    if stats is None and state_stats is None:
+        return None
+    ppsf = price_per_sqft(listing['price'], listing['sqft'])
+    reference = stats or state_stats
+    return {
+        'area': listing['city'] if stats else listing['state'],
+        'stats': reference,
+        'state_stats': state_stats,
+        'ppsf': ppsf,
+        'ppsf_vs_median': (ppsf / reference['median_ppsf'] - 1) * 100 if ppsf and reference['median_ppsf'] else None,
+        'below_market': bool(ppsf and ppsf < reference['median_ppsf'] * BELOW_MARKET_RATIO),
+    }
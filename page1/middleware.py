@@ -0,0 +1,138 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import parse_etags
+
+from . import profiling
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Unhashed names can change on the next deploy, so only cache them briefly
+STATIC_MAX_AGE = getattr(settings, 'STATIC_MAX_AGE', 60)
+# Directories whose files are never rewritten under the same name, like the
+# versioned search index shards (see searchindex.py)
+IMMUTABLE_PREFIXES = tuple(getattr(settings, 'STATIC_IMMUTABLE_PREFIXES', ['search-index/v']))
+# Directories rewritten while workers run (the search index is re-exported
+# and pruned by a scheduled job): left out of the startup index and looked
+# up on disk per request
+LIVE_PREFIXES = tuple(getattr(settings, 'STATIC_LIVE_PREFIXES', ['search-index/']))
+
+# Accept-Encoding token -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class StaticFile:
+    __slots__ = ('path', 'content_type', 'etag', 'variants', 'cache_control')
+
+    def __init__(self, path, cache_control):
+        stat = os.stat(path)
+        self.path = path
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        self.variants = [(encoding, path + suffix) for encoding, suffix in ENCODINGS if os.path.exists(path + suffix)]
+        self.cache_control = cache_control
+
+
+class StaticFilesMiddleware:
+    """Serve STATIC_ROOT from the application, WhiteNoise style.
+
+    The file index is built once at startup from what collectstatic
+    wrote; files under LIVE_PREFIXES are stat'ed per request instead.
+    Fingerprinted names are cached for a year as immutable;
+    .br/.gz siblings are served to clients that accept them. Disabled
+    under DEBUG, where runserver serves the app directories itself."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        root = settings.STATIC_ROOT
+        if settings.DEBUG or not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        self.prefix = '/' + settings.STATIC_URL.strip('/') + '/'
+        self.root = str(root)
+        self.files = self._scan(self.root)
+
+    def _scan(self, root):
+        hashed = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(('.gz', '.br')):
+                    continue
+                path = os.path.join(directory, name)
+                url_name = os.path.relpath(path, root).replace(os.sep, '/')
+                if url_name.startswith(LIVE_PREFIXES):
+                    continue
+                files[url_name] = StaticFile(path, self._cache_control(url_name, hashed))
+        return files
+
+    def _cache_control(self, url_name, hashed=()):
+        immutable = url_name in hashed or url_name.startswith(IMMUTABLE_PREFIXES)
+        return IMMUTABLE_CACHE_CONTROL if immutable else f'public, max-age={STATIC_MAX_AGE}'
+
+    def _live_file(self, url_name):
+        """StaticFile for a file under LIVE_PREFIXES as it is on disk now, or None."""
+        if url_name.endswith(('.gz', '.br')):
+            return None
+        try:
+            path = safe_join(self.root, url_name)
+            if not os.path.isfile(path):
+                return None
+            return StaticFile(path, self._cache_control(url_name))
+        except (SuspiciousFileOperation, FileNotFoundError):
+            return None
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            url_name = request.path_info[len(self.prefix):]
+            if url_name.startswith(LIVE_PREFIXES):
+                static_file = self._live_file(url_name)
+            else:
+                static_file = self.files.get(url_name)
+            if static_file is not None:
+                try:
+                    return self.serve(request, static_file)
+                except FileNotFoundError:
+                    # Pruned between the lookup and the open
+                    pass
+        return self.get_response(request)
+
+    def serve(self, request, static_file):
+        headers = {'Cache-Control': static_file.cache_control, 'ETag': static_file.etag}
+        if static_file.variants:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and static_file.etag in parse_etags(if_none_match):
+            return HttpResponseNotModified(headers=headers)
+
+        accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        path = static_file.path
+        for encoding, variant_path in static_file.variants:
+            if encoding in accepted:
+                path = variant_path
+                headers['Content-Encoding'] = encoding
+                break
+
+        response = FileResponse(open(path, 'rb'), content_type=static_file.content_type, headers=headers)
+        del response.headers['Content-Disposition']
+        return response
+
+
+class ProfilingMiddleware:
+    """Profile the request when a staff user asks for it (see profiling.py).
+
+    Goes after AuthenticationMiddleware, which it needs for request.user."""
+
+    def __init__(self, get_response):
+        if not profiling.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if profiling.wants_profile(request):
+            return profiling.profile_request(request, self.get_response)
+        return self.get_response(request)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page1', '0006_remove_listing_latitude_remove_listing_longitude'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('inquiries', models.PositiveIntegerField(default=0)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='page1.listing')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'bucket'], name='listing_stats_period_bucket')],
+                'constraints': [models.UniqueConstraint(fields=('listing', 'period', 'bucket'), name='unique_listing_stats_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page1', '0007_listingstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='rank_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='ranked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_published', '-rank_score', '-list_date'], name='listing_published_rank'),
+        ),
+    ]
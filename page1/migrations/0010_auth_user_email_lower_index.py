@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Expression index for page1.auth.EmailBackend's LOWER(email) lookup.
+
+    auth_user belongs to django.contrib.auth, so the index can't be declared
+    in a model Meta; LOWER() expression indexes work on SQLite and PostgreSQL."""
+
+    dependencies = [
+        ('page1', '0009_savedsearch_searchalert'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX page1_auth_user_email_lower ON auth_user (LOWER(email));',
+            reverse_sql='DROP INDEX page1_auth_user_email_lower;',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page1', '0010_auth_user_email_lower_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='listing_pending_reap'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page1', '0011_listing_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_id', models.BigIntegerField(db_index=True)),
+                ('action', models.CharField(choices=[('create', 'Created'), ('update', 'Updated'), ('publish', 'Published'), ('unpublish', 'Unpublished'), ('delete', 'Deleted'), ('images', 'Images changed')], max_length=10)),
+                ('fields', models.JSONField(blank=True, default=list)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page1', '0012_listing_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MarketStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('state', models.CharField(max_length=100)),
+                ('listings', models.PositiveIntegerField()),
+                ('median_price', models.IntegerField()),
+                ('p25_price', models.IntegerField()),
+                ('p75_price', models.IntegerField()),
+                ('p90_price', models.IntegerField()),
+                ('median_ppsf', models.FloatField()),
+                ('p25_ppsf', models.FloatField()),
+                ('p75_ppsf', models.FloatField()),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('city', 'state'), name='unique_market_stats_area')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ListingPriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_price', models.IntegerField(blank=True, null=True)),
+                ('price', models.IntegerField()),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='page1.listing')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['listing', '-changed_at'], name='price_history_listing')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page1', '0013_price_history_market_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('owner', models.CharField(blank=True, max_length=200)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('next_run_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=100)),
+                ('node', models.CharField(max_length=200)),
+                ('started_at', models.DateTimeField()),
+                ('duration', models.FloatField(help_text='Seconds')),
+                ('status', models.CharField(choices=[('ok', 'OK'), ('failed', 'Failed')], max_length=10)),
+                ('message', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', '-started_at'], name='job_run_recent')],
+            },
+        ),
+    ]
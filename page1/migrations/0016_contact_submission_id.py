@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page1', '0015_request_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='submission_id',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='contact_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
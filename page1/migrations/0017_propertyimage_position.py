@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:59
+
+from django.db import migrations, models
+
+
+def assign_positions(apps, schema_editor):
+    # Keep each listing's current order: featured image first, then by upload
+    PropertyImage = apps.get_model('page1', 'PropertyImage')
+    images = PropertyImage.objects.order_by('listing_id', '-is_featured', 'created_at', 'id')
+    updates, listing_id, position = [], None, 0
+    for image in images.only('id', 'listing_id').iterator():
+        position = position + 1 if image.listing_id == listing_id else 0
+        listing_id = image.listing_id
+        image.position = position
+        updates.append(image)
+    PropertyImage.objects.bulk_update(updates, ['position'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page1', '0016_contact_submission_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyimage',
+            name='position',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(assign_positions, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='propertyimage',
+            name='position',
+            field=models.PositiveIntegerField(editable=False),
+        ),
+        migrations.AlterModelOptions(
+            name='propertyimage',
+            options={'ordering': ['position']},
+        ),
+        migrations.RemoveField(
+            model_name='propertyimage',
+            name='is_featured',
+        ),
+        migrations.AddConstraint(
+            model_name='propertyimage',
+            constraint=models.UniqueConstraint(fields=('listing', 'position'), name='propertyimage_listing_position'),
+        ),
+    ]
@@ -1,9 +1,10 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, Min, Value, When
 from django.contrib.auth.models import User
 from io import BytesIO
 import os
 from django.core.files.base import ContentFile
-from PIL import Image
+from django.utils import timezone
 
 
 def property_image_upload_path(instance, filename):
@@ -30,6 +31,37 @@ class Realtor(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the loaded values so save() handlers can see what changed
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            f.attname: getattr(self, f.attname)
+            for f in self._meta.concrete_fields if f.attname not in deferred
+        }
+
+    @property
+    def mvp_changed(self):
+        """Whether is_mvp differs from what was loaded (True when that is unknown)."""
+        if 'is_mvp' in self.get_deferred_fields():
+            # Still deferred, so not assigned and not written
+            return False
+        loaded = getattr(self, '_loaded_values', {})
+        return 'is_mvp' not in loaded or loaded['is_mvp'] != self.is_mvp
+
+
+class ListingManager(models.Manager):
+    """Default manager: hides soft-deleted listings (see `manage.py reap_deleted_listings`)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
 
 class Listing(models.Model):
     realtor = models.ForeignKey(
@@ -53,10 +85,154 @@ class Listing(models.Model):
     is_published = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
     list_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by `manage.py rank_listings`; ranked_at=None marks the score stale
+    rank_score = models.FloatField(default=0)
+    ranked_at = models.DateTimeField(null=True, blank=True)
+    # Soft delete: hidden immediately, hard-deleted later by the reaper
+    is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ListingManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_published', '-rank_score', '-list_date'], name='listing_published_rank'),
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(is_deleted=True),
+                name='listing_pending_reap',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the loaded values so save() handlers can see what changed
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        content_edit = update_fields is None or not set(update_fields) <= ListingChange.IGNORED_FIELDS
+        if update_fields is not None and content_edit:
+            # auto_now only applies to fields being written
+            kwargs['update_fields'] = [*update_fields, 'updated_at']
+        loaded = getattr(self, '_loaded_values', None)
+        if not adding and loaded is not None:
+            # Fields deferred by .only()/.defer() and then assigned: read what is
+            # stored, so the change log and was_published compare against it
+            deferred = self.get_deferred_fields()
+            assigned = [
+                f.attname for f in self._meta.concrete_fields
+                if f.attname not in loaded and f.attname not in deferred
+            ]
+            if assigned:
+                loaded.update(Listing.all_objects.filter(pk=self.pk).values(*assigned).first() or {})
+        if content_edit and (update_fields is None or 'ranked_at' not in update_fields):
+            # Any edit makes the stored rank_score stale; rank_listings picks it up
+            self.ranked_at = None
+            if update_fields is not None:
+                kwargs['update_fields'] = [*kwargs['update_fields'], 'ranked_at']
+        # The change-log row commits or rolls back together with the listing
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            change = ListingChange.record_save(self, adding, update_fields)
+            if change is not None and (adding or 'price' in change.fields):
+                ListingPriceHistory.objects.create(
+                    listing=self,
+                    old_price=None if adding else getattr(self, '_loaded_values', {}).get('price'),
+                    price=self.price,
+                )
+        # post_save handlers have seen the old values; later saves compare against this one
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            f.attname: getattr(self, f.attname)
+            for f in self._meta.concrete_fields if f.attname not in deferred
+        }
+
+    def soft_delete(self):
+        """Hide the listing now; rows and files are removed by the reaper."""
+        self.is_deleted = True
+        self.is_published = False
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['is_deleted', 'is_published', 'deleted_at'])
+
+    @property
+    def was_published(self):
+        """is_published as last loaded from the database.
+
+        False for new listings, None when it was deferred and is not known."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return False
+        return loaded.get('is_published')
+
+    @property
+    def cover_url(self):
+        """photo_main, else the first image (served from prefetch_related('images') when used)."""
+        if self.photo_main:
+            return self.photo_main.url
+        images = self.images.all()
+        return images[0].image.url if images else None
+
+
+class ImageOrderConflict(Exception):
+    """The listing's images changed while a reorder was being applied."""
+
+
+class PropertyImageQuerySet(models.QuerySet):
+    # Reorders write positions into the band the listing is not using, so the
+    # (listing, position) unique index never sees two rows on one position
+    # mid-statement, whatever order the database updates them in.
+    POSITION_BAND = 1_000_000
+
+    def next_position(self, listing_id):
+        last = self.filter(listing_id=listing_id).order_by('-position').values_list('position', flat=True).first()
+        return 0 if last is None else last + 1
+
+    def cover(self, listing_id):
+        """The listing's first image: one seek on the (listing, position) index."""
+        return self.filter(listing_id=listing_id).order_by('position').first()
+
+    def reorder(self, listing_id, image_ids):
+        """Give the listing's images the order of `image_ids`, the first becoming the cover.
+
+        `image_ids` must name every image of the listing exactly once. One
+        UPDATE applies it, and only while the listing still has exactly
+        those images; otherwise ImageOrderConflict is raised and nothing
+        changes."""
+        image_ids = [int(image_id) for image_id in image_ids]
+        if not image_ids or len(set(image_ids)) != len(image_ids):
+            raise ValueError('image_ids must be a non-empty list of distinct ids')
+        siblings = PropertyImage.objects.filter(listing_id=listing_id)
+        band = Case(
+            When(lowest__gte=self.POSITION_BAND, then=Value(0)),
+            default=Value(self.POSITION_BAND),
+        )
+        with transaction.atomic():
+            updated = (
+                self.filter(listing_id=listing_id, pk__in=image_ids)
+                .alias(
+                    lowest=models.Subquery(siblings.values('listing_id').annotate(low=Min('position')).values('low')),
+                    total=models.Subquery(siblings.values('listing_id').annotate(n=Count('pk')).values('n')),
+                )
+                .filter(total=len(image_ids))
+                .update(position=band + Case(
+                    *[When(pk=image_id, then=Value(index)) for index, image_id in enumerate(image_ids)],
+                    output_field=models.PositiveIntegerField(),
+                ))
+            )
+            if updated != len(image_ids):
+                raise ImageOrderConflict(f'Listing {listing_id} does not have exactly images {image_ids}')
+            ListingChange.record(listing_id, ListingChange.IMAGES)
+        return updated
+
 
 class PropertyImage(models.Model):
     listing = models.ForeignKey(
@@ -66,15 +242,43 @@ class PropertyImage(models.Model):
     )
     image = models.ImageField(upload_to=property_image_upload_path)
     caption = models.CharField(max_length=200, blank=True)
-    is_featured = models.BooleanField(default=False)
+    # Display order within the listing; the lowest is the cover. Appended on
+    # create, changed only through PropertyImage.objects.reorder()
+    position = models.PositiveIntegerField(editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PropertyImageQuerySet.as_manager()
+
     class Meta:
-        ordering = ['-is_featured', 'created_at']
+        # The unique constraint's (listing, position) index serves this order
+        # and cover lookups, so neither needs a sort
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['listing', 'position'], name='propertyimage_listing_position'),
+        ]
 
     def __str__(self):
         return f"Image for {self.listing.title}"
 
+    POSITION_RETRIES = 5
+
+    def _save_with_position(self, *args, **kwargs):
+        # A concurrent upload can take the same next position; the unique
+        # index rejects one of the two inserts, which then retries
+        for attempt in range(self.POSITION_RETRIES):
+            assign = self.position is None
+            if assign:
+                self.position = PropertyImage.objects.next_position(self.listing_id)
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                    ListingChange.record(self.listing_id, ListingChange.IMAGES)
+                return
+            except IntegrityError:
+                if not assign or attempt == self.POSITION_RETRIES - 1:
+                    raise
+                self.position = None
+
     def save(self, *args, **kwargs):
         """Save and resize the image to reasonable dimensions to save space.
 
@@ -82,7 +286,7 @@ class PropertyImage(models.Model):
         and writes it back to the same field. Works with local storage
         (development)."""
         # First save to ensure `self.image.path` is available
-        super().save(*args, **kwargs)
+        self._save_with_position(*args, **kwargs)
 
         try:
             img_path = self.image.path
@@ -91,6 +295,9 @@ class PropertyImage(models.Model):
             return
 
         try:
+            # Pillow is only needed on upload, not when a worker boots
+            from PIL import Image
+
             img = Image.open(img_path)
             max_size = (1600, 1200)
             img.thumbnail(max_size, Image.Resampling.LANCZOS)
@@ -133,7 +340,293 @@ class Contact(models.Model):
     phone = models.CharField(max_length=20)
     message = models.TextField(blank=True)
     user_id = models.IntegerField(blank=True, null=True)
-    contact_date = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: inquiries are committed in batches (see inquiries.py)
+    # and keep the time they were submitted
+    contact_date = models.DateTimeField(default=timezone.now, editable=False)
+    # Id returned to the buyer; unique so replaying the inquiry journal is idempotent
+    submission_id = models.CharField(max_length=32, unique=True, null=True, blank=True, editable=False)
+
+    def __str__(self):
+        return f"{self.name} - {self.listing_title}"
+
+
+class ListingStats(models.Model):
+    """View/inquiry counters per listing per time bucket.
+
+    Hourly rows are written in batches by `analytics.CounterBuffer`; daily and
+    weekly rows are rolled up from them by `manage.py rollup_listing_stats`."""
+    HOUR = 'hour'
+    DAY = 'day'
+    WEEK = 'week'
+    PERIOD_CHOICES = [
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+        (WEEK, 'Week'),
+    ]
+
+    listing = models.ForeignKey(
+        Listing,
+        on_delete=models.CASCADE,
+        related_name='stats'
+    )
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    bucket = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+    inquiries = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['listing', 'period', 'bucket'], name='unique_listing_stats_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'bucket'], name='listing_stats_period_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.listing_id} {self.period} {self.bucket:%Y-%m-%d %H:%M}"
+
+
+class SavedSearch(models.Model):
+    """Album filters a buyer wants to be alerted about; see `alerts.py`."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='saved_searches'
+    )
+    keyword = models.CharField(max_length=200, blank=True)
+    city = models.CharField(max_length=100, blank=True)
+    bedrooms = models.PositiveIntegerField(null=True, blank=True)
+    max_price = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.city or 'any city'}"
+
+
+class SearchAlert(models.Model):
+    """A listing that matched a saved search; rows with sent_at=None are the digest queue."""
+    saved_search = models.ForeignKey(
+        SavedSearch,
+        on_delete=models.CASCADE,
+        related_name='alerts'
+    )
+    listing = models.ForeignKey(
+        Listing,
+        on_delete=models.CASCADE,
+        related_name='search_alerts'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['saved_search', 'listing'], name='unique_search_alert'),
+        ]
+        indexes = [
+            models.Index(fields=['sent_at'], name='search_alert_sent_at'),
+        ]
+
+    def __str__(self):
+        return f"{self.saved_search_id} -> {self.listing_id}"
+
+
+class ListingChange(models.Model):
+    """Append-only log of listing mutations, read by the changes feed.
+
+    Rows are written in the same transaction as the change itself, so a
+    consumer that has seen every id up to N has seen every committed
+    change up to N. See `changes.py`."""
+    CREATE = 'create'
+    UPDATE = 'update'
+    PUBLISH = 'publish'
+    UNPUBLISH = 'unpublish'
+    DELETE = 'delete'
+    IMAGES = 'images'
+    ACTION_CHOICES = [
+        (CREATE, 'Created'),
+        (UPDATE, 'Updated'),
+        (PUBLISH, 'Published'),
+        (UNPUBLISH, 'Unpublished'),
+        (DELETE, 'Deleted'),
+        (IMAGES, 'Images changed'),
+    ]
+
+    # Bookkeeping columns that are not part of the listing's content
+    IGNORED_FIELDS = {'updated_at', 'rank_score', 'ranked_at'}
+
+    # Not a ForeignKey: the log outlives hard-deleted listings
+    listing_id = models.BigIntegerField(db_index=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    fields = models.JSONField(default=list, blank=True)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"#{self.id} {self.action} listing {self.listing_id}"
+
+    @classmethod
+    def record(cls, listing_id, action, fields=()):
+        return cls.objects.create(listing_id=listing_id, action=action, fields=list(fields))
+
+    @classmethod
+    def record_many(cls, listing_ids, action, fields=()):
+        """Log one change per listing, for queryset.update() callers."""
+        now = timezone.now()
+        cls.objects.bulk_create(
+            cls(listing_id=listing_id, action=action, fields=list(fields), changed_at=now)
+            for listing_id in listing_ids
+        )
+
+    @classmethod
+    def record_save(cls, listing, adding, update_fields=None):
+        """Log a Listing.save(); saves that only touch bookkeeping fields are skipped."""
+        if adding:
+            return cls.record(listing.pk, cls.CREATE)
+
+        loaded = getattr(listing, '_loaded_values', None)
+        if update_fields is not None:
+            names = update_fields
+        else:
+            # Fields still deferred were not written; reading them would load each one
+            deferred = listing.get_deferred_fields()
+            names = [f.attname for f in listing._meta.concrete_fields if f.attname not in deferred]
+        changed = []
+        for name in names:
+            attname = listing._meta.get_field(name).attname
+            if attname in cls.IGNORED_FIELDS or attname == 'id':
+                continue
+            if loaded is None or attname not in loaded or loaded[attname] != getattr(listing, attname):
+                changed.append(attname)
+        if not changed:
+            return None
+
+        if 'is_deleted' in changed and listing.is_deleted:
+            action = cls.DELETE
+        elif 'is_published' in changed:
+            action = cls.PUBLISH if listing.is_published else cls.UNPUBLISH
+        else:
+            action = cls.UPDATE
+        return cls.record(listing.pk, action, changed)
+
+
+class ListingPriceHistory(models.Model):
+    """One row per price a listing has had; written by Listing.save()."""
+    listing = models.ForeignKey(
+        Listing,
+        on_delete=models.CASCADE,
+        related_name='price_history'
+    )
+    # None for the price the listing was created with
+    old_price = models.IntegerField(null=True, blank=True)
+    price = models.IntegerField()
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['listing', '-changed_at'], name='price_history_listing'),
+        ]
+
+    def __str__(self):
+        return f"{self.listing_id}: {self.old_price} -> {self.price}"
+
+
+class MarketStats(models.Model):
+    """Precomputed price statistics of published listings per city and per state.
+
+    Rows with city='' cover a whole state. Maintained by
+    `manage.py refresh_market_stats` (see market.py); pages only read them."""
+    city = models.CharField(max_length=100, blank=True)
+    state = models.CharField(max_length=100)
+    listings = models.PositiveIntegerField()
+    median_price = models.IntegerField()
+    p25_price = models.IntegerField()
+    p75_price = models.IntegerField()
+    p90_price = models.IntegerField()
+    median_ppsf = models.FloatField()
+    p25_ppsf = models.FloatField()
+    p75_ppsf = models.FloatField()
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['city', 'state'], name='unique_market_stats_area'),
+        ]
+
+    def __str__(self):
+        return f"{self.city or '(all)'}, {self.state}"
+
+
+class SyncCursor(models.Model):
+    """How far an incremental consumer of the ListingChange feed has got."""
+    name = models.CharField(max_length=50, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+    @classmethod
+    def get(cls, name):
+        return cls.objects.filter(name=name).values_list('position', flat=True).first() or 0
+
+    @classmethod
+    def set(cls, name, position):
+        cls.objects.update_or_create(name=name, defaults={'position': position})
+
+
+class JobLock(models.Model):
+    """Schedule and lease of one periodic job, shared by every scheduler node.
+
+    A node may run the job once next_run_at has passed and nobody holds
+    an unexpired lease; claiming is a single conditional UPDATE. See
+    scheduler.py."""
+    name = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=200, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    next_run_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class JobRun(models.Model):
+    """Outcome and duration of one scheduled job run."""
+    OK = 'ok'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(OK, 'OK'), (FAILED, 'Failed')]
+
+    job = models.CharField(max_length=100)
+    node = models.CharField(max_length=200)
+    started_at = models.DateTimeField()
+    duration = models.FloatField(help_text='Seconds')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    message = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['job', '-started_at'], name='job_run_recent'),
+        ]
+
+    def __str__(self):
+        return f"{self.job} {self.status} at {self.started_at:%Y-%m-%d %H:%M}"
+
+
+class RequestProfile(models.Model):
+    """cProfile report and SQL capture of one staff-requested profiled request (see profiling.py)."""
+    request_id = models.CharField(max_length=64, unique=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status_code = models.PositiveSmallIntegerField()
+    duration = models.FloatField(help_text='Seconds')
+    sql_count = models.PositiveIntegerField()
+    sql_time = models.FloatField(help_text='Seconds')
+    # pstats report, sorted by cumulative time
+    stats = models.TextField()
+    # marshalled pstats data, loadable with pstats/snakeviz
+    raw_stats = models.BinaryField()
+    # [{sql, duration, explain, stack}]
+    slow_queries = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     def __str__(self):
-        return f"{self.name} - {self.listing_title}"
\ No newline at end of file
+        return f"{self.method} {self.path} ({self.duration * 1000:.0f} ms)"
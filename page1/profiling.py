@@ -0,0 +1,252 @@
+"""On-demand profiling of single requests, for staff.
+
+A staff user adds `?_profile=1` to a URL, or sends `X-Profile: 1`.
+ProfilingMiddleware then runs the rest of the request under cProfile and
+records every SQL statement through a connection execute_wrapper. The
+result is stored as a RequestProfile row and listed in the admin. The
+response carries its id in X-Profile-Id.
+
+Statements slower than PROFILE_SLOW_QUERY_MS are kept with their
+project-code call stack and an EXPLAIN plan. The plans are taken after
+the response is built, so they don't count towards the request's time.
+
+Limits that make it safe to leave on in production:
+- only authenticated staff can trigger it
+- at most PROFILE_MAX_PER_MINUTE profiles across all workers
+- one profiled request per process at a time (cProfile is process-wide
+  on recent Pythons); others run unprofiled
+- only the newest PROFILE_KEEP rows are kept, and reports are capped
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import re
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import RequestProfile
+
+PROFILING_ENABLED = getattr(settings, 'PROFILING_ENABLED', True)
+PROFILE_QUERY_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_MAX_PER_MINUTE = getattr(settings, 'PROFILE_MAX_PER_MINUTE', 10)
+PROFILE_KEEP = getattr(settings, 'PROFILE_KEEP', 200)
+SLOW_QUERY_MS = getattr(settings, 'PROFILE_SLOW_QUERY_MS', 50)
+MAX_SLOW_QUERIES = 20
+MAX_QUERIES_RECORDED = 5000
+STATS_LINES = 60
+STACK_DEPTH = 8
+
+PROJECT_DIR = str(Path(settings.BASE_DIR).resolve())
+REQUEST_ID_RE = re.compile(r'^[\w.-]{1,64}$')
+
+_profiler_lock = threading.Lock()
+
+
+def wants_profile(request):
+    if not PROFILING_ENABLED:
+        return False
+    if request.GET.get(PROFILE_QUERY_PARAM) != '1' and request.META.get(PROFILE_HEADER) != '1':
+        return False
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and user.is_staff)
+
+
+def take_slot():
+    """Count this profile against the shared per-minute budget."""
+    key = f'profiling:minute:{int(time.time() // 60)}'
+    if cache.add(key, 1, 120):
+        return True
+    try:
+        return cache.incr(key) <= PROFILE_MAX_PER_MINUTE
+    except ValueError:
+        return False
+
+
+def request_id(request):
+    incoming = request.META.get('HTTP_X_REQUEST_ID', '')
+    return incoming if REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+
+
+def _project_stack():
+    """The innermost project frames (outside site-packages) of the current call stack."""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(PROJECT_DIR) and 'site-packages' not in frame.filename
+    ]
+    return [f'{Path(frame.filename).relative_to(PROJECT_DIR)}:{frame.lineno} in {frame.name}' for frame in frames[-STACK_DEPTH:]]
+
+
+class QueryRecorder:
+    """execute_wrapper that times every statement and keeps the slow ones."""
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS):
+        self.threshold = threshold_ms / 1000
+        self.count = 0
+        self.total = 0.0
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.total += elapsed
+            if elapsed >= self.threshold and len(self.slow) < MAX_SLOW_QUERIES and self.count <= MAX_QUERIES_RECORDED:
+                self.slow.append({
+                    'sql': sql,
+                    'params': None if many else params,
+                    'duration': elapsed,
+                    'stack': _project_stack(),
+                })
+
+
+def explain(sql, params):
+    """The database's plan for a SELECT, as text lines; [] for anything else."""
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return []
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+
+
+def collect_stats(profiler, lines=STATS_LINES):
+    """(report text, marshalled stats loadable by pstats/snakeviz) for a finished profile."""
+    out = io.StringIO()
+    # Stats() snapshots the profiler, which can only be done once
+    stats = pstats.Stats(profiler, stream=out)
+    raw = marshal.dumps(stats.stats)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(lines)
+    return out.getvalue(), raw
+
+
+class ProfileRun:
+    """The profiler and query recorder of one profiled request, and its RequestProfile."""
+
+    def __init__(self, request):
+        self.request = request
+        self.recorder = QueryRecorder()
+        self.profiler = cProfile.Profile()
+        self.start = time.perf_counter()
+        self.profile_id = request_id(request)
+        if RequestProfile.objects.filter(request_id=self.profile_id).exists():
+            # A client reusing its X-Request-ID must not overwrite the earlier profile
+            self.profile_id = uuid.uuid4().hex
+
+    @contextmanager
+    def active(self):
+        with connection.execute_wrapper(self.recorder):
+            self.profiler.enable()
+            try:
+                yield
+            finally:
+                self.profiler.disable()
+
+    def save(self, status_code):
+        duration = time.perf_counter() - self.start
+        for query in self.recorder.slow:
+            query['explain'] = explain(query['sql'], query.pop('params'))
+        report, raw_stats = collect_stats(self.profiler)
+        RequestProfile.objects.create(
+            request_id=self.profile_id,
+            method=self.request.method,
+            path=self.request.get_full_path()[:500],
+            user=self.request.user,
+            status_code=status_code,
+            duration=duration,
+            sql_count=self.recorder.count,
+            sql_time=self.recorder.total,
+            stats=report,
+            raw_stats=raw_stats,
+            slow_queries=self.recorder.slow,
+        )
+        prune()
+
+
+class ProfiledStream:
+    """A streamed body iterated under the profiler; the profile is stored at the end.
+
+    A streamed page does most of its queries and rendering while the server
+    iterates it, after the view has returned. The time spent between chunks
+    (sending them) counts towards the duration but not the profile."""
+
+    def __init__(self, content, run, status_code):
+        self.content = iter(content)
+        self.run = run
+        self.status_code = status_code
+        self.finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.finished:
+            raise StopIteration
+        with self.run.active():
+            chunk = next(self.content, None)
+        if chunk is None:
+            self.close()
+            raise StopIteration
+        return chunk
+
+    def close(self):
+        # Called by the server once the response is done, even if the client
+        # went away or the body was never iterated
+        if self.finished:
+            return
+        self.finished = True
+        try:
+            self.run.save(self.status_code)
+        finally:
+            _profiler_lock.release()
+
+
+def profile_request(request, get_response):
+    """Run get_response(request) profiled, store a RequestProfile, return the response.
+
+    A streamed response is profiled until its body is exhausted, and its
+    profile is stored then. Falls back to an unprofiled call when the budget
+    or the profiler is taken."""
+    if not take_slot() or not _profiler_lock.acquire(blocking=False):
+        response = get_response(request)
+        response['X-Profile-Skipped'] = 'limit'
+        return response
+
+    try:
+        run = ProfileRun(request)
+        with run.active():
+            response = get_response(request)
+    except BaseException:
+        _profiler_lock.release()
+        raise
+    response['X-Profile-Id'] = run.profile_id
+    if response.streaming and not response.is_async:
+        # The profiler stays with the body; ProfiledStream.close releases it
+        response.streaming_content = ProfiledStream(response.streaming_content, run, response.status_code)
+        return response
+    try:
+        run.save(response.status_code)
+    finally:
+        _profiler_lock.release()
+    return response
+
+
+def prune(keep=PROFILE_KEEP):
+    cutoff = list(RequestProfile.objects.order_by('-created_at').values_list('created_at', flat=True)[keep:keep + 1])
+    if cutoff:
+        RequestProfile.objects.filter(created_at__lte=cutoff[0]).delete()
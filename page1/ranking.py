@@ -0,0 +1,116 @@
+"""Popularity/relevance score for published listings.
+
+Scores are stored in `Listing.rank_score` by `manage.py rank_listings` so
+the home page reads its top-k straight off the `listing_published_rank`
+index. Each run only rescores listings that are stale: never ranked,
+edited since (Listing.save clears `ranked_at`), with new
+inquiries or images since, or last ranked more than RANKING_MAX_AGE ago
+(recency keeps decaying).
+"""
+import math
+import statistics
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Contact, Listing, PropertyImage
+
+HALF_LIFE_DAYS = getattr(settings, 'RANKING_HALF_LIFE_DAYS', 14)
+MAX_AGE = timedelta(seconds=getattr(settings, 'RANKING_MAX_AGE', 60 * 60 * 6))
+INQUIRY_WINDOW_DAYS = 30
+
+WEIGHTS = {
+    'recency': 0.40,
+    'inquiries': 0.30,
+    'images': 0.15,
+    'mvp': 0.15,
+}
+# Subtracted for a price/sqft far away from the city median (usually a typo)
+OUTLIER_PENALTY = 0.5
+OUTLIER_RATIO = 3.0
+# Inquiries per day at which the inquiry component saturates
+INQUIRY_RATE_SATURATION = 2.0
+IMAGE_SATURATION = 6
+
+
+def score(*, age_days, inquiry_rate, image_count, is_mvp, ppsf_ratio):
+    """Combine the ranking signals into a single score, roughly in [-0.5, 1]."""
+    recency = 0.5 ** (max(age_days, 0) / HALF_LIFE_DAYS)
+    inquiries = min(math.log1p(inquiry_rate) / math.log1p(INQUIRY_RATE_SATURATION), 1.0)
+    images = min(image_count, IMAGE_SATURATION) / IMAGE_SATURATION
+
+    total = (
+        WEIGHTS['recency'] * recency
+        + WEIGHTS['inquiries'] * inquiries
+        + WEIGHTS['images'] * images
+        + WEIGHTS['mvp'] * (1.0 if is_mvp else 0.0)
+    )
+    if ppsf_ratio is not None and not (1 / OUTLIER_RATIO <= ppsf_ratio <= OUTLIER_RATIO):
+        total -= OUTLIER_PENALTY
+    return total
+
+
+def stale_listings(now, full=False):
+    qs = Listing.objects.filter(is_published=True)
+    if full:
+        return qs
+    newer_contacts = Contact.objects.filter(listing=OuterRef('pk'), contact_date__gt=OuterRef('ranked_at'))
+    newer_images = PropertyImage.objects.filter(listing=OuterRef('pk'), created_at__gt=OuterRef('ranked_at'))
+    return qs.filter(
+        Q(ranked_at__isnull=True)
+        | Q(ranked_at__lt=now - MAX_AGE)
+        | Exists(newer_contacts)
+        | Exists(newer_images)
+    )
+
+
+def city_median_ppsf(cities):
+    """Median price per sqft of the published listings in each of `cities`."""
+    values = defaultdict(list)
+    rows = Listing.objects.filter(is_published=True, city__in=cities, sqft__gt=0).values_list('city', 'price', 'sqft')
+    for city, price, sqft in rows:
+        values[city].append(price / sqft)
+    return {city: statistics.median(ppsf) for city, ppsf in values.items()}
+
+
+def rank_listings(full=False, batch_size=500):
+    """Rescore stale (or, with full=True, all) published listings. Returns the number rescored."""
+    now = timezone.now()
+    since = now - timedelta(days=INQUIRY_WINDOW_DAYS)
+
+    listings = list(
+        stale_listings(now, full)
+        .select_related('realtor')
+        .annotate(
+            image_count=Count('images', distinct=True),
+            recent_inquiries=Count('contacts', filter=Q(contacts__contact_date__gte=since), distinct=True),
+        )
+        .only('id', 'price', 'sqft', 'city', 'list_date', 'realtor__is_mvp')
+    )
+    if not listings:
+        return 0
+
+    medians = city_median_ppsf({listing.city for listing in listings})
+
+    for listing in listings:
+        age_days = (now - listing.list_date).total_seconds() / 86400
+        # Inquiries per day over the window, or over the listing's life if younger
+        inquiry_rate = listing.recent_inquiries / max(min(age_days, INQUIRY_WINDOW_DAYS), 1)
+        median = medians.get(listing.city)
+        ppsf_ratio = (listing.price / listing.sqft) / median if listing.sqft and median else None
+
+        listing.rank_score = score(
+            age_days=age_days,
+            inquiry_rate=inquiry_rate,
+            image_count=listing.image_count,
+            is_mvp=listing.realtor.is_mvp,
+            ppsf_ratio=ppsf_ratio,
+        )
+        listing.ranked_at = now
+
+    # bulk_update skips save() and its signals, so this doesn't mark anything stale
+    Listing.objects.bulk_update(listings, ['rank_score', 'ranked_at'], batch_size=batch_size)
+    return len(listings)
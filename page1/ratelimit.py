@@ -0,0 +1,115 @@
+"""Rate limiting and de-duplication for contact_agent.
+
+Both checks only use the Django cache, so a submission can be rejected
+before any database work happens.
+
+- Token buckets per client IP, per sender email and per listing. The
+  buckets are read and written with one get_many/set_many round trip.
+- A fingerprint of (listing, email, phone, normalized message). Identical
+  inquiries within CONTACT_DEDUP_WINDOW seconds collapse into the first.
+  An inquiry that is then rejected gives its fingerprint back
+  (release_inquiry), so the corrected resubmission is not a duplicate.
+
+The buckets are read-modify-write without a lock, so a burst racing
+across workers can slip one or two extra requests through. That is fine
+for abuse control; it is not meant for billing.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# scope -> (requests, per seconds)
+DEFAULT_LIMITS = {
+    'ip': (5, 60),
+    'email': (3, 300),
+    'listing': (30, 60),
+}
+LIMITS = getattr(settings, 'CONTACT_RATE_LIMITS', DEFAULT_LIMITS)
+DEDUP_WINDOW = getattr(settings, 'CONTACT_DEDUP_WINDOW', 60 * 10)
+TRUST_X_FORWARDED_FOR = getattr(settings, 'RATELIMIT_TRUST_X_FORWARDED_FOR', False)
+
+ALLOWED = 'allowed'
+RATE_LIMITED = 'rate_limited'
+DUPLICATE = 'duplicate'
+
+
+def client_ip(request):
+    if TRUST_X_FORWARDED_FOR:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _bucket_key(scope, value):
+    digest = hashlib.sha1(str(value).encode()).hexdigest()
+    return f'ratelimit:{scope}:{digest}'
+
+
+def take_tokens(buckets, now=None):
+    """Take one token from each of `buckets` [(scope, value)].
+
+    Returns (allowed, retry_after_seconds). Nothing is taken unless every
+    bucket has a token."""
+    now = time.time() if now is None else now
+    keys = {_bucket_key(scope, value): scope for scope, value in buckets}
+    stored = cache.get_many(list(keys))
+
+    updated = {}
+    retry_after = 0
+    for key, scope in keys.items():
+        capacity, period = LIMITS[scope]
+        rate = capacity / period
+        tokens, last = stored.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - last) * rate)
+        if tokens < 1:
+            retry_after = max(retry_after, (1 - tokens) / rate)
+        updated[key] = (tokens - 1, now)
+
+    if retry_after:
+        return False, int(retry_after) + 1
+
+    cache.set_many(updated, timeout=max(period for _, period in LIMITS.values()))
+    return True, 0
+
+
+def inquiry_fingerprint(listing_id, data):
+    message = ' '.join((data.get('message') or '').lower().split())
+    parts = [
+        str(listing_id),
+        (data.get('email') or '').strip().lower(),
+        ''.join(ch for ch in (data.get('phone') or '') if ch.isdigit()),
+        message,
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+def _fingerprint_key(listing_id, data):
+    return f'inquiry:fp:{inquiry_fingerprint(listing_id, data)}'
+
+
+def check_inquiry(request, listing_id):
+    """Classify a contact_agent POST as ALLOWED, RATE_LIMITED or DUPLICATE.
+
+    Returns (verdict, retry_after_seconds)."""
+    email = (request.POST.get('email') or '').strip().lower()
+    buckets = [('ip', client_ip(request)), ('listing', listing_id)]
+    if email:
+        buckets.append(('email', email))
+
+    allowed, retry_after = take_tokens(buckets)
+    if not allowed:
+        return RATE_LIMITED, retry_after
+
+    key = _fingerprint_key(listing_id, request.POST)
+    # cache.add is atomic on every backend: only the first identical inquiry wins
+    if not cache.add(key, 1, DEDUP_WINDOW):
+        return DUPLICATE, 0
+    return ALLOWED, 0
+
+
+def release_inquiry(request, listing_id):
+    """Forget the fingerprint check_inquiry() claimed for a POST that was not accepted."""
+    cache.delete(_fingerprint_key(listing_id, request.POST))
@@ -0,0 +1,119 @@
+"""Hard deletion of soft-deleted listings.
+
+`delete_property` only flags a listing with `Listing.soft_delete()`. The
+reaper removes the rows and files later, in batches, off the request
+path:
+- Inquiries and images are deleted in chunks, each committed on its own,
+  so a listing with hundreds of either never holds the write lock for
+  long. The listing row goes last, in its own transaction. The listing is
+  already hidden, so nobody sees it half-deleted, and a run interrupted
+  midway is finished by the next one.
+- Files go after the transaction commits: originals, photo_main and the
+  listing's property_images/listing_<id>/ directory with any resized
+  derivatives. Variants served by imageserver.py are removed by the
+  PropertyImage post_delete signal once the transaction commits.
+
+Every reaped listing yields one audit record. The change log already has
+its delete entry from `soft_delete()`, so no per-image entries are logged
+while reaping.
+"""
+import logging
+import os
+import shutil
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Contact, Listing, PropertyImage
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+# True while reap_listing deletes a listing's rows; read by signals.py
+reaping = ContextVar('reaping', default=False)
+
+
+def _delete_in_chunks(queryset, chunk_size=CHUNK_SIZE):
+    total = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return total
+        # One short transaction per chunk; other writers get the lock in between
+        with transaction.atomic():
+            deleted, _ = queryset.model.objects.filter(pk__in=pks).delete()
+        total += deleted
+
+
+def listing_media_dir(listing_id):
+    return os.path.join(settings.MEDIA_ROOT, 'property_images', f'listing_{listing_id}')
+
+
+def _remove_files(names, directory):
+    removed = 0
+    for name in names:
+        try:
+            if default_storage.exists(name):
+                default_storage.delete(name)
+                removed += 1
+        except Exception:
+            logger.exception('Could not delete %s', name)
+    if os.path.isdir(directory):
+        shutil.rmtree(directory, ignore_errors=True)
+    return removed
+
+
+def reap_listing(listing_id):
+    """Hard-delete one soft-deleted listing. Returns its audit record."""
+    listing = Listing.all_objects.filter(pk=listing_id, is_deleted=True).first()
+    if listing is None:
+        return None
+
+    image_names = list(PropertyImage.objects.filter(listing_id=listing_id).values_list('image', flat=True))
+    file_names = [name for name in image_names + [listing.photo_main.name] if name]
+
+    token = reaping.set(True)
+    try:
+        contacts = _delete_in_chunks(Contact.objects.filter(listing_id=listing_id))
+        images = _delete_in_chunks(PropertyImage.objects.filter(listing_id=listing_id))
+        with transaction.atomic():
+            listing.delete()
+    finally:
+        reaping.reset(token)
+
+    files = _remove_files(file_names, listing_media_dir(listing_id))
+
+    return {
+        'listing_id': listing_id,
+        'title': listing.title,
+        'realtor_id': listing.realtor_id,
+        'deleted_at': listing.deleted_at.isoformat() if listing.deleted_at else None,
+        'reaped_at': timezone.now().isoformat(),
+        'contacts': contacts,
+        'images': images,
+        'files': files,
+    }
+
+
+def reap(batch_size=50, grace=timedelta(0)):
+    """Reap up to `batch_size` listings soft-deleted at least `grace` ago; yields audit records."""
+    cutoff = timezone.now() - grace
+    listing_ids = list(
+        Listing.all_objects.filter(is_deleted=True, deleted_at__lte=cutoff)
+        .order_by('deleted_at')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    for listing_id in listing_ids:
+        try:
+            record = reap_listing(listing_id)
+        except Exception:
+            logger.exception('Failed to reap listing %s', listing_id)
+            continue
+        if record is not None:
+            logger.info('Reaped listing %s', listing_id, extra={'audit': record})
+            yield record
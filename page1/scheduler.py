@@ -0,0 +1,267 @@
+"""In-process scheduler for periodic maintenance jobs.
+
+Jobs register with `@job('<cron schedule>')` (see jobs.py) and run under
+`manage.py run_scheduler`. Any number of nodes can run the scheduler
+against the same database:
+- Each job has a JobLock row holding its next run time and a lease.
+- A node claims a due job with one conditional UPDATE. The update sets
+  the lease and moves next_run_at forward, so exactly one node wins each
+  run. A node that dies mid-run loses the lease after the job's timeout.
+- next_run_at gets a random delay of up to `jitter` seconds, so jobs on
+  the same schedule don't all hit the database in the same second.
+
+Every run is recorded as a JobRun row with its duration and outcome.
+Nothing outside the database is needed.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import JobLock, JobRun
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_TICK = getattr(settings, 'SCHEDULER_TICK', 5)
+SCHEDULER_WORKERS = getattr(settings, 'SCHEDULER_WORKERS', 2)
+MESSAGE_LIMIT = 4000
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/')
+            step = int(step)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-'))
+        else:
+            start = end = int(part)
+            if step != 1:
+                end = high
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f'{text!r} is outside {low}-{high}')
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class Cron:
+    """Standard five-field cron schedule: minute hour day-of-month month day-of-week."""
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = ALIASES.get(expression, expression).split()
+        if len(fields) != 5:
+            raise ValueError(f'Expected 5 cron fields in {expression!r}')
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        # 0 and 7 are both Sunday
+        self.weekdays = {day % 7 for day in _parse_field(fields[4], 0, 7)}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def _day_matches(self, when):
+        day = when.day in self.days
+        weekday = (when.weekday() + 1) % 7 in self.weekdays
+        # As in cron: when both are restricted, either one matching is enough
+        if not self.any_day and not self.any_weekday:
+            return day or weekday
+        return day and weekday
+
+    def next_after(self, when):
+        """First matching minute strictly after `when`."""
+        when = when.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Four years covers every valid schedule, including Feb 29
+        limit = when + timedelta(days=4 * 366)
+        while when < limit:
+            if when.month not in self.months:
+                when = (when.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(when):
+                when = when.replace(hour=0, minute=0) + timedelta(days=1)
+            elif when.hour not in self.hours:
+                when = when.replace(minute=0) + timedelta(hours=1)
+            elif when.minute not in self.minutes:
+                when += timedelta(minutes=1)
+            else:
+                return when
+        raise ValueError(f'{self.expression!r} never matches')
+
+    def __str__(self):
+        return self.expression
+
+
+class Job:
+
+    def __init__(self, name, func, schedule, jitter=0, timeout=3600):
+        self.name = name
+        self.func = func
+        self.cron = Cron(schedule)
+        self.jitter = jitter
+        self.timeout = timeout
+
+    def next_run(self, after):
+        return self.cron.next_after(timezone.localtime(after)) + timedelta(seconds=random.uniform(0, self.jitter))
+
+
+JOBS = {}
+
+
+def job(schedule, name=None, jitter=0, timeout=3600):
+    """Register the decorated function as a periodic job.
+
+    Its return value, if any, is stored as the run's message. `timeout` is
+    how long a claim lasts before another node may assume this one died."""
+    def register(func):
+        job_name = name or func.__name__
+        JOBS[job_name] = Job(job_name, func, schedule, jitter=jitter, timeout=timeout)
+        return func
+    return register
+
+
+def node_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Scheduler:
+
+    def __init__(self, jobs=None, node=None, workers=SCHEDULER_WORKERS):
+        self.jobs = dict(JOBS if jobs is None else jobs)
+        self.node = node or node_name()
+        self.workers = workers
+        self._executor = None
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def sync(self):
+        """Create the JobLock rows of new jobs, scheduled from now."""
+        now = timezone.now()
+        existing = set(JobLock.objects.filter(name__in=self.jobs).values_list('name', flat=True))
+        for name, job in self.jobs.items():
+            if name not in existing:
+                try:
+                    JobLock.objects.create(name=name, next_run_at=job.next_run(now))
+                except IntegrityError:
+                    # Another node created it first
+                    pass
+
+    def claim(self, job, now, force=False):
+        """Take the lease on `job` if it is due and free. True if this node won it."""
+        available = JobLock.objects.filter(name=job.name).filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+        if not force:
+            available = available.filter(next_run_at__lte=now)
+        return available.update(
+            owner=self.node,
+            locked_until=now + timedelta(seconds=job.timeout),
+            next_run_at=job.next_run(now),
+        ) == 1
+
+    def run(self, job):
+        """Run a claimed job, record the JobRun and release the lease."""
+        started_at = timezone.now()
+        start = time.perf_counter()
+        try:
+            result = job.func()
+            status, message = JobRun.OK, '' if result is None else str(result)
+        except Exception:
+            logger.exception('Job %s failed', job.name)
+            status, message = JobRun.FAILED, traceback.format_exc()
+        duration = time.perf_counter() - start
+        JobRun.objects.create(
+            job=job.name,
+            node=self.node,
+            started_at=started_at,
+            duration=duration,
+            status=status,
+            message=message[-MESSAGE_LIMIT:],
+        )
+        JobLock.objects.filter(name=job.name, owner=self.node).update(locked_until=None)
+        logger.info('Job %s: %s in %.2fs', job.name, status, duration)
+        return status
+
+    def run_now(self, name):
+        """Run `name` immediately, unless another node holds its lease."""
+        self.sync()
+        job = self.jobs[name]
+        if not self.claim(job, timezone.now(), force=True):
+            return None
+        return self.run(job)
+
+    def _run_in_thread(self, job):
+        close_old_connections()
+        try:
+            self.run(job)
+        finally:
+            close_old_connections()
+            with self._running_lock:
+                self._running.discard(job.name)
+
+    def tick(self):
+        """Start every due job this node can claim; returns their names."""
+        now = timezone.now()
+        due = JobLock.objects.filter(
+            name__in=self.jobs, next_run_at__lte=now,
+        ).filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now)).values_list('name', flat=True)
+        started = []
+        for name in due:
+            with self._running_lock:
+                if name in self._running:
+                    continue
+            job = self.jobs[name]
+            if not self.claim(job, now):
+                continue
+            started.append(name)
+            if self.workers <= 1:
+                self.run(job)
+                continue
+            with self._running_lock:
+                self._running.add(name)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scheduler')
+            self._executor.submit(self._run_in_thread, job)
+        return started
+
+    def run_forever(self, interval=SCHEDULER_TICK):
+        self.sync()
+        logger.info('Scheduler %s running %d job(s)', self.node, len(self.jobs))
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.tick()
+                except Exception:
+                    # A database hiccup must not kill the scheduler
+                    logger.exception('Scheduler tick failed')
+                self._stop.wait(interval)
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        self._stop.set()
+
+    def shutdown(self):
+        """Wait for running jobs to finish."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
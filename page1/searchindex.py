@@ -0,0 +1,198 @@
+"""Static search index for album-style filtering without the origin.
+
+`manage.py export_search_index` writes the published listings to
+SEARCH_INDEX_ROOT as one shard per city plus a manifest:
+
+    search-index/manifest.json          current version, shard list
+    search-index/v<change id>/<slug>.bin  one shard per city (+ .gz)
+
+The version is the ListingChange position the export was taken at, so a
+version directory never changes once written and can be cached forever;
+only manifest.json is short-lived. static/assets/js/search-index.js
+loads the manifest and the shards it needs and applies the same filters
+as filters.filter_listings (keyword in title, city, min bedrooms, max
+price).
+
+Shard layout (little-endian):
+    4 bytes   magic b'RMX1'
+    uint32    header length
+    header    UTF-8 JSON, padded with spaces to a multiple of 8 bytes
+    columns   one typed array per NUMERIC_COLUMNS entry, in that order
+
+The header holds the row count, the string columns and an inverted
+keyword index: every whitespace-separated lowercase title word -> the
+rows whose title contains it. Rows are ordered newest first, like the
+album page.
+"""
+import gzip
+import json
+import shutil
+import struct
+import sys
+from array import array
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import market
+from .changes import latest_change_id
+from .models import Listing
+from .viewmodels import card_excerpt
+
+MAGIC = b'RMX1'
+FORMAT_VERSION = 1
+SEARCH_INDEX_ROOT = Path(getattr(settings, 'SEARCH_INDEX_ROOT', Path(settings.STATIC_ROOT) / 'search-index'))
+# Older version directories kept for clients still holding the previous manifest
+KEEP_VERSIONS = 2
+
+# name -> array typecode. 'd' columns come first so every column stays aligned.
+NUMERIC_COLUMNS = (
+    ('price', 'd'),
+    ('id', 'i'),
+    ('bedrooms', 'i'),
+    ('bathrooms', 'i'),
+    ('sqft', 'i'),
+    ('listed', 'i'),  # list_date, unix seconds
+    ('flags', 'i'),  # FLAG_* bits
+)
+STRING_COLUMNS = ('title', 'state', 'image', 'excerpt', 'facts')
+FLAG_FEATURED = 1
+FLAG_BELOW_MARKET = 2
+
+
+def tokenize(title):
+    return title.lower().split()
+
+
+def _pack_array(typecode, values):
+    packed = array(typecode, values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def build_shard(version, city, listings):
+    """Encode the listings of one city, newest first, as shard bytes."""
+    numeric = {name: [] for name, _ in NUMERIC_COLUMNS}
+    strings = {name: [] for name in STRING_COLUMNS}
+    keywords = defaultdict(list)
+    for row, listing in enumerate(listings):
+        numeric['price'].append(listing.price)
+        numeric['id'].append(listing.id)
+        numeric['bedrooms'].append(listing.bedrooms)
+        numeric['bathrooms'].append(listing.bathrooms)
+        numeric['sqft'].append(listing.sqft)
+        numeric['listed'].append(int(listing.list_date.timestamp()))
+        numeric['flags'].append(
+            (FLAG_FEATURED if listing.is_featured else 0) | (FLAG_BELOW_MARKET if market.is_below_market(listing) else 0)
+        )
+        strings['title'].append(listing.title)
+        strings['state'].append(listing.state)
+        strings['image'].append(listing.cover_url or '')
+        strings['excerpt'].append(card_excerpt(listing.description))
+        strings['facts'].append(f'{listing.bedrooms} bed • {listing.bathrooms} bath • {listing.garage} car')
+        for token in dict.fromkeys(tokenize(listing.title)):
+            keywords[token].append(row)
+
+    header = json.dumps({
+        'format': FORMAT_VERSION,
+        'version': version,
+        'city': city,
+        'count': len(numeric['id']),
+        'columns': [[name, typecode] for name, typecode in NUMERIC_COLUMNS],
+        'strings': strings,
+        'keywords': keywords,
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-len(header) % 8)
+    parts = [MAGIC, struct.pack('<I', len(header)), header]
+    parts += [_pack_array(typecode, numeric[name]) for name, typecode in NUMERIC_COLUMNS]
+    return b''.join(parts)
+
+
+def _write(path, content):
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(content)
+    tmp.replace(path)
+    compressed = gzip.compress(content, compresslevel=9, mtime=0)
+    if len(compressed) < len(content) * 0.95:
+        gz = path.with_name(path.name + '.gz.tmp')
+        gz.write_bytes(compressed)
+        gz.replace(path.with_name(path.name + '.gz'))
+
+
+def current_version(root=SEARCH_INDEX_ROOT):
+    try:
+        return json.loads((Path(root) / 'manifest.json').read_text())['version']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def export(root=SEARCH_INDEX_ROOT, force=False):
+    """Write shards and manifest for the current change-log position.
+
+    Returns the manifest, or None when the index is already at that version."""
+    root = Path(root)
+    version = latest_change_id()
+    if not force and current_version(root) == version:
+        return None
+
+    by_city = defaultdict(list)
+    listings = (
+        Listing.objects.filter(is_published=True)
+        .order_by('-list_date')
+        .prefetch_related('images')
+    )
+    for listing in listings.iterator(chunk_size=1000):
+        by_city[listing.city].append(listing)
+
+    version_dir = root / f'v{version}'
+    version_dir.mkdir(parents=True, exist_ok=True)
+    shards = []
+    slugs = set()
+    for city in sorted(by_city):
+        # 'Pune' and 'pune ' are different cities to the album filter but share a slug
+        base = slug = slugify(city) or 'other'
+        suffix = 1
+        while slug in slugs:
+            suffix += 1
+            slug = f'{base}-{suffix}'
+        slugs.add(slug)
+        rows = by_city[city]
+        path = version_dir / f'{slug}.bin'
+        _write(path, build_shard(version, city, rows))
+        shards.append({
+            'city': city,
+            'file': f'v{version}/{path.name}',
+            'count': len(rows),
+            'min_price': min(listing.price for listing in rows),
+            'max_price': max(listing.price for listing in rows),
+            'bytes': path.stat().st_size,
+        })
+
+    manifest = {
+        'format': FORMAT_VERSION,
+        'version': version,
+        'generated_at': timezone.now().isoformat(),
+        # The client builds detail links from this, with 0 replaced by the id
+        'detail_url': reverse('listing_detail', args=[0]),
+        'flags': {'featured': FLAG_FEATURED, 'below_market': FLAG_BELOW_MARKET},
+        'shards': shards,
+    }
+    # Shards first, then the manifest that points at them
+    _write(root / 'manifest.json', json.dumps(manifest, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    prune(root, keep=KEEP_VERSIONS)
+    return manifest
+
+
+def prune(root=SEARCH_INDEX_ROOT, keep=KEEP_VERSIONS):
+    """Delete all but the newest `keep` version directories."""
+    versions = sorted(
+        (path for path in Path(root).glob('v*') if path.is_dir() and path.name[1:].isdigit()),
+        key=lambda path: int(path.name[1:]),
+    )
+    for path in versions[:-keep]:
+        shutil.rmtree(path, ignore_errors=True)
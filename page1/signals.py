@@ -0,0 +1,71 @@
+from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+
+from . import alerts, imageserver, reaper, warming
+from .models import Listing, ListingChange, PropertyImage, Realtor, SavedSearch
+from .similar import bump_version as bump_similar_version
+from .viewmodels import invalidate_featured_sections, invalidate_listing_detail
+
+
+# Listing.save() and PropertyImage.save() send post_save inside their
+# transaction. Cache entries are dropped once it commits: dropped earlier, a
+# concurrent reader could rebuild them from the old rows and cache those.
+
+@receiver([post_save, post_delete], sender=Listing)
+def listing_changed(sender, instance, **kwargs):
+    listing_id = instance.pk
+    transaction.on_commit(lambda: invalidate_listing_detail(listing_id))
+    bump_similar_version()
+    # Edits can wait for the home page to revalidate; listings appearing or disappearing cannot
+    # was_published is None when is_published was deferred, i.e. not written
+    was_published = instance.was_published
+    if kwargs.get('created') is not None and (was_published is None or instance.is_published == was_published):
+        return
+    transaction.on_commit(invalidate_featured_sections)
+
+
+@receiver(post_save, sender=Listing)
+def listing_saved(sender, instance, created, **kwargs):
+    if (created or instance.was_published is False) and instance.is_published:
+        alerts.listing_published(instance)
+        warming.listing_published(instance)
+
+
+@receiver(post_delete, sender=Listing)
+def listing_deleted(sender, instance, **kwargs):
+    # Sent inside the delete's transaction. Soft-deleted listings were
+    # already logged as deleted when they were hidden.
+    if not instance.is_deleted:
+        ListingChange.record(instance.pk, ListingChange.DELETE)
+
+
+@receiver([post_save, post_delete], sender=PropertyImage)
+def property_image_changed(sender, instance, **kwargs):
+    listing_id = instance.listing_id
+    transaction.on_commit(lambda: invalidate_listing_detail(listing_id))
+
+
+@receiver(post_delete, sender=PropertyImage)
+def property_image_deleted(sender, instance, **kwargs):
+    # A reaped listing was logged as deleted already; its images need no entries
+    if not reaper.reaping.get():
+        ListingChange.record(instance.listing_id, ListingChange.IMAGES)
+    # Also covers the reaper's chunked deletes; files go once the rows are really gone
+    transaction.on_commit(lambda: imageserver.variants.remove_image(instance.pk))
+
+
+@receiver(post_save, sender=Realtor)
+def realtor_changed(sender, instance, **kwargs):
+    # The realtor card is embedded in every one of their listing pages
+    listing_ids = list(instance.listings.values_list('id', flat=True))
+    if listing_ids:
+        transaction.on_commit(lambda: invalidate_listing_detail(*listing_ids))
+        if instance.mvp_changed:
+            # is_mvp feeds the ranking score
+            Listing.objects.filter(id__in=listing_ids).update(ranked_at=None)
+
+
+@receiver([post_save, post_delete], sender=SavedSearch)
+def saved_search_changed(sender, instance, **kwargs):
+    alerts.bump_version()
@@ -0,0 +1,206 @@
+"""Recommender behind the "Similar properties" section of listing_detail.
+
+Published listings are held in memory as a NumPy feature matrix: log
+price, log sqft, bedrooms, bathrooms, garage and lot size, standardized,
+plus the city as a one-hot block. A top-k query is one vectorized
+squared-Euclidean pass over the matrix followed by `argpartition`.
+
+The one-hot block is never materialized. The squared distance between
+two one-hot rows is 0 for the same city and 2 otherwise, so the city
+term is computed from an integer city code column. Query cost stays
+O(n * 6) however many cities there are.
+
+Signals bump a version number on listing changes. The index notices the
+bump on its next query and rebuilds in a background thread, serving the
+previous snapshot meanwhile. The first snapshot of a worker is built in the
+background too; until it is ready, and without NumPy, `similar_listings`
+falls back to a single database query: same city, nearest price.
+"""
+import importlib.util
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Abs
+
+from .models import Listing
+from .viewmodels import summaries
+
+logger = logging.getLogger(__name__)
+
+# Optional: without NumPy the recommender degrades to a DB query. NumPy is
+# imported when the first index is built, not when a worker boots.
+_NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+
+# Weight of "different city" relative to one standard deviation of a numeric feature
+CITY_WEIGHT = getattr(settings, 'SIMILAR_CITY_WEIGHT', 1.5)
+# Minimum seconds between two rebuilds of the in-memory index
+REBUILD_INTERVAL = getattr(settings, 'SIMILAR_REBUILD_INTERVAL', 60)
+
+VERSION_KEY = 'similar:version'
+
+FEATURE_COLUMNS = ('price', 'sqft', 'bedrooms', 'bathrooms', 'garage', 'lot_size')
+
+
+def bump_version():
+    """Mark the in-memory indexes of every worker as stale."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def current_version():
+    return cache.get(VERSION_KEY, 0)
+
+
+class SimilarityIndex:
+    """Immutable snapshot of the feature matrix for a set of listings."""
+
+    def __init__(self, rows, version=0):
+        """`rows` are (id, price, sqft, bedrooms, bathrooms, garage, lot_size, city) tuples."""
+        import numpy as np
+
+        self.version = version
+        self.built_at = time.monotonic()
+
+        count = len(rows)
+        self.ids = np.empty(count, dtype=np.int64)
+        numeric = np.empty((count, len(FEATURE_COLUMNS)), dtype=np.float32)
+        self.city_codes = np.empty(count, dtype=np.int32)
+        city_index = {}
+
+        for i, (pk, price, sqft, bedrooms, bathrooms, garage, lot_size, city) in enumerate(rows):
+            self.ids[i] = pk
+            numeric[i] = (
+                math.log1p(max(price, 0)),
+                math.log1p(max(sqft, 0)),
+                bedrooms,
+                bathrooms,
+                garage,
+                float(lot_size),
+            )
+            self.city_codes[i] = city_index.setdefault(city.strip().lower(), len(city_index))
+
+        if count:
+            mean = numeric.mean(axis=0)
+            std = numeric.std(axis=0)
+            std[std < 1e-6] = 1.0
+            numeric = (numeric - mean) / std
+
+        self.features = numeric
+        self.norms = np.einsum('ij,ij->i', numeric, numeric)
+        self.positions = {int(pk): i for i, pk in enumerate(self.ids)}
+        self._city_penalty = np.float32(2 * CITY_WEIGHT ** 2)
+
+    @classmethod
+    def load(cls, version=0):
+        rows = Listing.objects.filter(is_published=True).values_list('id', *FEATURE_COLUMNS, 'city')
+        return cls(list(rows), version=version)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nearest(self, listing_id, k=3):
+        """Ids of the `k` listings closest to `listing_id`, nearest first.
+
+        Returns None when `listing_id` is not in this snapshot."""
+        import numpy as np
+
+        position = self.positions.get(listing_id)
+        if position is None:
+            return None
+        if len(self) < 2:
+            return []
+        k = min(k, len(self) - 1)
+
+        query = self.features[position]
+        # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2, plus the one-hot city term
+        distances = self.norms - 2 * (self.features @ query) + self.norms[position]
+        distances += self._city_penalty * (self.city_codes != self.city_codes[position])
+        distances[position] = np.inf
+
+        candidates = np.argpartition(distances, k)[:k]
+        ordered = candidates[np.argsort(distances[candidates])]
+        return [int(pk) for pk in self.ids[ordered]]
+
+
+class _IndexHolder:
+    """Per-process index that refreshes itself in the background when stale."""
+
+    def __init__(self):
+        self._index = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._failed_at = float('-inf')
+
+    def get(self):
+        """The current snapshot, or None while the first one is being built."""
+        version = current_version()
+        index = self._index
+        if index is None:
+            # Loading every published listing takes seconds at scale; requests
+            # must not wait for it
+            self._rebuild_async(version)
+            return None
+        if index.version != version and time.monotonic() - index.built_at >= REBUILD_INTERVAL:
+            self._rebuild_async(version)
+        return index
+
+    def _rebuild_async(self, version):
+        with self._lock:
+            # After a failure, wait as long as between two rebuilds before retrying
+            if self._rebuilding or time.monotonic() - self._failed_at < REBUILD_INTERVAL:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, args=(version,), name='similar-rebuild', daemon=True).start()
+
+    def _rebuild(self, version):
+        try:
+            self._index = SimilarityIndex.load(version)
+        except Exception:
+            self._failed_at = time.monotonic()
+            logger.exception('Failed to rebuild the similar listings index')
+        finally:
+            self._rebuilding = False
+            connection.close()
+
+
+_holder = _IndexHolder()
+
+
+def _similar_ids_from_db(listing_id, k):
+    listing = Listing.objects.filter(pk=listing_id).values('city', 'price').first()
+    if listing is None:
+        return []
+    return list(
+        Listing.objects.filter(is_published=True, city__iexact=listing['city'])
+        .exclude(pk=listing_id)
+        .annotate(price_gap=Abs(F('price') - listing['price']))
+        .order_by('price_gap')
+        .values_list('id', flat=True)[:k]
+    )
+
+
+def similar_listing_ids(listing_id, k=3):
+    index = _holder.get() if _NUMPY_AVAILABLE else None
+    if index is not None:
+        ids = index.nearest(listing_id, k)
+        if ids is not None:
+            return ids
+    # No NumPy, no snapshot yet, or a listing published after it was built
+    return _similar_ids_from_db(listing_id, k)
+
+
+def similar_listings(listing_id, k=3):
+    """Published listings most similar to `listing_id`, nearest first."""
+    ids = similar_listing_ids(listing_id, k)
+    if not ids:
+        return []
+    by_id = {summary.id: summary for summary in summaries(Listing.objects.filter(is_published=True, id__in=ids))}
+    return [by_id[pk] for pk in ids if pk in by_id]
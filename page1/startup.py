@@ -0,0 +1,80 @@
+"""Import cost of booting a web worker, checked by `manage.py check_startup`.
+
+A fresh interpreter is started with `-X importtime`. It builds the WSGI
+application and loads the URLconf, which is what a gunicorn worker does
+before it serves its first request. Modules that only a few views need
+(ReportLab, Pillow, pebble, NumPy, python-dotenv) must not be loaded at
+all: they are imported inside the code that uses them. That is the check.
+The import time reported by Python is summed and reported too; it depends
+on the machine, so it fails the check only against an explicit budget.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Milliseconds, or None to only report the import time
+IMPORT_BUDGET_MS = getattr(settings, 'STARTUP_IMPORT_BUDGET_MS', None)
+LAZY_MODULES = getattr(settings, 'STARTUP_LAZY_MODULES', ('reportlab', 'PIL', 'pebble', 'numpy', 'dotenv'))
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+BOOT_SCRIPT = '''
+import json, resource, sys
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({
+    'modules': sorted(sys.modules),
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+'''
+
+
+class Startup:
+    """Measurements of one cold worker boot."""
+
+    def __init__(self, imports, modules, max_rss_kb):
+        self.imports = imports  # [(name, self us, cumulative us, depth)] in import order
+        self.modules = modules
+        self.max_rss_kb = max_rss_kb
+
+    @property
+    def import_ms(self):
+        return sum(own for _, own, _, _ in self.imports) / 1000
+
+    def lazy_modules_loaded(self, lazy=LAZY_MODULES):
+        return sorted({name.split('.')[0] for name in self.modules} & set(lazy))
+
+    def slowest(self, count=10, prefixes=None):
+        """Top-level imports (or those under `prefixes`) by cumulative time."""
+        rows = [
+            (name, cumulative) for name, _, cumulative, depth in self.imports
+            if (name.startswith(prefixes) if prefixes else depth == 0)
+        ]
+        return sorted(rows, key=lambda row: -row[1])[:count]
+
+
+def measure(python=sys.executable):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 're_market.settings')}
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', BOOT_SCRIPT],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            imports.append((name, int(own), int(cumulative), (len(indent) - 1) // 2))
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return Startup(imports, report['modules'], report['max_rss_kb'])
+
+
+def measure_best(runs=3):
+    """The run with the lowest import time, to keep disk cache and scheduler noise out."""
+    return min((measure() for _ in range(runs)), key=lambda startup: startup.import_ms)
@@ -0,0 +1,218 @@
+/*
+ * Client for the static search index written by `manage.py export_search_index`
+ * (see page1/searchindex.py for the shard layout).
+ *
+ *   const index = new ListingSearchIndex('/static/search-index/')
+ *   const { results, total } = await index.search({ keyword: 'villa', city: 'pune', max_price: 5000000 })
+ *   ListingSearchIndex.renderCards(document.querySelector('#results'), results)
+ *
+ * Filters follow page1/filters.py: keyword is a case-insensitive substring
+ * of the title, city a substring of the city, bedrooms a minimum and
+ * max_price a maximum. Results are newest first, like the album page.
+ */
+(() => {
+  'use strict'
+
+  const MAGIC = 'RMX1'
+  const TYPED_ARRAYS = { d: Float64Array, i: Int32Array }
+
+  const decodeShard = buffer => {
+    const view = new DataView(buffer)
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4))
+    if (magic !== MAGIC) {
+      throw new Error(`Not a search index shard: ${magic}`)
+    }
+    const headerLength = view.getUint32(4, true)
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)))
+    const columns = {}
+    let offset = 8 + headerLength
+    for (const [name, typecode] of header.columns) {
+      const Type = TYPED_ARRAYS[typecode]
+      // Shards are little-endian, like every browser engine in use
+      columns[name] = new Type(buffer, offset, header.count)
+      offset += header.count * Type.BYTES_PER_ELEMENT
+    }
+    return { ...header, numeric: columns }
+  }
+
+  // Every suffix of every keyword token, sorted, so a substring of a token
+  // is a prefix of one of its suffixes and can be found by binary search.
+  // Built once per shard on the first keyword search.
+  const suffixIndex = shard => {
+    if (!shard.suffixes) {
+      const suffixes = []
+      for (const token of Object.keys(shard.keywords)) {
+        for (let start = 0; start < token.length; start++) {
+          suffixes.push([token.slice(start), token])
+        }
+      }
+      suffixes.sort((a, b) => (a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0))
+      shard.suffixes = suffixes
+    }
+    return shard.suffixes
+  }
+
+  // Rows whose title may contain `keyword`; titles are checked exactly afterwards
+  const keywordCandidates = (shard, keyword) => {
+    const word = keyword.split(/\s+/).find(part => part)
+    const suffixes = suffixIndex(shard)
+    let low = 0
+    let high = suffixes.length
+    while (low < high) {
+      const middle = (low + high) >>> 1
+      if (suffixes[middle][0] < word) {
+        low = middle + 1
+      } else {
+        high = middle
+      }
+    }
+    const rows = new Set()
+    for (let i = low; i < suffixes.length && suffixes[i][0].startsWith(word); i++) {
+      for (const row of shard.keywords[suffixes[i][1]]) {
+        rows.add(row)
+      }
+    }
+    return rows
+  }
+
+  class ListingSearchIndex {
+    constructor (baseUrl) {
+      this.baseUrl = baseUrl.endsWith('/') ? baseUrl : `${baseUrl}/`
+      this.manifest = null
+      this.shards = new Map()
+    }
+
+    async load () {
+      // The manifest is short-lived; shards are immutable per version
+      const response = await fetch(`${this.baseUrl}manifest.json`, { cache: 'no-cache' })
+      const manifest = await response.json()
+      if (!this.manifest || this.manifest.version !== manifest.version) {
+        this.shards.clear()
+      }
+      this.manifest = manifest
+      return manifest
+    }
+
+    async shard (entry) {
+      if (!this.shards.has(entry.file)) {
+        const promise = fetch(this.baseUrl + entry.file)
+          .then(response => {
+            if (!response.ok) {
+              throw new Error(`${entry.file}: HTTP ${response.status}`)
+            }
+            return response.arrayBuffer()
+          })
+          .then(decodeShard)
+        promise.catch(() => this.shards.delete(entry.file))
+        this.shards.set(entry.file, promise)
+      }
+      return this.shards.get(entry.file)
+    }
+
+    cities () {
+      return this.manifest ? this.manifest.shards.map(entry => [entry.city, entry.count]) : []
+    }
+
+    async search (params = {}, { limit = 60 } = {}) {
+      if (!this.manifest) {
+        await this.load()
+      }
+      const keyword = (params.keyword || '').trim().toLowerCase()
+      const city = (params.city || '').trim().toLowerCase()
+      const bedrooms = parseInt(params.bedrooms, 10)
+      const maxPrice = parseInt(params.max_price, 10)
+
+      // Only fetch the shards that can hold a match
+      const entries = this.manifest.shards.filter(entry =>
+        entry.city.toLowerCase().includes(city) && (isNaN(maxPrice) || entry.min_price <= maxPrice)
+      )
+      const shards = await Promise.all(entries.map(entry => this.shard(entry)))
+
+      const matches = []
+      for (const shard of shards) {
+        const { price, bedrooms: beds, listed } = shard.numeric
+        const rows = keyword ? keywordCandidates(shard, keyword) : null
+        for (let row = 0; row < shard.count; row++) {
+          if (rows && !rows.has(row)) continue
+          if (!isNaN(bedrooms) && beds[row] < bedrooms) continue
+          if (!isNaN(maxPrice) && price[row] > maxPrice) continue
+          if (keyword && !shard.strings.title[row].toLowerCase().includes(keyword)) continue
+          matches.push([listed[row], shard, row])
+        }
+      }
+      matches.sort((a, b) => b[0] - a[0])
+      return {
+        version: this.manifest.version,
+        total: matches.length,
+        results: matches.slice(0, limit).map(([, shard, row]) => this.row(shard, row))
+      }
+    }
+
+    row (shard, row) {
+      const { numeric, strings } = shard
+      const flags = this.manifest.flags
+      const id = numeric.id[row]
+      return {
+        id,
+        city: shard.city,
+        state: strings.state[row],
+        title: strings.title[row],
+        price: numeric.price[row],
+        bedrooms: numeric.bedrooms[row],
+        bathrooms: numeric.bathrooms[row],
+        sqft: numeric.sqft[row],
+        listed: new Date(numeric.listed[row] * 1000),
+        image: strings.image[row],
+        excerpt: strings.excerpt[row],
+        facts: strings.facts[row],
+        featured: Boolean(numeric.flags[row] & flags.featured),
+        belowMarket: Boolean(numeric.flags[row] & flags.below_market),
+        url: this.manifest.detail_url.replace('/0/', `/${id}/`)
+      }
+    }
+
+    // Cards with the markup of components/property_card.html
+    static renderCards (container, results) {
+      container.replaceChildren(...results.map(result => {
+        const column = document.createElement('div')
+        column.className = 'col'
+        const card = document.createElement('div')
+        card.className = 'card shadow-sm h-100 d-flex flex-column position-relative'
+        if (result.image) {
+          const image = document.createElement('img')
+          image.src = result.image
+          image.className = 'card-img-top'
+          image.loading = 'lazy'
+          card.append(image)
+        }
+        const body = document.createElement('div')
+        body.className = 'card-body d-flex flex-column'
+        const title = document.createElement('h6')
+        title.className = 'mb-2'
+        title.textContent = result.title
+        const place = document.createElement('p')
+        place.className = 'card-text mb-2 text-muted small'
+        place.textContent = `${result.city}, ${result.state} — ₹${result.price}`
+        const excerpt = document.createElement('p')
+        excerpt.className = 'card-text mb-3'
+        excerpt.textContent = result.excerpt
+        const footer = document.createElement('div')
+        footer.className = 'mt-auto d-flex justify-content-between align-items-center'
+        const link = document.createElement('a')
+        link.className = 'btn btn-sm btn-bd-primary'
+        link.href = result.url
+        link.textContent = 'View'
+        const facts = document.createElement('small')
+        facts.className = 'text-muted'
+        facts.textContent = result.facts
+        footer.append(link, facts)
+        body.append(title, place, excerpt, footer)
+        card.append(body)
+        column.append(card)
+        return column
+      }))
+    }
+  }
+
+  window.ListingSearchIndex = ListingSearchIndex
+})()
@@ -0,0 +1,80 @@
+"""Streamed rendering for long result pages.
+
+The page template is rendered once in the view, with only the first few
+rows and STREAM_MARKER where the remaining rows belong. Everything
+before the marker goes out as the first chunk. The remaining rows are
+fetched and rendered through a fragment template `chunk_size` rows at a
+time, so memory stays bounded. Each chunk is its own short query: no
+database cursor stays open while the client reads the response.
+
+Rendering the page itself up front keeps CSRF cookies and message
+storage working: both are settled before the response leaves the
+middleware stack. Under ASGI the row chunks come from an async
+iterator, because Django would otherwise buffer a sync iterator in full.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+STREAM_MARKER = mark_safe('<!--stream:rows-->')
+
+
+def iter_chunked(queryset, chunk_size):
+    """`queryset`'s rows in order, fetched `chunk_size` at a time by primary key."""
+    pks = list(queryset.values_list('pk', flat=True))
+    for start in range(0, len(pks), chunk_size):
+        chunk = pks[start:start + chunk_size]
+        found = queryset.order_by().in_bulk(chunk)
+        yield from (found[pk] for pk in chunk if pk in found)
+
+
+def _render_rows(fragment, name, rows, chunk_size):
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield fragment.render({name: chunk})
+
+
+def _stream(head, body, tail):
+    yield head
+    yield from body
+    yield tail
+
+
+async def _astream(head, body, tail):
+    next_chunk = sync_to_async(lambda: next(body, None), thread_sensitive=True)
+    yield head
+    while (chunk := await next_chunk()) is not None:
+        yield chunk
+    yield tail
+
+
+def stream_template(request, template_name, context, name, queryset, fragment_name, first=3, chunk_size=24):
+    """StreamingHttpResponse for `template_name` with `queryset` rows streamed as `name`.
+
+    `queryset` is a QuerySet, read in chunks with iter_chunked(), or any
+    lazy iterable of rows that does not hold a cursor open. The page template renders context[name] (the first `first`
+    rows) followed by {{ stream_marker }}. `fragment_name` renders one
+    chunk of rows from the same variable."""
+    if hasattr(queryset, 'iterator'):
+        rows = iter_chunked(queryset, max(chunk_size, first))
+    else:
+        rows = iter(queryset)
+    page = render_to_string(template_name, {
+        **context,
+        name: list(islice(rows, first)),
+        'stream_marker': STREAM_MARKER,
+    }, request)
+    head, tail = page.split(STREAM_MARKER, 1)
+
+    body = _render_rows(get_template(fragment_name), name, rows, chunk_size)
+    if isinstance(request, ASGIRequest):
+        content = _astream(head, body, tail)
+    else:
+        content = _stream(head, body, tail)
+    return StreamingHttpResponse(content, content_type='text/html; charset=utf-8')
@@ -0,0 +1,27 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+_inlined = {}
+
+
+@register.simple_tag
+def inline_static(path):
+    """Contents of a collected static file, read once per process.
+
+    Returns '' under DEBUG or before collectstatic has built the file, so
+    templates can fall back to a plain <link>."""
+    if settings.DEBUG:
+        return ''
+    content = _inlined.get(path)
+    if content is None:
+        try:
+            with staticfiles_storage.open(path) as f:
+                content = f.read().decode('utf-8')
+        except (OSError, ValueError):
+            content = ''
+        _inlined[path] = content
+    return mark_safe(content)
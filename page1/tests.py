@@ -1,3 +1,84 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
 
-# Create your tests here.
+from . import ratelimit, startup
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'page1-tests'}}
+
+
+class StartupTests(SimpleTestCase):
+    def test_lazy_modules_not_imported_at_boot(self):
+        # The deterministic half of `manage.py check_startup`; import time is machine dependent
+        result = startup.measure()
+        self.assertEqual(result.lazy_modules_loaded(), [])
+        self.assertIn('page1.urls', result.modules)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_allows_up_to_capacity_then_blocks(self):
+        capacity, period = ratelimit.LIMITS['email']
+        for _ in range(capacity):
+            self.assertEqual(ratelimit.take_tokens([('email', 'a@example.com')], now=1000), (True, 0))
+        allowed, retry_after = ratelimit.take_tokens([('email', 'a@example.com')], now=1000)
+        self.assertFalse(allowed)
+        self.assertEqual(retry_after, int(period / capacity) + 1)
+        # Other senders have their own bucket
+        self.assertEqual(ratelimit.take_tokens([('email', 'b@example.com')], now=1000), (True, 0))
+
+    def test_window_refills(self):
+        capacity, period = ratelimit.LIMITS['email']
+        for _ in range(capacity):
+            ratelimit.take_tokens([('email', 'a@example.com')], now=1000)
+        self.assertFalse(ratelimit.take_tokens([('email', 'a@example.com')], now=1000)[0])
+        # One token comes back every period / capacity seconds
+        self.assertTrue(ratelimit.take_tokens([('email', 'a@example.com')], now=1000 + period / capacity)[0])
+        self.assertFalse(ratelimit.take_tokens([('email', 'a@example.com')], now=1000 + period / capacity)[0])
+
+    def test_blocked_request_takes_no_tokens(self):
+        capacity, _ = ratelimit.LIMITS['email']
+        for _ in range(capacity):
+            ratelimit.take_tokens([('email', 'a@example.com')], now=1000)
+        for _ in range(3):
+            ratelimit.take_tokens([('ip', '10.0.0.1'), ('email', 'a@example.com')], now=1000)
+        # The IP bucket was left untouched by the rejected requests
+        ip_capacity, _ = ratelimit.LIMITS['ip']
+        for _ in range(ip_capacity):
+            self.assertTrue(ratelimit.take_tokens([('ip', '10.0.0.1')], now=1000)[0])
+
+    def test_duplicates_until_released(self):
+        data = {'name': 'Buyer', 'email': 'buyer@example.com', 'phone': '98765 43210', 'message': 'Still  available?'}
+        factory = RequestFactory()
+        self.assertEqual(ratelimit.check_inquiry(factory.post('/', data), 1), (ratelimit.ALLOWED, 0))
+        same = dict(data, email='BUYER@example.com', message='still available?')
+        self.assertEqual(ratelimit.check_inquiry(factory.post('/', same), 1), (ratelimit.DUPLICATE, 0))
+        ratelimit.release_inquiry(factory.post('/', data), 1)
+        self.assertEqual(ratelimit.check_inquiry(factory.post('/', data), 1), (ratelimit.ALLOWED, 0))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ContactAgentRateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_too_many_inquiries_from_one_ip(self):
+        capacity, _ = ratelimit.LIMITS['ip']
+        for n in range(capacity):
+            # No such listing: the request is still counted before the 404
+            response = self.client.post(
+                '/listing/999/contact/',
+                {'name': 'Buyer', 'email': f'buyer{n}@example.com', 'phone': '1', 'message': f'question {n}'},
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+            )
+            self.assertEqual(response.status_code, 404)
+        response = self.client.post(
+            '/listing/999/contact/',
+            {'name': 'Buyer', 'email': 'another@example.com', 'phone': '1', 'message': 'one more'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(response.json()['success'])
+        self.assertGreater(int(response['Retry-After']), 0)
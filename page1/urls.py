@@ -1,17 +1,26 @@
 from django.urls import path
-from page1.views import album, signup, logout_view, realtor_properties, login_view, featured, listing_detail, delete_property, contact_agent , return_pdf
+from page1 import api
+from page1.views import album, signup, logout_view, realtor_properties, login_view, featured, listing_detail, listing_detail_json, delete_property, contact_agent, return_pdf, save_search, cache_stats, image_variant, reorder_images
 
 urlpatterns = [
     path('album/', album, name='album'),
     path('', featured, name='featured'),
+    path('album/save-search/', save_search, name='save_search'),
     path('signup/', signup, name='signup'),
     path('logout/', logout_view, name='logout_view'),
     path('properties/', realtor_properties, name='realtor_properties'),
     path('properties/delete/<int:id>/', delete_property, name='delete_property'),
+    path('properties/<int:id>/images/reorder/', reorder_images, name='reorder_images'),
     path('login/', login_view, name='login_view'),
     path('listing/<int:id>/', listing_detail, name='listing_detail'),
+    path('listing/<int:id>/json/', listing_detail_json, name='listing_detail_json'),
     path('listing/<int:id>/contact/', contact_agent, name='contact_agent'),
-    path('pdftest',return_pdf,name='return_pdf' )
+    path('pdftest',return_pdf,name='return_pdf' ),
+    path('cache/stats/', cache_stats, name='cache_stats'),
+    path('img/<int:id>/<int:width>x<int:height>.<slug:fmt>', image_variant, name='image_variant'),
+    path('api/v1/listings/', api.listings, name='api_listings'),
+    path('api/v1/listings/<int:id>/', api.listing_detail, name='api_listing_detail'),
+    path('api/v1/changes/', api.changes, name='api_changes'),
 ]
 
 
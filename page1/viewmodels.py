@@ -0,0 +1,250 @@
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Count, OuterRef, Subquery
+from django.utils.text import Truncator
+
+from . import analytics, market
+from .cache import layered
+from .imageserver import variant_url
+from .models import Listing, PropertyImage
+
+
+# Detail pages are invalidated by signals (see signals.py), so the timeout
+# only bounds how long an entry can survive a missed invalidation.
+DETAIL_CACHE_TIMEOUT = getattr(settings, 'LISTING_DETAIL_CACHE_TIMEOUT', 60 * 60)
+PRICE_HISTORY_LIMIT = 10
+# Gallery thumbnails are shown ~100px high; must be one of IMAGE_VARIANT_SIZES
+THUMBNAIL_SIZE = (320, 240)
+# Home page sections and album facets are not invalidated on every edit;
+# they are rebuilt in the background once they are this old
+FEATURED_CACHE_TIMEOUT = getattr(settings, 'FEATURED_CACHE_TIMEOUT', 60)
+FACETS_CACHE_TIMEOUT = getattr(settings, 'FACETS_CACHE_TIMEOUT', 5 * 60)
+STALE_WINDOW = getattr(settings, 'LAYERED_CACHE_STALE_WINDOW', 5 * 60)
+FEATURED_KEY = 'featured_sections'
+MOST_VIEWED_KEY = 'most_viewed_listings'
+MOST_VIEWED_DAYS = 7
+MOST_VIEWED_LIMIT = 3
+CITY_FACETS_KEY = 'facets:cities'
+
+
+EXCERPT_WORDS = 18
+
+
+def card_excerpt(description):
+    return Truncator(description).words(EXCERPT_WORDS, truncate=' …')
+
+
+class ListingSummary(NamedTuple):
+    """The fields a property card prints, for caches and result pages.
+
+    A tuple of small values instead of a model instance: no _state, no
+    FieldFile wrappers, and the description is already cut down to the
+    card excerpt. components/property_card.html renders one."""
+    id: int
+    title: str
+    city: str
+    state: str
+    price: int
+    bedrooms: int
+    bathrooms: int
+    garage: int
+    sqft: int
+    is_featured: bool
+    excerpt: str
+    # Storage name of photo_main, else of the first image; '' when there is none
+    cover: str
+
+    @property
+    def cover_url(self):
+        return default_storage.url(self.cover) if self.cover else None
+
+    @property
+    def below_market(self):
+        # Not stored: cached summaries follow market stats refreshes
+        return market.is_below_market(self)
+
+
+# Columns summary_rows() selects, in ListingSummary order with description
+# and the two cover candidates in place of excerpt and cover
+SUMMARY_COLUMNS = (
+    'id', 'title', 'city', 'state', 'price', 'bedrooms', 'bathrooms', 'garage', 'sqft', 'is_featured',
+    'description', 'photo_main', 'first_image',
+)
+
+
+def summary_rows(queryset):
+    """`queryset` as values_list() rows of SUMMARY_COLUMNS (one query, no prefetch)."""
+    first_image = PropertyImage.objects.filter(listing=OuterRef('pk')).order_by('position')
+    return queryset.annotate(first_image=Subquery(first_image.values('image')[:1])).values_list(*SUMMARY_COLUMNS)
+
+
+def to_summary(row):
+    *fields, description, photo_main, first_image = row
+    return ListingSummary(*fields, card_excerpt(description), photo_main or first_image or '')
+
+
+def summaries(queryset):
+    """ListingSummary list for a Listing queryset, in its order."""
+    return [to_summary(row) for row in summary_rows(queryset)]
+
+
+def iter_summaries(queryset, chunk_size=2000):
+    """Like summaries(), fetched `chunk_size` rows per query.
+
+    The ids are read first, then each chunk is one short query whose cursor
+    is closed before its rows are yielded. A streamed response that a slow
+    client drains never holds a read open (on SQLite that would hold off
+    checkpoints, or every writer in rollback-journal mode)."""
+    ids = list(queryset.values_list('id', flat=True))
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        rows = {row[0]: row for row in summary_rows(queryset.filter(id__in=chunk).order_by())}
+        # Listings deleted since the ids were read are skipped
+        yield from (to_summary(rows[listing_id]) for listing_id in chunk if listing_id in rows)
+
+
+def detail_cache_key(listing_id):
+    return f'listing_detail:{listing_id}'
+
+
+def _file_url(fieldfile):
+    # FieldFile.url raises ValueError when no file is attached
+    return fieldfile.url if fieldfile else ''
+
+
+def build_listing_detail(listing_id):
+    """Build the plain-data view model rendered by listing_detail.html.
+
+    Three queries: the listing joined with its realtor, its images and its
+    recent price history. Returns None when the listing does not exist."""
+    listing = (
+        Listing.objects.select_related('realtor')
+        .filter(pk=listing_id)
+        .first()
+    )
+    if listing is None:
+        return None
+
+    realtor = listing.realtor
+    images = [
+        {
+            'url': _file_url(image.image),
+            # Gallery thumbnails come from the resized variant server (imageserver.py)
+            'thumb_url': variant_url(image.id, *THUMBNAIL_SIZE),
+            'caption': image.caption,
+        }
+        for image in listing.images.only('image', 'caption')
+    ]
+
+    return {
+        'listing': {
+            'id': listing.id,
+            'title': listing.title,
+            'address': listing.address,
+            'city': listing.city,
+            'state': listing.state,
+            'zipcode': listing.zipcode,
+            'description': listing.description,
+            'price': listing.price,
+            'bedrooms': listing.bedrooms,
+            'bathrooms': listing.bathrooms,
+            'garage': listing.garage,
+            'sqft': listing.sqft,
+            'lot_size': listing.lot_size,
+            'photo_main_url': _file_url(listing.photo_main),
+            'is_published': listing.is_published,
+            'is_featured': listing.is_featured,
+            'list_date': listing.list_date,
+            'realtor_id': listing.realtor_id,
+        },
+        'images': images,
+        # Newest first; a single row is just the original asking price
+        'price_history': list(
+            listing.price_history.order_by('-changed_at', '-id')
+            .values('old_price', 'price', 'changed_at')[:PRICE_HISTORY_LIMIT]
+        ),
+        'realtor': {
+            'id': realtor.id,
+            'name': realtor.name,
+            'email': realtor.email,
+            'phone': realtor.phone,
+            'description': realtor.description,
+            'is_mvp': realtor.is_mvp,
+            'photo_url': _file_url(realtor.photo),
+        },
+    }
+
+
+def get_listing_detail(listing_id):
+    """Return the cached detail view model, building it on a miss."""
+    return layered.get_or_set(
+        detail_cache_key(listing_id), lambda: build_listing_detail(listing_id), DETAIL_CACHE_TIMEOUT,
+    )
+
+
+def refresh_listing_detail(listing_id):
+    """Rebuild and store the detail view model (cache warming)."""
+    layered.set(detail_cache_key(listing_id), build_listing_detail(listing_id), DETAIL_CACHE_TIMEOUT)
+
+
+def invalidate_listing_detail(*listing_ids):
+    layered.delete(*[detail_cache_key(listing_id) for listing_id in listing_ids])
+
+
+def build_featured_sections():
+    # Top 6 by the precomputed rank score; served by the listing_published_rank index
+    published = Listing.objects.filter(is_published=True)
+    return {
+        'featured_listings': summaries(published.order_by('-rank_score', '-list_date')[:6]),
+        'latest_listings': summaries(published.order_by('-list_date')[:9]),
+    }
+
+
+def get_featured_sections():
+    """Featured and latest ListingSummary lists for the home page."""
+    return layered.get_or_set(FEATURED_KEY, build_featured_sections, FEATURED_CACHE_TIMEOUT, STALE_WINDOW)
+
+
+def refresh_featured_sections():
+    layered.set(FEATURED_KEY, build_featured_sections(), FEATURED_CACHE_TIMEOUT, STALE_WINDOW)
+
+
+def invalidate_featured_sections():
+    layered.delete(FEATURED_KEY, MOST_VIEWED_KEY)
+
+
+def build_most_viewed(refresh=False):
+    # Most viewed over the last week, in ranking order
+    ranking = analytics.most_viewed(days=MOST_VIEWED_DAYS, limit=MOST_VIEWED_LIMIT, refresh=refresh)
+    ranking = [listing_id for listing_id, _ in ranking]
+    by_id = {summary.id: summary for summary in summaries(Listing.objects.filter(id__in=ranking))}
+    return [by_id[listing_id] for listing_id in ranking if listing_id in by_id]
+
+
+def get_most_viewed():
+    """ListingSummary list of the home page's most viewed section, cached with the ranking."""
+    return layered.get_or_set(MOST_VIEWED_KEY, build_most_viewed, analytics.MOST_VIEWED_CACHE_TIMEOUT, STALE_WINDOW)
+
+
+def refresh_most_viewed():
+    """Recompute the ranking and store the section (cache warming)."""
+    layered.set(MOST_VIEWED_KEY, build_most_viewed(refresh=True), analytics.MOST_VIEWED_CACHE_TIMEOUT, STALE_WINDOW)
+
+
+def build_city_facets():
+    return list(
+        Listing.objects.filter(is_published=True)
+        .values('city').annotate(count=Count('id')).order_by('city')
+        .values_list('city', 'count')
+    )
+
+
+def get_city_facets():
+    """[(city, published listings)] for the album filter, alphabetically."""
+    return layered.get_or_set(CITY_FACETS_KEY, build_city_facets, FACETS_CACHE_TIMEOUT, STALE_WINDOW)
+
+
+def refresh_city_facets():
+    layered.set(CITY_FACETS_KEY, build_city_facets(), FACETS_CACHE_TIMEOUT, STALE_WINDOW)
@@ -0,0 +1,12 @@
+"""Views of page1, one module per area.
+
+Heavy libraries (ReportLab, Pillow, pebble) are imported inside the views
+that use them, so importing this package, which every worker does when
+the URLconf loads, stays cheap. `manage.py check_startup` guards that.
+"""
+from .accounts import login_view, logout_view, signup
+from .images import image_variant
+from .inquiries import contact_agent
+from .listings import album, cache_stats, featured, listing_detail, listing_detail_json, listings, save_search
+from .realtor import delete_property, realtor_properties, reorder_images
+from .reports import return_pdf
@@ -0,0 +1,57 @@
+from django.shortcuts import render, redirect
+from django.contrib.auth.models import User
+from django.contrib.auth import login, logout, authenticate
+from django.contrib import messages
+from ..forms import LoginForm, UserRegisterForm
+from ..models import Realtor
+
+
+def signup(request):
+    if request.method == 'POST':
+        form = UserRegisterForm(request.POST)
+        if form.is_valid():
+            user = User.objects.create_user(
+                username=form.cleaned_data['username'],
+                email=form.cleaned_data['email'],
+                password=form.cleaned_data['password1']
+            )
+
+            if form.cleaned_data['is_realtor']:
+                Realtor.objects.create(
+                    user=user,
+                    name=user.username,
+                    email=user.email,
+                    phone=''
+                )
+            return redirect('login_view')  # or home
+    else:
+        form = UserRegisterForm()
+
+    return render(request, 'register.html', {'form': form})
+
+
+
+
+def login_view(request):
+    if request.method == 'POST':
+        form = LoginForm(request.POST)
+        if form.is_valid():
+            # page1.auth.EmailBackend: one indexed, case-insensitive email lookup
+            user = authenticate(
+                request,
+                email=form.cleaned_data['email'],
+                password=form.cleaned_data['password']
+            )
+            if user:
+                login(request, user)
+                return redirect('featured')  # or another page
+            else:
+                messages.error(request, 'Invalid email or password')
+    else:
+        form = LoginForm()
+
+    return render(request, 'login.html', {'form': form, 'suppress_messages': True})
+
+def logout_view(request):
+    logout(request)
+    return redirect('login_view')
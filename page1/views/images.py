@@ -0,0 +1,33 @@
+from django.http import Http404, HttpResponseNotModified
+from django.utils.cache import get_conditional_response
+from .. import imageserver
+from ..models import PropertyImage
+
+
+def image_variant(request, id, width, height, fmt):
+    """A PropertyImage resized to one of the allowed sizes, generated on first request"""
+    if not imageserver.is_allowed(width, height, fmt):
+        raise Http404('Unsupported image size or format.')
+
+    source = (
+        PropertyImage.objects.filter(pk=id, listing__is_deleted=False)
+        .values_list('image', flat=True)
+        .first()
+    )
+    if not source:
+        raise Http404('No image matches the given query.')
+
+    etag = imageserver.variant_etag(id, source, width, height, fmt)
+    # 304 for a matching If-None-Match, before the variant file is even looked at
+    conditional = get_conditional_response(request, etag=etag)
+    if conditional is not None:
+        if isinstance(conditional, HttpResponseNotModified):
+            conditional['Cache-Control'] = f'public, max-age={imageserver.CACHE_MAX_AGE}'
+        return conditional
+
+    field = PropertyImage._meta.get_field('image')
+    try:
+        return imageserver.serve_variant(id, source, field.storage.path(source), width, height, fmt, etag)
+    except (OSError, imageserver.UnusableSource):
+        # Missing, unreadable (Pillow raises OSError subclasses) or oversized original
+        raise Http404('Image file is not available.')
@@ -0,0 +1,68 @@
+from django.shortcuts import redirect
+from django.http import JsonResponse, Http404
+from django.contrib import messages
+from django.urls import reverse
+from .. import inquiries, ratelimit
+from ..forms import ContactAgentForm
+from ..viewmodels import get_listing_detail
+
+
+def contact_agent(request, id):
+    """Handle contact agent form submission"""
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+    # Rate limiting and de-duplication happen before any DB work
+    if request.method == 'POST':
+        verdict, retry_after = ratelimit.check_inquiry(request, id)
+        if verdict == ratelimit.RATE_LIMITED:
+            message = 'Too many inquiries. Please wait a moment and try again.'
+            if is_ajax:
+                response = JsonResponse({'success': False, 'message': message}, status=429)
+                response['Retry-After'] = str(retry_after)
+                return response
+            messages.error(request, message)
+            return redirect('listing_detail', id=id)
+        if verdict == ratelimit.DUPLICATE:
+            # Same inquiry already accepted: answer as if it went through again
+            message = 'Thank you! Your inquiry has been sent to the agent.'
+            if is_ajax:
+                return JsonResponse({'success': True, 'message': message})
+            messages.success(request, message)
+            return redirect('listing_detail', id=id)
+
+    # The cached detail view model: no Listing/Realtor queries on the way in
+    detail = get_listing_detail(id)
+    if detail is None:
+        if request.method == 'POST':
+            ratelimit.release_inquiry(request, id)
+        raise Http404('No Listing matches the given query.')
+
+    if request.method == 'POST':
+        form = ContactAgentForm(request.POST)
+        if form.is_valid():
+            # Journaled and acknowledged now; stored and emailed with the next group commit
+            submission_id = inquiries.submit(
+                id,
+                detail['listing']['title'],
+                form.cleaned_data,
+                user_id=request.user.id if request.user.is_authenticated else None,
+                dashboard_url=request.build_absolute_uri(reverse('realtor_properties')),
+            )
+            message = 'Thank you! Your inquiry has been sent to the agent.'
+            if is_ajax:
+                return JsonResponse({'success': True, 'message': message, 'submission_id': submission_id})
+            messages.success(request, message)
+            return redirect('listing_detail', id=id)
+        else:
+            # Not accepted, so the corrected resubmission must not count as a duplicate
+            ratelimit.release_inquiry(request, id)
+            if is_ajax:
+                return JsonResponse({
+                    'success': False,
+                    'errors': form.errors
+                }, status=400)
+            else:
+                messages.error(request, 'Please fill in all required fields.')
+                return redirect('listing_detail', id=id)
+    
+    return redirect('listing_detail', id=id)
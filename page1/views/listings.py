@@ -0,0 +1,110 @@
+from django.shortcuts import render, redirect
+from django.http import JsonResponse, Http404
+from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib import messages
+from django.conf import settings
+from django.urls import reverse
+from urllib.parse import urlencode
+from .. import analytics, market
+from ..cache import layered
+from ..filters import filter_listings
+from ..forms import ContactAgentForm
+from ..models import SavedSearch
+from ..similar import similar_listings
+from ..streaming import stream_template
+from ..viewmodels import (
+    get_city_facets, get_featured_sections, get_listing_detail, get_most_viewed, iter_summaries, summaries,
+)
+
+ALBUM_STREAMING = getattr(settings, 'ALBUM_STREAMING', True)
+ALBUM_STREAM_CHUNK = getattr(settings, 'ALBUM_STREAM_CHUNK', 24)
+
+
+def album(request):
+    # Cards only need ListingSummary rows, cover image included in the same query
+    listings = filter_listings(request.GET).order_by('-list_date')
+    
+    context = {'city_facets': get_city_facets()}
+    if ALBUM_STREAMING:
+        # Header, filters and the first row of cards go out before the rest is rendered
+        return stream_template(
+            request, 'album_grid.html', context, 'listings', iter_summaries(listings, ALBUM_STREAM_CHUNK),
+            'components/card_columns.html', chunk_size=ALBUM_STREAM_CHUNK,
+        )
+    return render(request, 'album_grid.html', {**context, 'listings': summaries(listings)})
+
+
+def featured(request):
+    """Display featured properties and latest listings"""
+    return render(request, 'featured.html', {
+        **get_featured_sections(),
+        'most_viewed_listings': get_most_viewed(),
+    })
+
+
+
+@login_required
+def save_search(request):
+    """Save the current album filters so new matching listings are emailed"""
+    if request.method != 'POST':
+        return redirect('album')
+
+    def int_or_none(name):
+        try:
+            return int(request.POST.get(name) or '') or None
+        except ValueError:
+            return None
+
+    params = {
+        'keyword': request.POST.get('keyword', '').strip(),
+        'city': request.POST.get('city', '').strip(),
+        'bedrooms': int_or_none('bedrooms'),
+        'max_price': int_or_none('max_price'),
+    }
+    _, created = SavedSearch.objects.get_or_create(user=request.user, **params)
+    if created:
+        messages.success(request, "Search saved. We'll email you when new properties match.")
+    else:
+        messages.info(request, 'You have already saved this search.')
+
+    query = {k: v for k, v in params.items() if v}
+    return redirect(f"{reverse('album')}?{urlencode(query)}" if query else reverse('album'))
+
+
+
+def listings(request):
+    qs = filter_listings(request.GET)
+
+    return render(request, 'album_grid.html', {
+        'listings': qs
+    })
+
+
+def listing_detail(request, id):
+    detail = get_listing_detail(id)
+    if detail is None:
+        raise Http404('No Listing matches the given query.')
+    analytics.record_view(id)
+    form = ContactAgentForm()
+    return render(request, 'listing_detail.html', {
+        **detail,
+        'contact_form': form,
+        'similar_listings': similar_listings(id, k=3),
+        # Read from precomputed MarketStats rows, see market.py
+        'market': market.comparison(detail['listing']),
+    })
+
+
+def listing_detail_json(request, id):
+    """JSON variant of the listing detail view model for app clients"""
+    detail = get_listing_detail(id)
+    if detail is None:
+        return JsonResponse({'error': 'Listing not found'}, status=404)
+    return JsonResponse(detail)
+
+
+@staff_member_required
+def cache_stats(request):
+    """Hit ratios of this worker's layered cache (page1.cache)"""
+    return JsonResponse(layered.stats())
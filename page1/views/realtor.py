@@ -0,0 +1,161 @@
+from django.shortcuts import render, redirect, get_object_or_404
+from django.http import HttpResponseForbidden, JsonResponse
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from django.contrib import messages
+from django.core.files.base import ContentFile
+from io import BytesIO
+from .. import analytics, bulk
+from ..auth import get_realtor
+from ..forms import ListingForm
+from ..models import Contact, ImageOrderConflict, Listing, PropertyImage
+
+
+def resize_bytes(fileobj, max_size=(1600, 1200)):
+    # Pillow is imported on the first upload, not when a worker boots
+    from PIL import Image
+
+    try:
+        img = Image.open(fileobj)
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+        buf = BytesIO()
+        if img.mode in ("RGBA", "LA"):
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[3])
+            img = background
+        else:
+            img = img.convert('RGB')
+        img.save(buf, format='JPEG', quality=80, optimize=True)
+        buf.seek(0)
+        return buf
+    except Exception:
+        return None
+
+
+def resize_uploads(images):
+    """[(name, ContentFile)] of the uploads resized in parallel; unreadable images are skipped."""
+    # Optional: use pebble ThreadPool for better control if available; otherwise use stdlib
+    try:
+        from pebble import ThreadPool
+    except ImportError:
+        ThreadPool = None
+
+    if ThreadPool is not None:
+        pool = ThreadPool(max_workers=4)
+        try:
+            # MapFuture.result() yields the results in order
+            buffers = list(pool.map(resize_bytes, images).result())
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=4) as ex:
+            buffers = list(ex.map(resize_bytes, images))
+
+    return [
+        (getattr(image, 'name', f'image_{idx}.jpg'), ContentFile(buf.read()))
+        for idx, (image, buf) in enumerate(zip(images, buffers))
+        if buf
+    ]
+
+
+@login_required
+def realtor_properties(request):
+    #  Block non-realtors
+    realtor = get_realtor(request)
+    if realtor is None:
+        return redirect('featured')
+
+    if request.method == 'POST':
+        # Do not bind `request.FILES` to the form since we handle multiple
+        # uploaded files separately. Binding files can cause validation
+        # errors for FileField when using a `multiple` input.
+        form = ListingForm(request.POST)
+        if form.is_valid():
+            listing = form.save(commit=False)
+            listing.realtor = realtor
+            listing.save()
+            
+            # Handle multiple image uploads
+            images = request.FILES.getlist('images')[:6]
+
+            processed = resize_uploads(images) if images else []
+
+            for name, content in processed:
+                # save the resized bytes into PropertyImage; the first one is the cover
+                prop_img = PropertyImage(listing=listing)
+                prop_img.image.save(name, content, save=True)
+            
+            messages.success(request, 'Property added successfully!')
+            return redirect('realtor_properties')
+        else:
+            # Display form errors
+            for field, errors in form.errors.items():
+                for error in errors:
+                    messages.error(request, f'{field}: {error}')
+    else:
+        form = ListingForm()
+
+    listings = (
+        Listing.objects.filter(realtor=realtor)
+        .annotate(**analytics.stats_totals_annotation(days=30))
+        .order_by('-list_date')
+    )
+    
+    # Get inquiries for this realtor's listings
+    inquiries = Contact.objects.filter(
+        listing__realtor=realtor,
+        listing__is_deleted=False
+    ).order_by('-contact_date')
+
+    return render(request, 'properties.html', {
+        'form': form,
+        'listings': listings,
+        'inquiries': inquiries
+    })
+
+
+
+@login_required
+def delete_property(request, id):
+    # Delete a listing owned by the logged-in realtor
+    realtor = get_realtor(request)
+    if realtor is None:
+        return HttpResponseForbidden()
+
+    listing = get_object_or_404(Listing, id=id)
+    if listing.realtor_id != realtor.id:
+        return HttpResponseForbidden()
+
+    if request.method == 'POST':
+        # Instant for the realtor; rows and files are removed by reap_deleted_listings
+        listing.soft_delete()
+        messages.success(request, 'Property removed successfully.')
+        return redirect('realtor_properties')
+
+    # If not POST, show a simple confirm page (reuse properties template area)
+    return render(request, 'confirm_delete.html', {'listing': listing})
+
+
+@login_required
+@require_POST
+def reorder_images(request, id):
+    """Set the order of a listing's images; `image_ids` lists all of them, cover first."""
+    realtor = get_realtor(request)
+    if realtor is None:
+        return HttpResponseForbidden()
+
+    listing = get_object_or_404(Listing, id=id)
+    if listing.realtor_id != realtor.id:
+        return HttpResponseForbidden()
+
+    try:
+        image_ids = [int(image_id) for image_id in request.POST.getlist('image_ids')]
+        bulk.reorder_images(listing.id, image_ids)
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'image_ids must list each image once.'}, status=400)
+    except ImageOrderConflict:
+        # An image was added or removed since the client loaded the list
+        return JsonResponse({'success': False, 'message': 'The images changed, reload and try again.'}, status=409)
+    return JsonResponse({'success': True, 'image_ids': image_ids})
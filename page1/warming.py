@@ -0,0 +1,101 @@
+"""Fill the shared (L2) caches before visitors ask for them.
+
+`manage.py warm_caches` runs after a deploy or restart, and
+`listing_published` runs after a listing goes live. Both store values
+built by the same viewmodels functions the views call on a miss, so a
+warmed entry is identical to one built by a request.
+
+The album result pages stream straight from the database and are not
+cached. For the busiest cities, warming covers the detail pages linked
+from their first screen of cards instead.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+
+from . import analytics
+from .cache import layered
+from .models import Listing
+from .viewmodels import refresh_city_facets, refresh_featured_sections, refresh_listing_detail, refresh_most_viewed
+
+WARM_CONCURRENCY = getattr(settings, 'WARM_CACHES_CONCURRENCY', 4)
+WARM_ON_PUBLISH = getattr(settings, 'WARM_CACHES_ON_PUBLISH', True)
+# Cards on the first screen of an album page (see ALBUM_STREAM_CHUNK)
+CITY_PAGE_SIZE = 24
+
+
+def warm_targets(details=50, cities=5):
+    """[(group, label, callable)] covering the home page, facets and the top detail pages."""
+    targets = [
+        ('home', 'featured sections', refresh_featured_sections),
+        ('home', 'most viewed', refresh_most_viewed),
+        ('facets', 'city facets', refresh_city_facets),
+    ]
+
+    published = Listing.objects.filter(is_published=True)
+    listing_ids = list(published.order_by('-rank_score', '-list_date').values_list('id', flat=True)[:details])
+    listing_ids += [listing_id for listing_id, _ in analytics.most_viewed(days=7, limit=details)]
+
+    top_cities = (
+        published.values('city').annotate(count=Count('id')).order_by('-count')
+        .values_list('city', flat=True)[:cities]
+    )
+    for city in top_cities:
+        listing_ids += published.filter(city=city).order_by('-list_date').values_list('id', flat=True)[:CITY_PAGE_SIZE]
+
+    for listing_id in dict.fromkeys(listing_ids):
+        targets.append(('details', f'listing {listing_id}', lambda listing_id=listing_id: refresh_listing_detail(listing_id)))
+    return targets
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return start, time.perf_counter()
+
+
+def _run_in_thread(fn):
+    # Worker threads open their own DB connections; close them when done
+    close_old_connections()
+    try:
+        return _timed(fn)
+    finally:
+        close_old_connections()
+
+
+def warm(details=50, cities=5, concurrency=WARM_CONCURRENCY):
+    """Build every warm target on `concurrency` threads (inline when 1).
+
+    Returns {group: (count, wall seconds, summed build seconds)}. Wall time
+    runs from the group's first start to its last finish; with several
+    threads the summed build time can exceed it, and the whole run. Failures
+    propagate after the other targets have finished."""
+    targets = warm_targets(details=details, cities=cities)
+    if concurrency <= 1:
+        timings = [(group, _timed(fn)) for group, _, fn in targets]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='warm-caches') as executor:
+            futures = [(group, executor.submit(_run_in_thread, fn)) for group, _, fn in targets]
+        timings = [(group, future.result()) for group, future in futures]
+
+    spans = {}
+    for group, (start, end) in timings:
+        count, first, last, total = spans.get(group, (0, start, end, 0.0))
+        spans[group] = (count + 1, min(first, start), max(last, end), total + end - start)
+    return {group: (count, last - first, total) for group, (count, first, last, total) in spans.items()}
+
+
+def warm_listing(listing_id):
+    refresh_listing_detail(listing_id)
+    refresh_featured_sections()
+    refresh_city_facets()
+
+
+def listing_published(listing):
+    """Warm the new listing's page and the pages that list it, off the request thread."""
+    if WARM_ON_PUBLISH:
+        listing_id = listing.pk
+        transaction.on_commit(lambda: layered.submit(lambda: warm_listing(listing_id)))
@@ -13,15 +13,18 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from os import path
 import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Load environment variables from .env file. Deployments that set the
+# environment themselves have no .env, and skip importing python-dotenv.
+ENV_FILE = BASE_DIR / '.env'
+if ENV_FILE.is_file():
+    from dotenv import load_dotenv
+    load_dotenv(ENV_FILE)
+
 MEDIA_URL = ''
 MEDIA_ROOT = path.join(BASE_DIR,'')
 
@@ -53,10 +56,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'page1.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'page1.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -66,7 +71,9 @@ ROOT_URLCONF = 're_market.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': ['page1/templates'],
+        'DIRS': [],
+        # With no 'loaders' option Django wraps the app directories loader in
+        # the cached loader, so compiled templates are kept per process
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -91,6 +98,55 @@ DATABASES = {
     }
 }
 
+# SQLITE_WAL=True switches the database to WAL mode on connect, so readers don't
+# block the writer; the sqlite_checkpoint job keeps the -wal file in check. The
+# mode is stored in the database file itself, so leave it off for the db.sqlite3
+# checked into the repo and turn it on per deployment.
+if os.getenv('SQLITE_WAL', 'False') == 'True':
+    DATABASES['default']['OPTIONS'] = {'init_command': 'PRAGMA journal_mode=WAL'}
+
+
+# Authentication
+# Users sign in with their email; admin keeps username login via ModelBackend
+
+AUTHENTICATION_BACKENDS = [
+    'page1.auth.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
+# Cache
+# CACHE_BACKEND=locmem|file|redis. locmem is per process, for development and
+# tests. file and redis are shared by every worker, so page1.cache's L2 layer
+# stays warm across workers and restarts (redis needs the redis package).
+
+CACHE_BACKENDS = {
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', BASE_DIR / '.cache'),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+CACHES = {'default': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem' if DEBUG else 'file')]}
+
+
+# Sessions
+# SESSION_BACKEND=db|cached_db|signed_cookies. cached_db serves reads from the
+# cache and only touches the DB on writes/misses; signed_cookies needs no
+# server-side storage at all (session data is visible to the client).
+
+SESSION_BACKENDS = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_BACKENDS[os.getenv('SESSION_BACKEND', 'cached_db')]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -127,6 +183,16 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# With DEBUG off, `manage.py collectstatic` fingerprints, purges and
+# precompresses the assets (page1.storage) and StaticFilesMiddleware serves
+# them with long-lived cache headers. Run it on every deploy.
+if not DEBUG:
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'page1.storage.CompressedManifestStaticFilesStorage'},
+    }
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field